@@ -0,0 +1,393 @@
+"""
+Small precomputed aggregates behind the summary views.
+
+prep/prepare_aggregates.py builds them from every year's analysis frame and
+writes them to processed/aggregates/, stamped with the data version. The app
+reads them when they are current and otherwise computes them in-process
+with the same functions, so views never group row-level data per rerun.
+"""
+import logging
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from data_loader import PROCESSED_DIR, academic_year_end, data_version, numeric_values
+
+logger = logging.getLogger(__name__)
+
+AGGREGATES_DIR = os.path.join(PROCESSED_DIR, 'aggregates')
+
+ALL_SECTORS = 'All Sectors'
+EXCLUDED_SECTORS = ['Administrative Unit']
+
+# Metric -> histogram scale. Dollar amounts span several orders of
+# magnitude, so they are binned on log10; percentages are binned linearly.
+DISTRIBUTION_METRICS = {
+    'total_pell_amount': 'log',
+    'total_loan_amount': 'log',
+    'total_aid': 'log',
+    'avg_pell_amount': 'log',
+    'avg_loan_amount': 'log',
+    'pct_pell_grant': 'linear',
+    'pct_fed_loan': 'linear'
+}
+HISTOGRAM_BINS = 40
+QUANTILES = [0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95]
+LORENZ_POINTS = 101
+
+def _with_total_aid(df):
+    if 'total_aid' not in df.columns:
+        df = df.assign(total_aid=df['total_pell_amount'] + df['total_loan_amount'])
+    return df
+
+def _sector_groups(df):
+    """Yield (sector, frame) for every sector and for all sectors combined"""
+    df = df[~df['sector'].isin(EXCLUDED_SECTORS)]
+    yield ALL_SECTORS, df
+    for sector, group in df.groupby(df['sector'].astype(str), sort=True):
+        yield sector, group
+
+def histogram_edges(frames, metric):
+    """Bin edges for a metric shared by every year, so years are comparable"""
+    values = np.concatenate([numeric_values(_with_total_aid(df)[metric])
+                             for df in frames.values()])
+    values = values[np.isfinite(values)]
+    if DISTRIBUTION_METRICS[metric] == 'log':
+        values = values[values > 0]
+        if not len(values):
+            return np.linspace(0, 1, HISTOGRAM_BINS + 1)
+        return np.logspace(np.log10(values.min()), np.log10(values.max()), HISTOGRAM_BINS + 1)
+    return np.linspace(0, max(100.0, values.max() if len(values) else 0), HISTOGRAM_BINS + 1)
+
+def lorenz_curve(values):
+    """
+    Lorenz curve and Gini coefficient of a set of non-negative amounts.
+
+    Returns:
+        tuple: (share of institutions, share of amount) sampled at
+               LORENZ_POINTS evenly spaced institution shares, and the exact
+               Gini coefficient of the full data
+    """
+    values = np.sort(values[np.isfinite(values) & (values >= 0)])
+    n = len(values)
+    if n == 0 or values.sum() == 0:
+        shares = np.linspace(0, 1, LORENZ_POINTS)
+        return shares, shares, np.nan
+    cumulative = np.concatenate([[0.0], np.cumsum(values) / values.sum()])
+    population = np.arange(n + 1) / n
+    # Area under the curve by the trapezoid rule: Gini = 1 - 2 * area
+    area = np.sum((cumulative[1:] + cumulative[:-1]) / 2) / n
+    shares = np.linspace(0, 1, LORENZ_POINTS)
+    return shares, np.interp(shares, population, cumulative), 1 - 2 * area
+
+def build_distributions(frames):
+    """
+    Histograms, quantiles and Pell concentration for every year and sector.
+
+    Quantiles are exact (numpy) rather than sketched: a year has only a few
+    thousand institutions, so the full sort costs milliseconds in prep.
+
+    Args:
+        frames (dict): Year code -> analysis frame
+
+    Returns:
+        dict: 'histograms' (year, sector, metric, bin_left, bin_right, count),
+              'quantiles' (year, sector, metric, quantile, value, count) and
+              'lorenz' (year, sector, point, institution_share, amount_share,
+              gini) frames
+    """
+    edges = {metric: histogram_edges(frames, metric) for metric in DISTRIBUTION_METRICS}
+    histograms, quantiles, lorenz = [], [], []
+    for year, df in frames.items():
+        for sector, group in _sector_groups(_with_total_aid(df)):
+            for metric, metric_edges in edges.items():
+                values = numeric_values(group[metric])
+                values = values[np.isfinite(values)]
+                counts, _ = np.histogram(values, bins=metric_edges)
+                histograms.append(pd.DataFrame({
+                    'year': year, 'sector': sector, 'metric': metric,
+                    'bin_left': metric_edges[:-1], 'bin_right': metric_edges[1:],
+                    'count': counts
+                }))
+                quantiles.append(pd.DataFrame({
+                    'year': year, 'sector': sector, 'metric': metric,
+                    'quantile': QUANTILES,
+                    'value': np.quantile(values, QUANTILES) if len(values) else np.nan,
+                    'count': len(values)
+                }))
+            shares, amounts, gini = lorenz_curve(
+                numeric_values(group['total_pell_amount']))
+            lorenz.append(pd.DataFrame({
+                'year': year, 'sector': sector, 'point': np.arange(LORENZ_POINTS),
+                'institution_share': shares, 'amount_share': amounts, 'gini': gini
+            }))
+    return {
+        'histograms': pd.concat(histograms, ignore_index=True),
+        'quantiles': pd.concat(quantiles, ignore_index=True),
+        'lorenz': pd.concat(lorenz, ignore_index=True)
+    }
+
+STATE_SUMS = ['total_undergrad', 'num_pell_grant', 'total_pell_amount',
+              'num_fed_loan', 'total_loan_amount', 'total_aid']
+
+def build_state_rollup(frames):
+    """
+    Per-state totals and per-student amounts for every year and sector.
+
+    Args:
+        frames (dict): Year code -> analysis frame
+
+    Returns:
+        pd.DataFrame: year, sector, state, institutions, the STATE_SUMS
+                      totals and pell/loan/aid per undergraduate
+    """
+    rollups = []
+    for year, df in frames.items():
+        df = _with_total_aid(df)
+        df = df[df['state'].notna()]
+        for sector, group in _sector_groups(df):
+            rollup = group.groupby(group['state'].astype(str)).agg(
+                institutions=('unit_id', 'size'),
+                **{col: (col, 'sum') for col in STATE_SUMS}
+            ).reset_index()
+            rollup.insert(0, 'sector', sector)
+            rollup.insert(0, 'year', year)
+            rollups.append(rollup)
+    rollup = pd.concat(rollups, ignore_index=True)
+
+    undergrads = numeric_values(rollup['total_undergrad'])
+    undergrads = np.where(undergrads > 0, undergrads, np.nan)
+    rollup['pell_per_student'] = numeric_values(rollup['total_pell_amount']) / undergrads
+    rollup['loan_per_student'] = numeric_values(rollup['total_loan_amount']) / undergrads
+    rollup['aid_per_student'] = numeric_values(rollup['total_aid']) / undergrads
+    return rollup
+
+# Numeric peer features and their scaling before standardization
+PEER_FEATURES = {
+    'total_undergrad': np.log1p,
+    'pct_pell_grant': None,
+    'pct_fed_loan': None,
+    'grad_rate_2023': None
+}
+# Weight of the sector one-hot columns: a different sector adds as much
+# distance as a two standard deviation difference in one feature
+SECTOR_WEIGHT = np.sqrt(2)
+
+def build_peer_features(frames):
+    """
+    Normalized feature matrix for the peer finder, one block per year.
+
+    Numeric features are standardized within each year, with missing values
+    imputed at the mean (0); sector is one-hot encoded. Institutions without
+    reported enrollment and administrative units are left out.
+
+    Args:
+        frames (dict): Year code -> analysis frame
+
+    Returns:
+        pd.DataFrame: year, unit_id and one float32 column per feature
+    """
+    sectors = sorted({str(s) for df in frames.values() for s in df['sector'].dropna().unique()}
+                     - set(EXCLUDED_SECTORS))
+    blocks = []
+    for year, df in frames.items():
+        df = df[~df['sector'].isin(EXCLUDED_SECTORS) & (numeric_values(df['total_undergrad']) > 0)]
+        block = pd.DataFrame({'year': year, 'unit_id': df['unit_id'].values})
+        for feature, transform in PEER_FEATURES.items():
+            values = numeric_values(df[feature])
+            if transform is not None:
+                values = transform(values)
+            std = np.nanstd(values)
+            values = (values - np.nanmean(values)) / (std if std > 0 else 1)
+            block[feature] = np.nan_to_num(values).astype('float32')
+        sector = df['sector'].astype(str).values
+        for name in sectors:
+            block[f'sector_{name}'] = ((sector == name) * SECTOR_WEIGHT).astype('float32')
+        blocks.append(block)
+    return pd.concat(blocks, ignore_index=True)
+
+def peer_index(features):
+    """Split the feature frame into {year: (unit_ids, matrix)} for lookups"""
+    columns = [col for col in features.columns if col not in ('year', 'unit_id')]
+    return {
+        year: (group['unit_id'].values, np.ascontiguousarray(group[columns].values, dtype='float32'))
+        for year, group in features.groupby('year', sort=False)
+    }
+
+def find_peers(index, year, unit_id, k=5):
+    """
+    The k institutions nearest to unit_id in the given year.
+
+    A brute-force distance scan over a year's few thousand rows takes well
+    under a millisecond, so no tree index is needed.
+
+    Returns:
+        pd.DataFrame: unit_id and distance of each peer, nearest first
+                      (empty if the institution is not in the index)
+    """
+    if year not in index:
+        return pd.DataFrame({'unit_id': [], 'distance': []})
+    unit_ids, matrix = index[year]
+    position = np.flatnonzero(unit_ids == unit_id)
+    if not len(position):
+        return pd.DataFrame({'unit_id': [], 'distance': []})
+
+    distances = np.sqrt(((matrix - matrix[position[0]]) ** 2).sum(axis=1))
+    distances[position[0]] = np.inf
+    k = min(k, len(distances) - 1)
+    nearest = np.argpartition(distances, k)[:k]
+    nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+    return pd.DataFrame({'unit_id': unit_ids[nearest], 'distance': distances[nearest]})
+
+# Historical trends: columns read from each year and the metrics in the panel
+TREND_COLUMNS = ['unit_id', 'state', 'sector', 'total_pell_amount', 'total_loan_amount']
+TREND_METRICS = ['total_pell_amount', 'total_loan_amount', 'total_aid']
+
+def build_trend_panel(frames):
+    """
+    Long unit_id x year panel of the trend metrics and the latest year's ranking.
+
+    Args:
+        frames (dict): Year code -> analysis frame, oldest first
+
+    Returns:
+        dict: 'panel' (unit_id, year and TREND_METRICS, one row per reported
+              institution-year, sorted by unit_id and then year, oldest
+              first) and 'ranking' (metric, rank, unit_id, state, sector,
+              value: the latest year's institutions with a value for the
+              metric, largest first)
+    """
+    stacked = []
+    for year, df in frames.items():
+        df = _with_total_aid(df)
+        year_panel = pd.DataFrame({'unit_id': df['unit_id'].to_numpy(dtype=np.int64), 'year': year})
+        for metric in TREND_METRICS:
+            year_panel[metric] = numeric_values(df[metric])
+        stacked.append(year_panel)
+    # Frames are oldest first, so a stable sort keeps each unit's years in order
+    panel = pd.concat(stacked, ignore_index=True).sort_values('unit_id', kind='stable')
+
+    latest = _with_total_aid(frames[list(frames)[-1]])
+    attributes = pd.DataFrame({
+        'unit_id': latest['unit_id'].to_numpy(dtype=np.int64),
+        'state': latest['state'].astype(str).where(latest['state'].notna()).to_numpy(),
+        'sector': latest['sector'].astype(str).where(latest['sector'].notna()).to_numpy()
+    })
+    rankings = []
+    for metric in TREND_METRICS:
+        ranked = attributes.assign(value=numeric_values(latest[metric])).dropna(subset=['value'])
+        # Stable, so ties keep frame order as nlargest did
+        ranked = ranked.sort_values('value', ascending=False, kind='stable')
+        ranked.insert(0, 'rank', np.arange(1, len(ranked) + 1))
+        ranked.insert(0, 'metric', metric)
+        rankings.append(ranked)
+    return {
+        'panel': panel.reset_index(drop=True),
+        'ranking': pd.concat(rankings, ignore_index=True)
+    }
+
+def index_trends(trends):
+    """
+    Arrange build_trend_panel() output for top_trends and window_totals lookups.
+
+    Besides the panel, each institution's running totals over the years are
+    kept as a dense array, so the total over any range of years is the
+    difference of two entries whatever the range.
+
+    Returns:
+        dict: 'panel' (as built, sorted by unit_id), 'unit_ids' and 'starts'
+              (each unit's first panel row; the last entry is the row
+              count), 'ranking' (metric -> ranking rows in rank order),
+              'years' (oldest first) and 'cumulative' (units x years + 1 x
+              TREND_METRICS; entry [u, j] sums years before index j, with
+              missing values counting as 0)
+    """
+    panel = trends['panel']
+    unit_ids, starts = np.unique(panel['unit_id'].to_numpy(), return_index=True)
+    ranking = trends['ranking']
+
+    years = sorted(panel['year'].unique(), key=academic_year_end)
+    rows = np.searchsorted(unit_ids, panel['unit_id'].to_numpy())
+    cols = panel['year'].map({year: j for j, year in enumerate(years)}).to_numpy()
+    values = np.zeros((len(unit_ids), len(years), len(TREND_METRICS)))
+    for k, metric in enumerate(TREND_METRICS):
+        values[rows, cols, k] = np.nan_to_num(numeric_values(panel[metric]))
+    cumulative = np.zeros((len(unit_ids), len(years) + 1, len(TREND_METRICS)))
+    np.cumsum(values, axis=1, out=cumulative[:, 1:])
+
+    return {
+        'panel': panel,
+        'unit_ids': unit_ids,
+        'starts': np.append(starts, len(panel)),
+        'ranking': {metric: group.reset_index(drop=True)
+                    for metric, group in ranking.groupby('metric', sort=False)},
+        'years': years,
+        'cumulative': cumulative
+    }
+
+def window_totals(trends, unit_ids, metric, first_year, last_year):
+    """
+    Each institution's total of a metric over a range of years.
+
+    Args:
+        trends (dict): index_trends() output
+        unit_ids (array-like): Institutions to total; all must be in the panel
+        first_year, last_year (str): Year codes bounding the range, inclusive
+
+    Returns:
+        np.ndarray: Totals in unit_ids order; years without a value count as 0
+    """
+    start = trends['years'].index(first_year)
+    end = trends['years'].index(last_year) + 1
+    units = np.searchsorted(trends['unit_ids'], np.asarray(unit_ids))
+    cumulative = trends['cumulative'][:, :, TREND_METRICS.index(metric)]
+    return cumulative[units, end] - cumulative[units, start]
+
+def top_trends(trends, metric, n):
+    """
+    The latest year's n largest institutions for a metric and their panel rows.
+
+    Args:
+        trends (dict): index_trends() output
+
+    Returns:
+        tuple: (ranking rows in rank order, panel rows of those institutions
+               in the same order)
+    """
+    top = trends['ranking'][metric].iloc[:n]
+    units = np.searchsorted(trends['unit_ids'], top['unit_id'].to_numpy())
+    starts, ends = trends['starts'][units], trends['starts'][units + 1]
+    if not len(units):
+        return top, trends['panel'].iloc[:0]
+    # Each unit's rows are contiguous, so the slice is a few ranges of positions
+    positions = np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)])
+    return top, trends['panel'].take(positions)
+
+def aggregate_path(name):
+    return os.path.join(AGGREGATES_DIR, f'{name}.parquet')
+
+def write_aggregate(name, df, version):
+    """Write an aggregate stamped with the data version it was built from"""
+    os.makedirs(AGGREGATES_DIR, exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b'ipeds.data_version': version.encode()
+    })
+    path = aggregate_path(name)
+    tmp_path = path + '.tmp'
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+def read_aggregate(name):
+    """Read a precomputed aggregate if it matches the current data, or None"""
+    path = aggregate_path(name)
+    if not os.path.exists(path):
+        return None
+    metadata = pq.read_schema(path).metadata or {}
+    if metadata.get(b'ipeds.data_version', b'').decode() != data_version():
+        logger.info("Aggregate %s is stale; computing it from the data", path)
+        return None
+    return pd.read_parquet(path)
@@ -0,0 +1,368 @@
+"""
+Headless JSON API over the processed IPEDS data.
+
+Serves the same merged frames as the Streamlit app (through data_loader),
+without Streamlit's per-session overhead. Run from the repository root:
+
+    python app/api.py --port 8000
+
+Endpoints:
+    GET /years
+    GET /top?year=2223&metric=total_pell_amount&sector=Public,+2-year&n=10
+    GET /institutions/<unit_id>/series?metrics=total_pell_amount,total_loan_amount
+    GET /sectors?year=2223&metric=total_loan_amount
+    GET /export/panel?format=parquet&years=2122,2223&metrics=total_pell_amount
+    GET /stats
+
+Year frames are held within the IPEDS_CACHE_MAX_BYTES budget (see cache.py).
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from data_loader import (
+    YEAR_OPTIONS,
+    read_institution_history,
+    read_crosswalk,
+    merge_year,
+    read_snapshot_year
+)
+from cache import BoundedCache, cache_stats, max_bytes_from_env
+from watcher import data_versions, changed_versions
+from exports import FORMATS, export_panel, iter_file
+
+logger = logging.getLogger(__name__)
+
+METRICS = [
+    'total_undergrad', 'num_pell_grant', 'pct_pell_grant', 'total_pell_amount',
+    'avg_pell_amount', 'num_fed_loan', 'pct_fed_loan', 'total_loan_amount',
+    'avg_loan_amount', 'total_aid', 'grad_rate_2023'
+]
+SUMMABLE_METRICS = ['total_undergrad', 'num_pell_grant', 'total_pell_amount',
+                    'num_fed_loan', 'total_loan_amount', 'total_aid']
+MAX_TOP_N = 500
+
+class ApiError(Exception):
+    """Request error reported to the client with an HTTP status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def default_year():
+    """Most recent year code available"""
+    return next(iter(YEAR_OPTIONS.values()))
+
+class DataStore:
+    """Merged year frames, reloaded per year when the processed data changes"""
+
+    def __init__(self, version_ttl=2.0, max_bytes=None):
+        self.version_ttl = version_ttl
+        self._lock = threading.Lock()
+        self._versions = None
+        self._checked = 0.0
+        self._frames = BoundedCache('api_frames', max_bytes_from_env() if max_bytes is None else max_bytes)
+        self._history = None
+        self._crosswalk = None
+
+    def _refresh(self):
+        """Current versions (see watcher.data_versions), re-fingerprinted at most every version_ttl seconds"""
+        now = time.monotonic()
+        if self._versions is None or now - self._checked > self.version_ttl:
+            versions = data_versions()
+            with self._lock:
+                if self._versions is not None and versions != self._versions:
+                    years, stale = changed_versions(self._versions, versions)
+                    # Frames of years whose files did not change stay cached
+                    self._frames.invalidate(lambda key: key[0] in stale)
+                    if versions['shared'] != self._versions['shared']:
+                        self._history = None
+                        self._crosswalk = None
+                    logger.info("Processed data changed for years %s", ', '.join(years) or '(shared files only)')
+                self._versions = versions
+                self._checked = now
+        return self._versions
+
+    def version(self):
+        """Current data version"""
+        return self._refresh()['data']
+
+    def year_frame(self, year):
+        """Merged analysis frame for one year code"""
+        version = self._refresh()['years'].get(year)
+        if version is None:
+            raise ApiError(400, f"Unknown year '{year}'")
+        df = self._frames.get((version, year), None)
+        if df is None:
+            with self._lock:
+                df = read_snapshot_year(year)
+                if df is None:
+                    if self._history is None:
+                        self._history = read_institution_history()
+                        self._crosswalk = read_crosswalk()
+                    df = merge_year(year, self._history, self._crosswalk)
+            df['total_aid'] = df['total_pell_amount'] + df['total_loan_amount']
+            self._frames.put((version, year), df)
+        return df
+
+    def stats(self):
+        return self._frames.stats()
+
+class ResponseCache:
+    """Thread-safe LRU cache of encoded responses"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {'name': 'responses', 'entries': len(self._entries),
+                    'max_entries': self.max_entries, 'hits': self.hits, 'misses': self.misses}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+def _records(df):
+    """Convert a frame to JSON-ready records with nulls for missing values"""
+    return json.loads(df.to_json(orient='records'))
+
+def _param(params, name, default=None):
+    values = params.get(name)
+    return values[0] if values else default
+
+def _metric(params, name='metric', default='total_pell_amount'):
+    metric = _param(params, name, default)
+    if metric not in METRICS:
+        raise ApiError(400, f"Unknown metric '{metric}'; expected one of {', '.join(METRICS)}")
+    return metric
+
+def _int_param(params, name, default, minimum, maximum):
+    try:
+        value = int(_param(params, name, default))
+    except ValueError:
+        raise ApiError(400, f"'{name}' must be an integer")
+    return max(minimum, min(value, maximum))
+
+def get_years(store, params):
+    """Available academic years, newest first"""
+    return [{'label': label, 'year': code} for label, code in YEAR_OPTIONS.items()]
+
+def get_top(store, params):
+    """Top N institutions by a metric for one year, optionally within a sector"""
+    year = _param(params, 'year', default_year())
+    metric = _metric(params)
+    n = _int_param(params, 'n', 10, 1, MAX_TOP_N)
+    sector = _param(params, 'sector')
+
+    df = store.year_frame(year)
+    if sector:
+        df = df[df['sector'] == sector]
+    top = df.nlargest(n, metric)
+    columns = ['unit_id', 'institution_name', 'state', 'sector', 'total_undergrad', metric]
+    if metric != 'grad_rate_2023':
+        columns.append('grad_rate_2023')
+    return {'year': year, 'metric': metric, 'sector': sector,
+            'institutions': _records(top[list(dict.fromkeys(columns))])}
+
+def get_series(store, params, unit_id):
+    """One institution's metrics across all years, oldest first"""
+    metrics = _param(params, 'metrics', 'total_pell_amount,total_loan_amount,total_aid').split(',')
+    for metric in metrics:
+        _metric({'metric': [metric]})
+
+    rows = []
+    name = None
+    for label, year in reversed(YEAR_OPTIONS.items()):
+        df = store.year_frame(year)
+        inst = df[df['unit_id'] == unit_id]
+        if len(inst):
+            name = inst['institution_name'].iloc[0]
+            row = {'label': label, 'year': year}
+            row.update(_records(inst[metrics])[0])
+            rows.append(row)
+    if not rows:
+        raise ApiError(404, f"Unknown unit_id {unit_id}")
+    return {'unit_id': unit_id, 'institution_name': name, 'series': rows}
+
+def get_sectors(store, params):
+    """Sector totals and per-student amounts for one year"""
+    year = _param(params, 'year', default_year())
+    metric = _metric(params)
+    if metric not in SUMMABLE_METRICS:
+        raise ApiError(400, f"Sector rollups need a summable metric: {', '.join(SUMMABLE_METRICS)}")
+
+    df = store.year_frame(year)
+    rollup = df.groupby('sector', observed=True).agg(
+        institutions=('unit_id', 'size'),
+        total_undergrad=('total_undergrad', 'sum'),
+        total=(metric, 'sum')
+    ).reset_index()
+    rollup['per_student'] = rollup['total'] / rollup['total_undergrad']
+    rollup = rollup.sort_values('total', ascending=False)
+    return {'year': year, 'metric': metric, 'sectors': _records(rollup)}
+
+def route(store, path, params):
+    """Dispatch a request path to its endpoint"""
+    parts = [part for part in path.split('/') if part]
+    if parts == ['years']:
+        return get_years(store, params)
+    if parts == ['top']:
+        return get_top(store, params)
+    if parts == ['sectors']:
+        return get_sectors(store, params)
+    if len(parts) == 3 and parts[0] == 'institutions' and parts[2] == 'series':
+        try:
+            unit_id = int(parts[1])
+        except ValueError:
+            raise ApiError(400, "unit_id must be an integer")
+        return get_series(store, params, unit_id)
+    raise ApiError(404, f"Unknown endpoint '{path}'")
+
+def make_handler(store, cache):
+    """Build a request handler bound to a data store and response cache"""
+
+    class ApiHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            params = parse_qs(url.query)
+            if url.path.rstrip('/') == '/export/panel':
+                self._send_export(params)
+                return
+            if url.path.rstrip('/') == '/stats':
+                # Never cached: operators poll this for live memory and hit rates
+                stats = [store.stats(), cache.stats()] + cache_stats()
+                self._send(200, json.dumps({'version': store.version(), 'caches': stats}).encode())
+                return
+            # Normalized key: parameter order and repeats don't create new entries
+            key = (url.path.rstrip('/') or '/', tuple(sorted((k, v[0]) for k, v in params.items())))
+            version = store.version()
+
+            entry = cache.get((version, key))
+            if entry is None:
+                try:
+                    body = json.dumps(route(store, url.path, params)).encode()
+                except ApiError as e:
+                    self._send(e.status, json.dumps({'error': str(e)}).encode())
+                    return
+                except Exception:
+                    logger.exception("Error serving %s", self.path)
+                    self._send(500, json.dumps({'error': 'Internal error'}).encode())
+                    return
+                etag = '"' + hashlib.sha1(f"{version}{key}".encode()).hexdigest()[:20] + '"'
+                entry = (etag, body, gzip.compress(body, compresslevel=5))
+                cache.put((version, key), entry)
+
+            etag, body, compressed = entry
+            if self.headers.get('If-None-Match') == etag:
+                self._send(304, b'', etag=etag)
+            elif 'gzip' in self.headers.get('Accept-Encoding', ''):
+                self._send(200, compressed, etag=etag, encoding='gzip')
+            else:
+                self._send(200, body, etag=etag)
+
+        def _send_export(self, params):
+            """Stream the full panel export from its cached file"""
+            fmt = _param(params, 'format', 'csv')
+            if fmt not in FORMATS:
+                self._send(400, json.dumps({'error': f"Unknown format '{fmt}'"}).encode())
+                return
+            years = [year for year in _param(params, 'years', '').split(',') if year]
+            metrics = [metric for metric in _param(params, 'metrics', '').split(',') if metric]
+            try:
+                path = export_panel(fmt, years or None, metrics or None)
+            except ValueError as e:
+                self._send(400, json.dumps({'error': str(e)}).encode())
+                return
+            except Exception:
+                logger.exception("Error generating export %s", self.path)
+                self._send(500, json.dumps({'error': 'Internal error'}).encode())
+                return
+
+            etag = '"' + os.path.splitext(os.path.basename(path))[0] + '"'
+            if self.headers.get('If-None-Match') == etag:
+                self._send(304, b'', etag=etag)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', FORMATS[fmt])
+            self.send_header('Content-Length', str(os.path.getsize(path)))
+            self.send_header('Content-Disposition', f'attachment; filename="ipeds_panel.{fmt}"')
+            self.send_header('ETag', etag)
+            self.end_headers()
+            for chunk in iter_file(path):
+                self.wfile.write(chunk)
+
+        def _send(self, status, body, etag=None, encoding=None):
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Vary', 'Accept-Encoding')
+            if etag:
+                self.send_header('ETag', etag)
+                self.send_header('Cache-Control', 'no-cache')
+            if encoding:
+                self.send_header('Content-Encoding', encoding)
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug("%s - %s", self.address_string(), format % args)
+
+    return ApiHandler
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the processed IPEDS data as a JSON API.')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to bind (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on (default: 8000)')
+    parser.add_argument('--cache-entries', type=int, default=1024,
+                        help='Maximum number of cached responses (default: 1024)')
+    parser.add_argument('--preload', action='store_true',
+                        help='Load every year before accepting requests')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    store = DataStore()
+    if args.preload:
+        for year in YEAR_OPTIONS.values():
+            store.year_frame(year)
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(store, ResponseCache(args.cache_entries)))
+    logger.info("Serving IPEDS API on http://%s:%d", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
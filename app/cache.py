@@ -0,0 +1,264 @@
+"""
+Process-wide, memory-bounded LRU cache for loaded data frames.
+
+Streamlit's st.cache_data keeps every entry until the server restarts. This
+cache holds entries up to a byte budget instead, evicting the least recently
+used ones first, and counts hits, misses and evictions so the memory used by
+a dashboard process can be capped and observed.
+
+Configured through environment variables:
+
+    IPEDS_CACHE_MAX_BYTES   Byte budget per cache, e.g. 536870912, 512MB, 2GB
+                            (default: 1GB; 0 disables caching)
+    IPEDS_LOAD_WORKERS      Threads loading cache misses concurrently
+                            (default: 8)
+"""
+import functools
+import logging
+import os
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 1 << 30
+
+# Returned by BoundedCache.get on a miss, so None can be cached like any value
+_MISSING = object()
+
+_UNITS = {'': 1, 'B': 1, 'K': 1 << 10, 'KB': 1 << 10, 'M': 1 << 20, 'MB': 1 << 20,
+          'G': 1 << 30, 'GB': 1 << 30}
+
+def parse_bytes(value):
+    """Parse a byte size such as '1073741824', '512MB' or '2GB'"""
+    text = str(value).strip().upper()
+    number = text.rstrip('KMGB')
+    unit = text[len(number):]
+    if unit not in _UNITS or not number.strip():
+        raise ValueError(f"Invalid byte size '{value}'")
+    return int(float(number) * _UNITS[unit])
+
+def entry_size(value):
+    """Approximate memory held by a cached value, in bytes"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(entry_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(entry_size(v) for v in value)
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if hasattr(value, 'to_plotly_json'):
+        # Plotly figures: their serialized size, which is what they hold
+        return len(value.to_json())
+    return sys.getsizeof(value)
+
+class BoundedCache:
+    """Thread-safe LRU cache with a byte budget"""
+
+    def __init__(self, name, max_bytes=DEFAULT_MAX_BYTES):
+        self.name = name
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=_MISSING):
+        """Return the cached value for key, or default (the _MISSING sentinel) on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """Cache a value, evicting least recently used entries to stay within budget"""
+        size = entry_size(value)
+        if size > self.max_bytes:
+            logger.info("Not caching %s %r: %d bytes exceeds the %d byte budget",
+                        self.name, key, size, self.max_bytes)
+            return
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                evicted, (_, evicted_size) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+                logger.info("Evicted %s %r (%d bytes)", self.name, evicted, evicted_size)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def invalidate(self, predicate):
+        """Drop the entries whose key matches predicate; returns how many"""
+        with self._lock:
+            stale = [key for key in self._entries if predicate(key)]
+            for key in stale:
+                self.bytes -= self._entries.pop(key)[1]
+        if stale:
+            logger.info("Invalidated %d %s entries", len(stale), self.name)
+        return len(stale)
+
+    def stats(self):
+        """Hit, miss and eviction counts and current memory use"""
+        with self._lock:
+            return {
+                'name': self.name,
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+def max_bytes_from_env():
+    """Byte budget configured by IPEDS_CACHE_MAX_BYTES"""
+    value = os.environ.get('IPEDS_CACHE_MAX_BYTES')
+    return DEFAULT_MAX_BYTES if value is None else parse_bytes(value)
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_cache(name):
+    """Return the process-wide cache with the given name, creating it on first use"""
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = BoundedCache(name, max_bytes_from_env())
+        return _caches[name]
+
+def cache_stats():
+    """Stats of every cache in this process"""
+    with _caches_lock:
+        caches = list(_caches.values())
+    return [cache.stats() for cache in caches]
+
+def invalidate_versions(versions):
+    """
+    Drop every cached entry keyed on one of the given data versions.
+
+    Cache keys end with (or contain) the version of the files they were
+    built from, so only entries built from files that changed are removed.
+
+    Returns:
+        int: Number of entries removed across all caches
+    """
+    versions = set(versions)
+    with _caches_lock:
+        caches = list(_caches.values())
+    return sum(cache.invalidate(lambda key: isinstance(key, tuple) and
+                                any(isinstance(part, str) and part in versions for part in key))
+               for cache in caches)
+
+_executor = None
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def _get_executor():
+    global _executor
+    with _inflight_lock:
+        if _executor is None:
+            workers = int(os.environ.get('IPEDS_LOAD_WORKERS', 8))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ipeds-load')
+        return _executor
+
+def _load_into(cache, cache_key, func, args, future):
+    try:
+        value = func(*args)
+        cache.put(cache_key, value)
+        future.set_result(value)
+    except Exception as e:
+        future.set_exception(e)
+    finally:
+        with _inflight_lock:
+            _inflight.pop((cache.name, cache_key), None)
+
+def load_many(cache, func, key, calls):
+    """
+    Resolve several calls of a cached loader at once.
+
+    Hits are taken from the cache immediately; misses are loaded
+    concurrently on a shared thread pool. A miss already being loaded by
+    another session is awaited rather than loaded twice.
+
+    Returns:
+        list: Cached values in the order of calls
+    """
+    values = []
+    for args in calls:
+        cache_key = key(*args) if key else args
+        value = cache.get(cache_key)
+        if value is _MISSING:
+            with _inflight_lock:
+                value = _inflight.get((cache.name, cache_key), _MISSING)
+                if value is _MISSING:
+                    value = Future()
+                    _inflight[(cache.name, cache_key)] = value
+                    submit = True
+                else:
+                    submit = False
+            if submit:
+                # Registered before submitting, so the load can't finish and
+                # deregister before other callers are able to find it
+                _get_executor().submit(_load_into, cache, cache_key, func, args, value)
+        values.append(value)
+    return [value.result() if isinstance(value, Future) else value for value in values]
+
+def _copy(value):
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    return value.copy() if isinstance(value, (pd.DataFrame, pd.Series)) else value
+
+def bounded_cache(name, key=None, copy=True):
+    """
+    Decorate a loader so its results are kept in the named bounded cache.
+
+    Args:
+        name (str): Cache name, shared by everything decorated with it
+        key (callable): Builds the cache key from the call arguments
+                        (default: the positional arguments)
+        copy (bool): Copy cached frames on the way out
+
+    Cached frames are copied on the way out, as st.cache_data does, so
+    callers can add columns without changing what other sessions see.
+    With copy=False every caller shares the cached value, as with
+    st.cache_resource, and must not modify it.
+
+    The decorated function gains a .many(calls) method taking a list of
+    argument tuples; see load_many.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            cache = get_cache(name)
+            cache_key = key(*args) if key else args
+            value = cache.get(cache_key)
+            if value is _MISSING:
+                value = func(*args)
+                cache.put(cache_key, value)
+            return _copy(value) if copy else value
+
+        def many(calls):
+            values = load_many(get_cache(name), func, key, calls)
+            return [_copy(value) for value in values] if copy else values
+
+        wrapper.many = many
+        return wrapper
+    return decorator
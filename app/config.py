@@ -1,75 +1,217 @@
 import streamlit as st
 import pandas as pd
-import os
-
-# Constants
-YEAR_OPTIONS = {
-    "2022-23": "2223",
-    "2021-22": "2122",
-    "2020-21": "2021",
-    "2019-20": "2020",
-    "2018-19": "2019",
-    "2017-18": "2018",
-    "2016-17": "2017",
-    "2015-16": "2016",
-    "2014-15": "2015",
-    "2013-14": "2014",
-    "2012-13": "2013",
-    "2011-12": "2012",
-    "2010-11": "2011",
-    "2009-10": "2010",
-    "2008-09": "2009"
-}
+import logging
+import numbers
+from cache import bounded_cache, invalidate_versions
+from aggregates import (
+    build_distributions,
+    build_state_rollup,
+    build_peer_features,
+    build_trend_panel,
+    index_trends,
+    peer_index,
+    read_aggregate,
+    TREND_COLUMNS
+)
+from exports import FORMATS
+from watcher import start_watcher
+from data_loader import (
+    YEAR_OPTIONS,
+    academic_year_end,
+    read_institution_history,
+    institution_attributes,
+    read_crosswalk,
+    merge_year,
+    read_snapshot_year,
+    filter_options,
+    read_filter_options,
+    build_panel,
+    downcast,
+    data_version,
+    shared_version,
+    year_version
+)
 
-@st.cache_data
-def load_data(year):
-    """Load and cache the financial aid and institutions data"""
+logger = logging.getLogger(__name__)
+
+@bounded_cache('frames', key=lambda: ('institution_history', shared_version()))
+def load_institution_history():
+    """Load institution attribute versions with their valid year ranges"""
+    return read_institution_history()
+
+def get_institution_attributes(academic_year):
+    """Select the institution attribute version valid in the given academic year"""
+    return institution_attributes(load_institution_history(), academic_year)
+
+def _frame_key(year, columns=None):
+    return (year, tuple(columns) if columns else None, year_version(year))
+
+@bounded_cache('frames', key=_frame_key)
+def load_data(year, columns=None):
+    """Load and cache the financial aid and institutions data
+    
+    Held in a byte-bounded LRU cache shared by all sessions (see cache.py)
+    rather than st.cache_data, so resident memory stays within
+    IPEDS_CACHE_MAX_BYTES however many years are browsed. Keying on the
+    year's version (data_loader.year_version) means reprocessed files are
+    picked up without a restart, while adding or reprocessing another year
+    leaves this year's entries valid.
+    
+    Views pass the columns they use (see each view's COLUMNS); only those
+    are decoded and kept, and numeric columns are downcast to the smallest
+    types that hold them exactly (data_loader.downcast). unit_id is always
+    included. Without columns the whole frame is returned.
+    """
+    if columns is not None:
+        columns = ['unit_id'] + [col for col in columns if col != 'unit_id']
     try:
-        # Going up from app directory to main directory
-        current_dir = os.path.dirname(os.path.dirname(__file__))
-        
-        # Load financial aid data
-        finaid_path = os.path.join(current_dir, 'processed', f'financial_aid_{year}.parquet')
-        df_finaid = pd.read_parquet(finaid_path)
-        
-        # Drop institution_name from financial aid data if it exists
-        if 'institution_name' in df_finaid.columns:
-            df_finaid = df_finaid.drop('institution_name', axis=1)
-        
-        # Load institutions data
-        inst_path = os.path.join(current_dir, 'processed', 'institutions.parquet')
-        df_inst = pd.read_parquet(inst_path)
-        
-        # Load graduation rate data
-        grad_path = os.path.join(current_dir, 'processed', 'grad_rate_2023.parquet')
-        if os.path.exists(grad_path):
-            df_grad = pd.read_parquet(grad_path)
-            # Drop institution_name if it exists
-            if 'institution_name' in df_grad.columns:
-                df_grad = df_grad.drop('institution_name', axis=1)
-        else:
-            df_grad = None
-        
-        # Merge the datasets
-        df = df_finaid.merge(
-            df_inst[['unit_id', 'institution_name', 'state', 'sector', 
-                     'degree_granting', 'control', 'level']], 
-            on='unit_id', 
-            how='left'
-        )
-        
-        # Add graduation rate if available
-        if df_grad is not None:
-            df = df.merge(df_grad[['unit_id', 'grad_rate_2023']], 
-                         on='unit_id', how='left')
-        
-        return df
-        
-    except Exception as e:
-        print(f"Error loading data for year {year}:")
-        print(f"Error message: {str(e)}")
+        # Pre-merged snapshot written by prep/prepare_snapshot.py, if current
+        df = read_snapshot_year(year, columns)
+        if df is None:
+            df = merge_year(year, load_institution_history(), load_crosswalk())
+            if columns is not None:
+                df = df[[col for col in columns if col in df.columns]]
+        if columns is not None:
+            missing = [col for col in columns if col not in df.columns]
+            if missing:
+                # Usually a typo in a view's COLUMNS or an outdated snapshot;
+                # the view fails later with a KeyError on these
+                logger.warning("Year %s is missing requested columns: %s",
+                               year, ', '.join(missing))
+        return downcast(df)
+    except Exception:
+        logger.exception("Error loading data for year %s", year)
         raise
 
+def load_years(years, columns=None):
+    """Load several years at once, in the order given
+    
+    Cached years are returned without waiting; the rest are read and merged
+    concurrently on a thread pool (see cache.load_many).
+    
+    Returns:
+        dict: Year code -> DataFrame
+    """
+    years = list(years)
+    return dict(zip(years, load_data.many([(year, columns) for year in years])))
+
+@bounded_cache('frames', key=lambda: ('crosswalk', shared_version()))
+def load_crosswalk():
+    """Load the institution crosswalk indexed by (year, unit_id), or None if not built"""
+    return read_crosswalk()
+
+def get_institution_labels(year):
+    """Map unit_id to an unambiguous display name for the given year"""
+    return _institution_labels(year, year_version(year))
+
+@st.cache_data
+def _institution_labels(year, version):
+    crosswalk = load_crosswalk()
+    if crosswalk is None:
+        df = load_data(year)
+        return dict(zip(df['unit_id'], df['institution_name']))
+    return crosswalk.xs(year, level='year')['display_name'].to_dict()
+
+# Values built from every year are kept in their own bounded cache, keyed by
+# name and data version; entries of replaced versions are dropped by the data
+# watcher or evicted within IPEDS_CACHE_MAX_BYTES
+def _aggregate_key(name):
+    return lambda version: (name, version)
+
+@bounded_cache('aggregates', key=_aggregate_key('panel'))
+def load_panel(version):
+    """Load every year once as a unit_id x year x metric array (see data_loader.build_panel)
+    
+    version is the data version; it only keys the cache.
+    """
+    frames = load_years(reversed(YEAR_OPTIONS.values()))
+    return build_panel(frames)
+
+@bounded_cache('aggregates', key=_aggregate_key('distributions'))
+def load_distributions(version):
+    """Load the precomputed histograms, quantiles and Pell Lorenz curves
+    
+    version is the data version; it only keys the cache. When prep has not
+    built current aggregates they are computed from the loaded years.
+    """
+    names = ['histograms', 'quantiles', 'lorenz']
+    distributions = {name: read_aggregate(f'distribution_{name}') for name in names}
+    if any(df is None for df in distributions.values()):
+        frames = load_years(reversed(YEAR_OPTIONS.values()))
+        distributions = build_distributions(frames)
+    return distributions
+
+@bounded_cache('aggregates', key=_aggregate_key('state_rollup'))
+def load_state_rollup(version):
+    """Load the precomputed state x year x sector totals (version keys the cache)"""
+    rollup = read_aggregate('state_rollup')
+    if rollup is None:
+        frames = load_years(reversed(YEAR_OPTIONS.values()))
+        rollup = build_state_rollup(frames)
+    return rollup
+
+@bounded_cache('aggregates', key=_aggregate_key('trends'), copy=False)
+def load_trends(version):
+    """Load the historical trends panel and latest-year ranking (version keys the cache)
+    
+    Shared between sessions rather than copied per rerun; callers must not
+    modify it. Arranged so the top institutions' rows are a positional slice
+    (see aggregates.top_trends).
+    """
+    trends = {name: read_aggregate(f'trend_{name}') for name in ['panel', 'ranking']}
+    if any(df is None for df in trends.values()):
+        frames = load_years(reversed(YEAR_OPTIONS.values()), TREND_COLUMNS)
+        trends = build_trend_panel(frames)
+    return index_trends(trends)
+
+@bounded_cache('aggregates', key=_aggregate_key('peer_index'), copy=False)
+def load_peer_index(version):
+    """Load the peer finder's feature matrix as {year: (unit_ids, matrix)}
+    
+    Shared between sessions so lookups reuse the same arrays without
+    copying; they are never modified. version only keys the cache.
+    """
+    features = read_aggregate('peer_features')
+    if features is None:
+        frames = load_years(reversed(YEAR_OPTIONS.values()))
+        features = build_peer_features(frames)
+    return peer_index(features)
+
+def _normalize_param(value):
+    """Canonical form of a view parameter, so equal choices give equal keys"""
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    if isinstance(value, numbers.Real):
+        return int(value) if float(value).is_integer() else float(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize_param(v) for v in value)
+    return value
+
+def result_key(view, *params, per_year=False):
+    """Results cache key: the view, its normalized parameters and the data version
+    
+    With per_year the first parameter is a year code and only that year's
+    version is used (see data_loader.year_version).
+    """
+    version = year_version(params[0]) if per_year else data_version()
+    return (view,) + tuple(_normalize_param(p) for p in params) + (version,)
+
+def cached_result(view, per_year=False):
+    """Keep a view's computed results in the process-wide 'results' cache
+    
+    The decorated function takes the view's parameters (year code, sector,
+    N...) and returns what the page displays: figures, formatted tables and
+    totals. Results are shared by every session, so the popular choices are
+    computed once; keying on the data version means reprocessed data is
+    never served from an old entry. Views whose results come from a single
+    year pass per_year=True with the year code as first parameter, so
+    their entries for other years survive a new or reprocessed year. The
+    cache has its own IPEDS_CACHE_MAX_BYTES budget (see cache.py).
+    """
+    return bounded_cache('results', key=lambda *params: result_key(view, *params, per_year=per_year))
+
 def format_value(value, type='currency'):
     """Format values for display without decimals"""
     if pd.isnull(value):
@@ -83,9 +225,59 @@ def format_value(value, type='currency'):
         return f"{int(value)}%" if pd.notnull(value) else ""
     return value
 
+def show_download(label, file_stem, key, params, prepare):
+    """Offer a download that is only generated when the user clicks it
+    
+    prepare(fmt) must return the path of the generated file; see exports.py.
+    The file is generated (or reused) and read when the button is clicked,
+    not on every rerun. Streamlit serves the download from memory, so the
+    whole file is held while it is sent; only the JSON API streams exports
+    from disk. A callable data and on_click='ignore' need streamlit>=1.52.
+    """
+    fmt = st.selectbox(f"{label} format", list(FORMATS), format_func=str.upper,
+                       key=f'{key}_format')
+    
+    def generate():
+        with open(prepare(fmt), 'rb') as f:
+            return f.read()
+    
+    st.download_button(
+        label=f"Download {label}",
+        data=generate,
+        file_name=f"{file_stem}.{fmt}",
+        mime=FORMATS[fmt],
+        key=f'{key}_download',
+        on_click='ignore'
+    )
+
+def get_filter_options(year):
+    """Sector, state, control and level values present in the given year
+    
+    Read from the dataset metadata written by prep/prepare_snapshot.py; only
+    derived from the year's data when the metadata is missing or stale.
+    """
+    return _filter_options(year, year_version(year))
+
 @st.cache_data
-def get_sector_options(df):
+def _filter_options(year, version):
+    options = read_filter_options(year)
+    if options is None:
+        options = filter_options(load_data(year))
+    return options
+
+def get_sector_options(year):
     """Get unique sector values for filtering, excluding Administrative Unit"""
-    sectors = sorted([sector for sector in df['sector'].unique() 
-                     if sector != 'Administrative Unit'])
-    return ['All Sectors'] + sectors
\ No newline at end of file
+    sectors = [sector for sector in get_filter_options(year)['sector']
+               if sector != 'Administrative Unit']
+    return ['All Sectors'] + sectors
+
+def _data_changed(years, stale_versions):
+    """Drop the cache entries built from processed files that changed"""
+    removed = invalidate_versions(stale_versions)
+    logger.info("Years %s changed: dropped %d cached frames, aggregates and results",
+                ', '.join(years) or '(shared files)', removed)
+
+@st.cache_resource
+def start_data_watcher():
+    """Start the process-wide watcher for newly processed years (see watcher.py)"""
+    return start_watcher(_data_changed)
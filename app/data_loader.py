@@ -0,0 +1,415 @@
+import functools
+import hashlib
+import glob
+import json
+import logging
+import os
+import re
+from collections.abc import Mapping
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+# Going up from app directory to main directory
+PROCESSED_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'processed')
+
+# Written by prep/parquet_writer.py: every processed file with its dataset,
+# year, rows and size, registered once the file is completely written
+MANIFEST_PATH = os.path.join(PROCESSED_DIR, 'manifest.json')
+FINANCIAL_AID_FILE = re.compile(r'^financial_aid_(\d{4})\.parquet$')
+
+INSTITUTION_COLUMNS = ['unit_id', 'institution_name', 'state', 'sector',
+                       'degree_granting', 'control', 'level']
+
+def academic_year_end(year):
+    """Convert a year code ('2223', '2019') to the calendar year the academic year ends in"""
+    code = int(year)
+    return code if code < 2100 else 2000 + code % 100
+
+def year_label(year):
+    """Display label of a year code: '2223' -> '2022-23', '2019' -> '2018-19'"""
+    end = academic_year_end(year)
+    return f"{end - 1}-{end % 100:02d}"
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+@functools.lru_cache(maxsize=1)
+def _discover_years(manifest_mtime, directory_mtime):
+    years = []
+    if manifest_mtime is not None:
+        with open(MANIFEST_PATH) as f:
+            manifest = json.load(f)
+        years = [entry['year'] for name, entry in manifest.get('files', {}).items()
+                 if entry.get('dataset') == 'financial_aid' and entry.get('year')
+                 and os.path.exists(os.path.join(PROCESSED_DIR, name))]
+    if not years and directory_mtime is not None:
+        # No manifest yet: fall back to the financial aid files themselves
+        years = [match.group(1) for match in map(FINANCIAL_AID_FILE.match, os.listdir(PROCESSED_DIR))
+                 if match]
+    years = sorted(set(years), key=academic_year_end, reverse=True)
+    return {year_label(year): year for year in years}
+
+def discover_years():
+    """
+    Academic year label -> year code for every processed financial aid year.
+
+    Read from the processed-data manifest, newest first, and re-read only
+    when the manifest or the processed directory changes.
+    """
+    return _discover_years(_mtime(MANIFEST_PATH), _mtime(PROCESSED_DIR))
+
+class YearOptions(Mapping):
+    """
+    Live mapping of academic year labels to year codes, newest first.
+
+    Every lookup goes through discover_years(), so a year processed while
+    the app runs appears in every selector on the next rerun, without
+    editing code or restarting.
+    """
+
+    def __getitem__(self, label):
+        return discover_years()[label]
+
+    def __iter__(self):
+        return iter(discover_years())
+
+    def __len__(self):
+        return len(discover_years())
+
+    # Views of the current dict, so reversed() works as it does on a dict
+    def keys(self):
+        return discover_years().keys()
+
+    def values(self):
+        return discover_years().values()
+
+    def items(self):
+        return discover_years().items()
+
+    def __repr__(self):
+        return f"YearOptions({discover_years()!r})"
+
+YEAR_OPTIONS = YearOptions()
+
+def read_institution_history():
+    """Read institution attribute versions with their valid year ranges"""
+    history_path = os.path.join(PROCESSED_DIR, 'institutions_history.parquet')
+    if os.path.exists(history_path):
+        return pd.read_parquet(history_path)
+
+    # Fall back to the single directory snapshot, valid for every year
+    inst_path = os.path.join(PROCESSED_DIR, 'institutions.parquet')
+    df_inst = pd.read_parquet(inst_path)
+    return df_inst.assign(valid_from=0, valid_to=9999)
+
+def institution_attributes(history, academic_year):
+    """Select the institution attribute version valid in the given academic year"""
+    valid = (history['valid_from'].values <= academic_year) & (history['valid_to'].values >= academic_year)
+    return history[valid]
+
+def read_crosswalk():
+    """Read the institution crosswalk indexed by (year, unit_id), or None if not built"""
+    crosswalk_path = os.path.join(PROCESSED_DIR, 'institution_crosswalk.parquet')
+    if not os.path.exists(crosswalk_path):
+        return None
+
+    crosswalk = pd.read_parquet(crosswalk_path)
+    return crosswalk.set_index(['year', 'unit_id']).sort_index()
+
+def read_grad_rates():
+    """Read graduation rates, or None if they have not been processed"""
+    grad_path = os.path.join(PROCESSED_DIR, 'grad_rate_2023.parquet')
+    if not os.path.exists(grad_path):
+        return None
+    df_grad = pd.read_parquet(grad_path)
+    # Drop institution_name if it exists
+    if 'institution_name' in df_grad.columns:
+        df_grad = df_grad.drop('institution_name', axis=1)
+    return df_grad
+
+def merge_year(year, history, crosswalk):
+    """
+    Build the analysis frame for one year.
+
+    Joins the year's financial aid data with the institution attributes valid
+    in that year, the name reported that year and the graduation rate.
+    """
+    # Load financial aid data
+    finaid_path = os.path.join(PROCESSED_DIR, f'financial_aid_{year}.parquet')
+    df_finaid = pd.read_parquet(finaid_path)
+
+    # Drop institution_name from financial aid data if it exists
+    if 'institution_name' in df_finaid.columns:
+        df_finaid = df_finaid.drop('institution_name', axis=1)
+
+    # Institution attributes valid for this academic year
+    df_inst = institution_attributes(history, academic_year_end(year))
+
+    # Merge the datasets
+    df = df_finaid.merge(
+        df_inst[INSTITUTION_COLUMNS],
+        on='unit_id',
+        how='left'
+    )
+
+    # Use the name each institution reported that year, keyed on unit_id,
+    # so closed, merged or renamed institutions keep their historical name
+    if crosswalk is not None:
+        try:
+            names = crosswalk.xs(year, level='year')['institution_name']
+        except KeyError:
+            names = None
+        if names is not None:
+            df['institution_name'] = df['unit_id'].map(names).fillna(df['institution_name'])
+
+    # Add graduation rate if available
+    df_grad = read_grad_rates()
+    if df_grad is not None:
+        df = df.merge(df_grad[['unit_id', 'grad_rate_2023']],
+                     on='unit_id', how='left')
+
+    return df
+
+# Processed files every year's analysis frame is merged with
+SHARED_PATTERNS = ['institutions*.parquet', 'institution_crosswalk.parquet', 'grad_rate_*.parquet']
+# Processed files the analysis frames are built from; derived artifacts
+# (snapshots, aggregates) are excluded so rebuilding them does not change
+# the version they are stamped with
+SOURCE_PATTERNS = ['financial_aid_*.parquet'] + SHARED_PATTERNS
+
+def _fingerprint(patterns):
+    paths = set()
+    for pattern in patterns:
+        paths.update(glob.glob(os.path.join(PROCESSED_DIR, pattern)))
+
+    digest = hashlib.sha1()
+    for path in sorted(paths):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:16]
+
+def data_version():
+    """
+    Fingerprint the processed source files.
+
+    Changes whenever a source file is added, removed or rewritten, so it can
+    key caches and ETags without reading file contents.
+    """
+    return _fingerprint(SOURCE_PATTERNS)
+
+def shared_version():
+    """Fingerprint of the files every year is merged with (see SHARED_PATTERNS)"""
+    return _fingerprint(SHARED_PATTERNS)
+
+def year_version(year):
+    """
+    Fingerprint of the files one year's frame is built from.
+
+    Covers the year's financial aid file and the shared files, so it stays
+    the same when other years are added or reprocessed and entries cached
+    for this year remain valid.
+    """
+    return _fingerprint(SHARED_PATTERNS + [f'financial_aid_{year}.parquet'])
+
+SNAPSHOT_PATH = os.path.join(PROCESSED_DIR, 'analysis_snapshot.arrow')
+
+@functools.lru_cache(maxsize=1)
+def open_snapshot(snapshot_mtime):
+    """
+    Memory-map the analysis snapshot.
+
+    The mapping is read-only, so every process on the host shares the same
+    page-cache pages. Returns (reader, {year: batch index}, {year: version
+    the batch was built from}) or None.
+    """
+    if snapshot_mtime is None:
+        return None
+    try:
+        reader = pa.ipc.open_file(pa.memory_map(SNAPSHOT_PATH, 'r'))
+    except (OSError, pa.ArrowInvalid):
+        logger.warning("Ignoring unreadable snapshot %s", SNAPSHOT_PATH)
+        return None
+
+    metadata = reader.schema.metadata or {}
+    years = json.loads(metadata[b'ipeds.years'])
+    if b'ipeds.year_versions' in metadata:
+        versions = json.loads(metadata[b'ipeds.year_versions'])
+    else:
+        # Snapshots from before per-year versions: every year carries the data version
+        versions = {year: metadata.get(b'ipeds.data_version', b'').decode() for year in years}
+    return reader, {year: index for index, year in enumerate(years)}, versions
+
+def read_snapshot_year(year, columns=None):
+    """Read one year's pre-merged frame from the snapshot, or None if unavailable
+    
+    A year is only read when its batch was built from the current files for
+    that year (see year_version), so adding or reprocessing another year
+    leaves the rest of the snapshot usable.
+    
+    columns limits the result to those columns; only they are decoded.
+    """
+    snapshot = open_snapshot(_mtime(SNAPSHOT_PATH))
+    if snapshot is None:
+        return None
+    reader, batches, versions = snapshot
+    if year not in batches:
+        return None
+    version = versions.get(year)
+    if version != year_version(year) and version != data_version():
+        logger.info("Snapshot batch for %s is stale; merging parquet files instead", year)
+        return None
+    batch = reader.get_batch(batches[year])
+    if columns is not None:
+        batch = batch.select([col for col in columns if col in batch.schema.names])
+    return batch.to_pandas()
+
+# Nullable integer types from smallest to largest
+INTEGER_TYPES = [('Int8', np.int8), ('Int16', np.int16), ('Int32', np.int32), ('Int64', np.int64)]
+
+def downcast(df):
+    """
+    Shrink a loaded frame to the smallest types that hold its values exactly.
+
+    - Float columns whose values are all whole numbers (counts, dollar
+      totals, whole percentages) become nullable integers, sized so that
+      twice the largest magnitude still fits: adding two columns, like
+      Pell plus loans, can't overflow, and pandas sums them as int64.
+    - Other float columns stay float64, so no value is rounded.
+    - int64 identifiers become the smallest integer type that fits.
+    - Repetitive string columns (sector, state, control...) become
+      categoricals.
+    """
+    df = df.copy()
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_float_dtype(series.dtype):
+            values = series.to_numpy(dtype=float, na_value=np.nan)
+            values = values[~np.isnan(values)]
+            if not len(values) or not np.all(values == np.round(values)):
+                continue
+            bound = 2 * np.abs(values).max()
+            for name, np_type in INTEGER_TYPES:
+                if bound <= np.iinfo(np_type).max:
+                    df[col] = series.astype(name)
+                    break
+        elif pd.api.types.is_integer_dtype(series.dtype) and not pd.api.types.is_extension_array_dtype(series.dtype):
+            df[col] = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_string_dtype(series.dtype) or series.dtype == object:
+            if series.nunique() <= len(series) // 2:
+                df[col] = series.astype('category')
+    return df
+
+def numeric_values(series):
+    """A numeric column as a float64 array with NaN for missing values"""
+    return pd.to_numeric(series, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+# Small JSON written next to the snapshot by prep/prepare_snapshot.py. Like
+# the snapshot it is derived and not kept in the repository: its versions
+# come from file modification times, which differ in every checkout, so
+# prepare_snapshot.py must be run after cloning or the filter options are
+# derived from the loaded data.
+METADATA_PATH = os.path.join(PROCESSED_DIR, 'dataset_metadata.json')
+
+FILTER_COLUMNS = ['sector', 'state', 'control', 'level']
+
+def filter_options(df):
+    """Sorted distinct values of each filter column in an analysis frame"""
+    return {col: sorted(str(value) for value in df[col].dropna().unique())
+            for col in FILTER_COLUMNS if col in df.columns}
+
+@functools.lru_cache(maxsize=1)
+def _read_metadata(metadata_mtime):
+    if metadata_mtime is None:
+        return None
+    with open(METADATA_PATH) as f:
+        return json.load(f)
+
+def read_metadata():
+    """Read the dataset metadata, or None if it has not been built"""
+    return _read_metadata(_mtime(METADATA_PATH))
+
+def read_filter_options(year):
+    """Precomputed filter options for one year code, or None if unavailable or stale"""
+    metadata = read_metadata()
+    if metadata is None:
+        return None
+    entry = metadata['years'].get(year, {})
+    # Metadata from before per-year versions carries only the data version
+    version = entry.get('version', metadata.get('data_version'))
+    if version != year_version(year) and version != data_version():
+        logger.info("Dataset metadata for %s is stale; deriving filters from the data", year)
+        return None
+    return entry.get('filters')
+
+YEARLY_METRICS = [
+    'total_undergrad', 'num_pell_grant', 'pct_pell_grant', 'total_pell_amount',
+    'avg_pell_amount', 'num_fed_loan', 'pct_fed_loan', 'total_loan_amount',
+    'avg_loan_amount', 'total_aid'
+]
+
+def build_panel(frames, metrics=YEARLY_METRICS):
+    """
+    Stack yearly analysis frames into a dense unit_id x year x metric array.
+
+    Missing institution-years are NaN. Ranks (1 = largest, ties share the
+    best rank) are computed once for every year and metric, so comparisons
+    between any years are plain array arithmetic.
+
+    Args:
+        frames (dict): Year code -> analysis frame, oldest first
+        metrics (list): Metric columns to include; 'total_aid' is derived
+
+    Returns:
+        dict: 'unit_id' (sorted ids), 'years', 'metrics', 'values' and 'ranks'
+              arrays of shape (units, years, metrics), and 'attributes', the
+              most recent name, state and sector of each unit in unit_id order
+    """
+    years = list(frames)
+    stacked = []
+    for year, df in frames.items():
+        df = df[['unit_id', 'institution_name', 'state', 'sector']
+                + [m for m in metrics if m != 'total_aid' and m in df.columns]].copy()
+        if 'total_aid' in metrics:
+            df['total_aid'] = df['total_pell_amount'] + df['total_loan_amount']
+        df['year_index'] = years.index(year)
+        stacked.append(df)
+    long_df = pd.concat(stacked, ignore_index=True)
+
+    unit_ids = np.unique(long_df['unit_id'].values)
+    rows = np.searchsorted(unit_ids, long_df['unit_id'].values)
+    cols = long_df['year_index'].values
+
+    values = np.full((len(unit_ids), len(years), len(metrics)), np.nan)
+    for k, metric in enumerate(metrics):
+        values[rows, cols, k] = numeric_values(long_df[metric])
+
+    ranks = np.full(values.shape, np.nan)
+    for k in range(len(metrics)):
+        ranks[:, :, k] = pd.DataFrame(values[:, :, k]).rank(
+            ascending=False, method='min').values
+
+    # Frames are oldest first, so the last row per unit is its latest
+    attributes = (long_df[['unit_id', 'institution_name', 'state', 'sector']]
+                  .drop_duplicates('unit_id', keep='last')
+                  .set_index('unit_id')
+                  .reindex(unit_ids))
+    for col in ['state', 'sector']:
+        attributes[col] = attributes[col].astype(str).where(attributes[col].notna())
+
+    return {
+        'unit_id': unit_ids,
+        'years': years,
+        'metrics': list(metrics),
+        'values': values,
+        'ranks': ranks,
+        'attributes': attributes.reset_index()
+    }
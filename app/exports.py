@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+import pyarrow as pa
+import pyarrow.parquet as pq
+from data_loader import (
+    YEAR_OPTIONS,
+    read_institution_history,
+    read_crosswalk,
+    merge_year,
+    read_snapshot_year,
+    data_version
+)
+
+# Generated artifacts are cached on disk, outside processed/, keyed by the
+# export parameters and the data version
+EXPORT_DIR = os.environ.get('IPEDS_EXPORT_DIR', os.path.join(tempfile.gettempdir(), 'ipeds_exports'))
+# Exports not requested for this many seconds are removed when a new one is written
+EXPORT_MAX_AGE = float(os.environ.get('IPEDS_EXPORT_MAX_AGE', 24 * 3600))
+
+FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+PANEL_ID_COLUMNS = ['year', 'academic_year', 'unit_id', 'institution_name', 'state', 'sector']
+PANEL_METRICS = [
+    'total_undergrad', 'num_pell_grant', 'pct_pell_grant', 'total_pell_amount',
+    'avg_pell_amount', 'num_fed_loan', 'pct_fed_loan', 'total_loan_amount',
+    'avg_loan_amount', 'grad_rate_2023'
+]
+
+CSV_CHUNK_ROWS = 5000
+STREAM_CHUNK_BYTES = 1 << 20
+
+def export_path(name, params, fmt):
+    """Cache location of an export for the given parameters and current data"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'")
+    key = json.dumps({'name': name, 'params': params, 'version': data_version()},
+                     sort_keys=True, default=str)
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    return os.path.join(EXPORT_DIR, f'{name}_{digest}.{fmt}')
+
+def prune_exports(max_age=None):
+    """
+    Remove exports that have not been requested within max_age seconds.
+
+    Reused exports have their modification time refreshed, so this only
+    removes files built from old data versions or parameters nobody asks for.
+
+    Returns:
+        int: Number of files removed
+    """
+    max_age = EXPORT_MAX_AGE if max_age is None else max_age
+    cutoff = time.time() - max_age
+    removed = 0
+    for entry in os.scandir(EXPORT_DIR) if os.path.isdir(EXPORT_DIR) else []:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            # Removed by another process or thread meanwhile
+            pass
+    return removed
+
+def _cached(path):
+    """Whether an export exists; marks it as recently requested if so"""
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+def _write_frames(frames, path, fmt):
+    """
+    Write an iterable of frames to one file without holding them all.
+
+    CSV is written in row chunks; Parquet gets one row group per frame.
+    The file is written under a unique temporary name and renamed when
+    complete, so readers never see a partial export and sessions building
+    the same export at once don't write over each other.
+
+    Raises:
+        ValueError: If frames yields nothing
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    os.close(fd)
+    writer = None
+    written = False
+    try:
+        if fmt == 'csv':
+            with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+                header = True
+                for df in frames:
+                    written = True
+                    for start in range(0, len(df), CSV_CHUNK_ROWS):
+                        df.iloc[start:start + CSV_CHUNK_ROWS].to_csv(f, index=False, header=header)
+                        header = False
+        else:
+            for df in frames:
+                written = True
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, table.schema)
+                writer.write_table(table.cast(writer.schema))
+            if writer is not None:
+                writer.close()
+                writer = None
+        if not written:
+            raise ValueError(f"No data to export to {os.path.basename(path)}")
+        os.replace(tmp_path, path)
+        prune_exports()
+    finally:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+def export_frame(name, params, fmt, build):
+    """
+    Generate an export on request, reusing a cached file when one exists.
+
+    Args:
+        name (str): Export name, used in the file name
+        params (dict): Parameters that determine the export's contents
+        fmt (str): 'csv' or 'parquet'
+        build (callable): Returns the DataFrame to export; only called on a cache miss
+
+    Returns:
+        str: Path of the generated file
+    """
+    path = export_path(name, params, fmt)
+    if not _cached(path):
+        _write_frames([build()], path, fmt)
+    return path
+
+def _panel_frames(years, metrics):
+    """Yield one long-format frame per year for the full panel"""
+    history = crosswalk = None
+    for label, year in reversed(YEAR_OPTIONS.items()):
+        if year not in years:
+            continue
+        df = read_snapshot_year(year)
+        if df is None:
+            if history is None:
+                history = read_institution_history()
+                crosswalk = read_crosswalk()
+            df = merge_year(year, history, crosswalk)
+        df = df.assign(year=year, academic_year=label)
+        yield df[PANEL_ID_COLUMNS + metrics]
+
+def export_panel(fmt, years=None, metrics=None):
+    """
+    Generate the full panel export: every institution in every year.
+
+    Years are read and written one at a time, so memory stays at one
+    year's frame regardless of the panel size.
+
+    Args:
+        fmt (str): 'csv' or 'parquet'
+        years (list): Year codes to include (default: all)
+        metrics (list): Metric columns to include (default: PANEL_METRICS)
+
+    Returns:
+        str: Path of the generated file
+
+    Raises:
+        ValueError: If a year or metric is unknown, before anything is written
+    """
+    unknown = [year for year in years or [] if year not in YEAR_OPTIONS.values()]
+    if unknown:
+        raise ValueError(f"Unknown year {', '.join(unknown)}")
+    unknown = [metric for metric in metrics or [] if metric not in PANEL_METRICS]
+    if unknown:
+        raise ValueError(f"Unknown metric {', '.join(unknown)}; expected one of {', '.join(PANEL_METRICS)}")
+    years = sorted(years or YEAR_OPTIONS.values())
+    metrics = [metric for metric in PANEL_METRICS if metric in (metrics or PANEL_METRICS)]
+    path = export_path('panel', {'years': years, 'metrics': metrics}, fmt)
+    if not _cached(path):
+        _write_frames(_panel_frames(years, metrics), path, fmt)
+    return path
+
+def iter_file(path, chunk_size=STREAM_CHUNK_BYTES):
+    """Stream a generated export in fixed-size chunks"""
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
@@ -0,0 +1,366 @@
+"""
+Headless load test simulating concurrent dashboard users.
+
+Each simulated session runs in its own thread, as Streamlit runs each
+browser session's script in its own thread, and calls the pages' show()
+functions directly in bare mode: data loading, caching, filtering and
+chart building run as in the app, without a browser or server. Widgets are
+replaced by stubs that return each session's current choices, so sessions
+navigate between pages and change years, sectors, sliders and the other
+widgets a page shows, like an analyst clicking around.
+
+Everything runs locally against the processed files. From the repository
+root:
+
+    python app/load_test.py --sessions 16 --actions 30
+    IPEDS_CACHE_MAX_BYTES=64MB python app/load_test.py --sessions 16 --json load.json
+
+Reports latency percentiles per page and action, throughput, peak resident
+memory, and the state of the byte-bounded caches (cache.py) and Streamlit's
+st.cache_data / st.cache_resource caches at the end of the run.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import resource
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+import streamlit as st
+from streamlit.logger import set_log_level
+from streamlit.runtime.caching import cache_data_api, cache_resource_api
+
+from cache import cache_stats
+from views import (home, pell_grants, federal_loans, total_aid, institution_profile,
+                   hist_trends, year_comparison, distributions, state_map)
+
+logger = logging.getLogger('load_test')
+
+# Same pages as the navigation in main.py
+PAGES = {
+    'Home': home,
+    'Institution Profile': institution_profile,
+    'Pell Grant Analysis': pell_grants,
+    'Federal Loan Analysis': federal_loans,
+    'Total Aid Analysis': total_aid,
+    'Historical Trends': hist_trends,
+    'Year Comparison': year_comparison,
+    'Aid Distributions': distributions,
+    'State Map': state_map
+}
+
+# Chance that an action moves to another page rather than changing a widget
+NAVIGATE_PROBABILITY = 0.3
+PERCENTILES = [50, 90, 95, 99]
+
+class Session:
+    """Widget state of one simulated user"""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.values = {}
+        self.widgets = {}
+        self.errors = []
+
+    def reset(self):
+        """Forget widget choices, as main.py does when the page changes"""
+        self.values = {}
+        self.widgets = {}
+
+    def widget(self, widget_id, kind, choices, default):
+        """Record a widget shown by the page and return its current value"""
+        self.widgets[widget_id] = (kind, choices)
+        value = self.values.get(widget_id, default)
+        if kind in ('selectbox', 'checkbox', 'select_slider') and value not in choices:
+            return default
+        if kind == 'multiselect':
+            return [v for v in value if v in choices]
+        if kind == 'range':
+            return value if all(v in choices for v in value) else default
+        if kind == 'slider':
+            low, high, _ = choices
+            return min(max(value, low), high)
+        return value
+
+    def change_widget(self, rnd):
+        """Pick a widget from the last run and give it a new random value"""
+        changeable = [widget_id for widget_id, (kind, choices) in self.widgets.items()
+                      if kind == 'slider' or len(choices) > 1]
+        if not changeable:
+            return None
+        widget_id = rnd.choice(changeable)
+        kind, choices = self.widgets[widget_id]
+        if kind == 'slider':
+            low, high, step = choices
+            value = rnd.randrange(low, high + 1, step)
+        elif kind == 'multiselect':
+            value = rnd.sample(choices, rnd.randint(1, min(3, len(choices))))
+        elif kind == 'range':
+            first, last = sorted(rnd.sample(range(len(choices)), 2))
+            value = (choices[first], choices[last])
+        else:
+            value = rnd.choice(choices)
+        self.values[widget_id] = value
+        return widget_id
+
+_local = threading.local()
+
+def _current():
+    return _local.session
+
+def _selectbox(label, options, index=0, format_func=str, key=None, **kwargs):
+    options = list(options)
+    default = options[index] if options and index is not None else None
+    return _current().widget(key or label, 'selectbox', options, default)
+
+def _multiselect(label, options, default=None, format_func=str, key=None, **kwargs):
+    return _current().widget(key or label, 'multiselect', list(options), list(default or []))
+
+def _slider(label, min_value=0, max_value=100, value=None, step=1, key=None, **kwargs):
+    default = min_value if value is None else value
+    return _current().widget(key or label, 'slider', (min_value, max_value, step or 1), default)
+
+def _select_slider(label, options, value=None, key=None, **kwargs):
+    options = list(options)
+    # A tuple value makes a range slider returning (first, last)
+    kind = 'range' if isinstance(value, tuple) else 'select_slider'
+    default = options[0] if value is None else value
+    return _current().widget(key or label, kind, options, default)
+
+def _checkbox(label, value=False, key=None, **kwargs):
+    return _current().widget(key or label, 'checkbox', [False, True], value)
+
+def _button(label, key=None, **kwargs):
+    # Downloads are prepared on request only; simulated users don't ask
+    return False
+
+def _error(body, *args, **kwargs):
+    _current().errors.append(str(body))
+
+def _exception(exception, *args, **kwargs):
+    _current().errors.append(repr(exception))
+
+def install_widget_stubs():
+    """Route the widgets the views use to the calling thread's Session"""
+    stubs = {'selectbox': _selectbox, 'multiselect': _multiselect, 'slider': _slider,
+             'select_slider': _select_slider, 'checkbox': _checkbox, 'button': _button,
+             'error': _error, 'exception': _exception}
+    for name, stub in stubs.items():
+        setattr(st, name, stub)
+        setattr(st.sidebar, name, stub)
+
+class RssSampler(threading.Thread):
+    """Sample the resident set size while the test runs"""
+
+    def __init__(self, interval=0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.start_rss = self.peak_rss = current_rss()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.peak_rss = max(self.peak_rss, current_rss())
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.peak_rss = max(self.peak_rss, current_rss())
+
+def current_rss():
+    """Resident set size of this process in bytes"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        # No /proc (macOS): fall back to the peak so far
+        return peak_rss()
+
+def peak_rss():
+    """Peak resident set size of this process in bytes"""
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return maxrss if maxrss > 1 << 32 else maxrss * 1024
+
+def run_session(session_id, pages, actions, seed, think_time, samples):
+    """Simulate one user for a number of actions, appending one sample per page run"""
+    rnd = random.Random(seed * 1000003 + session_id)
+    session = Session(session_id)
+    _local.session = session
+    page = None
+    for _ in range(actions):
+        action = None
+        if page is not None and rnd.random() >= NAVIGATE_PROBABILITY:
+            action = session.change_widget(rnd)
+        if action is None:
+            page = rnd.choice(pages)
+            session.reset()
+            action = 'navigate'
+
+        session.errors = []
+        start = time.perf_counter()
+        try:
+            PAGES[page].show()
+        except Exception as e:
+            session.errors.append(repr(e))
+        elapsed = time.perf_counter() - start
+        samples.append({'session': session_id, 'page': page, 'action': action,
+                        'seconds': elapsed, 'errors': session.errors})
+        if think_time:
+            time.sleep(rnd.uniform(0, think_time))
+
+def latency_summary(seconds):
+    """Count, percentiles and max of a list of durations, in milliseconds"""
+    ms = np.asarray(seconds) * 1000
+    summary = {'count': len(ms)}
+    summary.update({f'p{p}': float(np.percentile(ms, p)) for p in PERCENTILES})
+    summary['max'] = float(ms.max())
+    return summary
+
+def streamlit_cache_stats():
+    """Entries and bytes per st.cache_data / st.cache_resource function"""
+    caches = defaultdict(lambda: {'entries': 0, 'bytes': 0})
+    for provider, kind in [(cache_data_api.get_data_cache_stats_provider(), 'cache_data'),
+                           (cache_resource_api.get_resource_cache_stats_provider(), 'cache_resource')]:
+        for stats in provider.get_stats().values():
+            for stat in stats:
+                cache = caches[(kind, stat.cache_name)]
+                cache['entries'] += 1
+                cache['bytes'] += stat.byte_length
+    return [{'type': kind, 'function': name, **cache} for (kind, name), cache in sorted(caches.items())]
+
+def run_load_test(sessions=8, actions=20, pages=None, seed=0, think_time=0.0):
+    """
+    Run concurrent simulated sessions and collect the results.
+
+    Args:
+        sessions (int): Concurrent simulated users
+        actions (int): Page runs per user
+        pages (list): Page names to visit (default: every page in PAGES)
+        seed (int): Seed for the users' random choices
+        think_time (float): Upper bound of the random pause between actions, in seconds
+
+    Returns:
+        dict: 'config', 'wall_seconds', 'throughput', 'errors', 'latency'
+              (overall, per page and per action), 'memory' and 'caches'
+    """
+    pages = pages or list(PAGES)
+    install_widget_stubs()
+    samples = []
+    sampler = RssSampler()
+    sampler.start()
+
+    threads = [threading.Thread(target=run_session, name=f'session-{i}',
+                                args=(i, pages, actions, seed, think_time, samples))
+               for i in range(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    sampler.stop()
+
+    by_page = defaultdict(list)
+    by_action = defaultdict(list)
+    for sample in samples:
+        by_page[sample['page']].append(sample['seconds'])
+        by_action['navigate' if sample['action'] == 'navigate' else 'change widget'].append(sample['seconds'])
+    errors = [{key: sample[key] for key in ('session', 'page', 'action', 'errors')}
+              for sample in samples if sample['errors']]
+
+    return {
+        'config': {'sessions': sessions, 'actions': actions, 'pages': pages,
+                   'seed': seed, 'think_time': think_time},
+        'wall_seconds': wall,
+        'throughput': len(samples) / wall if wall else None,
+        'errors': errors,
+        'latency': {
+            'all': latency_summary([sample['seconds'] for sample in samples]),
+            'pages': {page: latency_summary(by_page[page]) for page in pages if by_page[page]},
+            'actions': {action: latency_summary(values) for action, values in by_action.items()}
+        },
+        'memory': {'start_rss': sampler.start_rss, 'peak_rss': sampler.peak_rss,
+                   'process_peak_rss': peak_rss()},
+        'caches': {'bounded': cache_stats(), 'streamlit': streamlit_cache_stats()}
+    }
+
+def _mb(value):
+    return f"{value / (1 << 20):,.1f} MB"
+
+def render_report(result):
+    """Plain-text summary of a load test result"""
+    config = result['config']
+    lines = [f"Sessions: {config['sessions']}  Actions per session: {config['actions']}  "
+             f"Think time: {config['think_time']:g} s",
+             f"Wall time: {result['wall_seconds']:.1f} s  Throughput: {result['throughput']:.1f} page runs/s  "
+             f"Page runs with errors: {len(result['errors'])}",
+             "",
+             f"{'Latency (ms)':28s} {'n':>5s} " + " ".join(f"{'p' + str(p):>8s}" for p in PERCENTILES)
+             + f" {'max':>8s}"]
+
+    def row(name, summary):
+        return (f"{name:28s} {summary['count']:5d} "
+                + " ".join(f"{summary['p' + str(p)]:8.1f}" for p in PERCENTILES)
+                + f" {summary['max']:8.1f}")
+
+    latency = result['latency']
+    lines.append(row('all', latency['all']))
+    lines.extend(row(f"  {action}", summary) for action, summary in latency['actions'].items())
+    lines.extend(row(f"  {page}", summary) for page, summary in latency['pages'].items())
+
+    memory = result['memory']
+    lines += ["",
+              f"RSS at start: {_mb(memory['start_rss'])}  Peak RSS during test: {_mb(memory['peak_rss'])}  "
+              f"Process peak RSS: {_mb(memory['process_peak_rss'])}",
+              "",
+              f"{'Bounded cache':16s} {'entries':>8s} {'bytes':>12s} {'budget':>12s} "
+              f"{'hits':>7s} {'misses':>7s} {'evicted':>7s} {'hit rate':>8s}"]
+    for stats in result['caches']['bounded']:
+        lookups = stats['hits'] + stats['misses']
+        hit_rate = f"{stats['hits'] / lookups:.0%}" if lookups else '-'
+        lines.append(f"{stats['name']:16s} {stats['entries']:8d} {_mb(stats['bytes']):>12s} "
+                     f"{_mb(stats['max_bytes']):>12s} {stats['hits']:7d} {stats['misses']:7d} "
+                     f"{stats['evictions']:7d} {hit_rate:>8s}")
+    lines += ["", f"{'Streamlit cache':48s} {'entries':>8s} {'bytes':>12s}"]
+    for cache in result['caches']['streamlit']:
+        size = _mb(cache['bytes']) if cache['type'] == 'cache_data' else '-'
+        lines.append(f"{cache['type'] + ' ' + cache['function']:48s} {cache['entries']:8d} {size:>12s}")
+
+    for error in result['errors'][:10]:
+        lines.append(f"\nSession {error['session']} {error['page']} ({error['action']}): {error['errors'][0]}")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate concurrent dashboard users and report latency, memory and caching.')
+    parser.add_argument('--sessions', type=int, default=8, help='Concurrent simulated users (default: 8)')
+    parser.add_argument('--actions', type=int, default=20,
+                        help='Page runs per user: navigations and widget changes (default: 20)')
+    parser.add_argument('--pages', nargs='+', choices=list(PAGES), metavar='PAGE',
+                        help='Pages to visit (default: all)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the simulated choices (default: 0)')
+    parser.add_argument('--think-time', type=float, default=0.0,
+                        help='Maximum random pause between a user\'s actions, in seconds (default: 0)')
+    parser.add_argument('--json', metavar='PATH', help='Also write the full result as JSON')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    # Bare mode warns about the missing script context on every widget. Reading
+    # an option first loads Streamlit's config, which would reset the level.
+    st.get_option('logger.level')
+    set_log_level('error')
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+    result = run_load_test(args.sessions, args.actions, args.pages, args.seed, args.think_time)
+    print(render_report(result))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2, default=str)
+            f.write('\n')
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import streamlit as st
-from views import home, pell_grants, federal_loans, total_aid, institution_profile, hist_trends
+from config import start_data_watcher
+from views import home, pell_grants, federal_loans, total_aid, institution_profile, hist_trends, year_comparison, distributions, state_map
 
 # Configure page settings
 st.set_page_config(
@@ -8,6 +9,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Pick up newly processed years and drop only the cache entries they affect
+start_data_watcher()
+
 # Initialize session state for navigation
 if 'current_page' not in st.session_state:
     st.session_state.current_page = 'home'
@@ -22,7 +26,10 @@ pages = {
     'Pell Grant Analysis': 'pell_grants',
     'Federal Loan Analysis': 'federal_loans',
     'Total Aid Analysis': 'total_aid',
-    'Historical Trends': 'hist_trends'
+    'Historical Trends': 'hist_trends',
+    'Year Comparison': 'year_comparison',
+    'Aid Distributions': 'distributions',
+    'State Map': 'state_map'
 }
 
 selected_page = st.sidebar.selectbox(
@@ -53,4 +60,10 @@ elif st.session_state.current_page == 'federal_loans':
 elif st.session_state.current_page == 'total_aid':
     total_aid.show()
 elif st.session_state.current_page == 'hist_trends':
-    hist_trends.show()
\ No newline at end of file
+    hist_trends.show()
+elif st.session_state.current_page == 'year_comparison':
+    year_comparison.show()
+elif st.session_state.current_page == 'distributions':
+    distributions.show()
+elif st.session_state.current_page == 'state_map':
+    state_map.show()
\ No newline at end of file
@@ -0,0 +1,164 @@
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+from config import load_distributions, YEAR_OPTIONS, format_value, data_version
+from data_loader import year_label
+from aggregates import ALL_SECTORS, DISTRIBUTION_METRICS
+
+METRIC_LABELS = {
+    'total_pell_amount': 'Total Pell Amount',
+    'total_loan_amount': 'Total Loan Amount',
+    'total_aid': 'Total Aid Amount',
+    'avg_pell_amount': 'Average Pell Amount',
+    'avg_loan_amount': 'Average Loan Amount',
+    'pct_pell_grant': 'Percent Receiving Pell',
+    'pct_fed_loan': 'Percent Receiving Loans'
+}
+
+def create_histogram(hist_df, metric_label, log_scale):
+    """Step histogram of institutions per bin from precomputed counts"""
+    x = list(hist_df['bin_left']) + [hist_df['bin_right'].iloc[-1]]
+    y = list(hist_df['count']) + [hist_df['count'].iloc[-1]]
+
+    fig = go.Figure(go.Scatter(
+        x=x,
+        y=y,
+        line_shape='hv',
+        fill='tozeroy',
+        line=dict(color='#3498db', width=2),
+        hovertemplate='From %{x:,.0f}: %{y} institutions<extra></extra>'
+    ))
+    fig.update_layout(
+        title=f'Distribution of {metric_label}',
+        xaxis_title=metric_label + (' (log scale)' if log_scale else ''),
+        yaxis_title='Number of Institutions',
+        height=500,
+        xaxis_type='log' if log_scale else 'linear'
+    )
+    return fig
+
+def create_quantile_plot(quant_df, metric_label):
+    """Median with 25-75 and 5-95 percentile bands across years"""
+    wide = quant_df.pivot(index='year', columns='quantile', values='value').sort_index()
+    years = [year_label(year) for year in wide.index]
+
+    fig = go.Figure()
+    for low, high, color, name in [(0.05, 0.95, 'rgba(52, 152, 219, 0.15)', '5th-95th percentile'),
+                                   (0.25, 0.75, 'rgba(52, 152, 219, 0.35)', '25th-75th percentile')]:
+        fig.add_trace(go.Scatter(x=years, y=wide[low], mode='lines', line=dict(width=0),
+                                 showlegend=False, hoverinfo='skip'))
+        fig.add_trace(go.Scatter(x=years, y=wide[high], mode='lines', line=dict(width=0),
+                                 fill='tonexty', fillcolor=color, name=name))
+    fig.add_trace(go.Scatter(x=years, y=wide[0.5], name='Median',
+                             line=dict(color='#2c3e50', width=2), mode='lines+markers'))
+    fig.update_layout(
+        title=f'{metric_label} Percentiles by Year',
+        xaxis_title='Academic Year',
+        yaxis_title=metric_label,
+        height=500,
+        hovermode='x unified',
+        xaxis=dict(type='category')
+    )
+    return fig
+
+def create_lorenz_plot(lorenz_df, years):
+    """Lorenz curves of Pell dollars across institutions for the chosen years"""
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=[0, 1], y=[0, 1], name='Equal distribution',
+                             line=dict(dash='dash', color='gray')))
+    for year in years:
+        curve = lorenz_df[lorenz_df['year'] == year]
+        fig.add_trace(go.Scatter(
+            x=curve['institution_share'],
+            y=curve['amount_share'],
+            name=f"{year_label(year)} (Gini {curve['gini'].iloc[0]:.3f})",
+            mode='lines'
+        ))
+    fig.update_layout(
+        title='Concentration of Pell Grant Dollars',
+        xaxis_title='Share of Institutions (smallest to largest)',
+        yaxis_title='Share of Pell Dollars',
+        height=500,
+        xaxis_tickformat='.0%',
+        yaxis_tickformat='.0%'
+    )
+    return fig
+
+def create_gini_plot(lorenz_df):
+    """Gini coefficient of Pell dollars across years"""
+    gini = lorenz_df.groupby('year')['gini'].first().sort_index()
+    fig = go.Figure(go.Scatter(
+        x=[year_label(year) for year in gini.index],
+        y=gini.values,
+        mode='lines+markers',
+        line=dict(color='#2ecc71', width=2)
+    ))
+    fig.update_layout(
+        title='Gini Coefficient of Pell Dollars by Year',
+        xaxis_title='Academic Year',
+        yaxis_title='Gini Coefficient',
+        height=400,
+        xaxis=dict(type='category')
+    )
+    return fig
+
+def show():
+    """Display the Distributions page"""
+    st.title("Aid Distributions")
+
+    try:
+        # Histograms, quantiles and Lorenz curves are precomputed per year and sector
+        distributions = load_distributions(data_version())
+        hist_df = distributions['histograms']
+        quant_df = distributions['quantiles']
+        lorenz_df = distributions['lorenz']
+
+        # Analysis controls
+        st.sidebar.header("Distribution Options")
+
+        metric = st.sidebar.selectbox(
+            "Metric",
+            list(DISTRIBUTION_METRICS.keys()),
+            format_func=lambda m: METRIC_LABELS.get(m, m)
+        )
+        metric_label = METRIC_LABELS.get(metric, metric)
+
+        sectors = [ALL_SECTORS] + sorted(s for s in quant_df['sector'].unique() if s != ALL_SECTORS)
+        selected_sector = st.sidebar.selectbox("Institution Sector", sectors)
+
+        selected_year = st.sidebar.selectbox("Academic Year", list(YEAR_OPTIONS.keys()))
+        year = YEAR_OPTIONS[selected_year]
+
+        tab1, tab2, tab3 = st.tabs(["Histogram", "Percentiles Over Time", "Pell Concentration"])
+
+        with tab1:
+            selected = hist_df[(hist_df['year'] == year) & (hist_df['sector'] == selected_sector)
+                               & (hist_df['metric'] == metric)]
+            st.plotly_chart(create_histogram(selected, metric_label,
+                                             DISTRIBUTION_METRICS[metric] == 'log'),
+                            use_container_width=True)
+            st.write(f"{int(selected['count'].sum()):,} institutions reporting {metric_label} "
+                     f"in {selected_year}")
+
+        with tab2:
+            selected = quant_df[(quant_df['sector'] == selected_sector) & (quant_df['metric'] == metric)]
+            st.plotly_chart(create_quantile_plot(selected, metric_label), use_container_width=True)
+
+            # Percentile table for the selected year
+            value_type = 'percentage' if metric.startswith('pct_') else 'currency'
+            year_quantiles = selected[selected['year'] == year]
+            table = pd.DataFrame({
+                'Percentile': [f"{int(q * 100)}th" for q in year_quantiles['quantile']],
+                selected_year: [format_value(v, value_type) for v in year_quantiles['value']]
+            })
+            st.dataframe(table, use_container_width=True)
+
+        with tab3:
+            selected = lorenz_df[lorenz_df['sector'] == selected_sector]
+            oldest_year = list(YEAR_OPTIONS.values())[-1]
+            compare = [oldest_year, year] if year != oldest_year else [year]
+            st.plotly_chart(create_lorenz_plot(selected, compare), use_container_width=True)
+            st.plotly_chart(create_gini_plot(selected), use_container_width=True)
+
+    except Exception as e:
+        st.error(f"Error loading data: {str(e)}")
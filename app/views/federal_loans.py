@@ -1,7 +1,11 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from config import load_data, YEAR_OPTIONS, format_value, get_sector_options
+from config import load_data, YEAR_OPTIONS, format_value, get_sector_options, cached_result
+
+# Columns this page reads; load_data keeps only these
+COLUMNS = ['unit_id', 'institution_name', 'sector', 'state',
+           'total_undergrad', 'total_loan_amount', 'grad_rate_2023']
 
 def create_scatter_plot(df):
     """Create scatter plot of graduation rate vs total loan amount"""
@@ -42,6 +46,56 @@ def create_scatter_plot(df):
 
     return fig
 
+@cached_result('federal_loans', per_year=True)
+def build_results(year, sector, n_institutions):
+    """Chart, table and summary totals for one year, sector and N
+    
+    Built once per distinct choice and data version and shared by every
+    session through the results cache (see config.cached_result).
+    """
+    df = load_data(year, COLUMNS)
+    
+    # Apply filters
+    if sector != 'All Sectors':
+        df = df[df['sector'] == sector]
+    
+    # Ensure numeric types
+    df['total_loan_amount'] = pd.to_numeric(df['total_loan_amount'], errors='coerce')
+    df['grad_rate_2023'] = pd.to_numeric(df['grad_rate_2023'], errors='coerce')
+    df['total_undergrad'] = pd.to_numeric(df['total_undergrad'], errors='coerce')
+    
+    # Sort by total loan amount in descending order
+    sorted_df = df.nlargest(n_institutions, 'total_loan_amount')
+    
+    # Create scatter plot with top N institutions
+    plot_df = sorted_df.dropna(subset=['grad_rate_2023', 'total_loan_amount', 'total_undergrad'])
+    fig = create_scatter_plot(plot_df)
+    
+    # Prepare display dataframe
+    display_df = sorted_df[['institution_name', 'sector', 'state', 
+                           'total_undergrad', 'total_loan_amount', 'grad_rate_2023']]
+    
+    # Format columns
+    formatted_df = display_df.copy()
+    formatted_df['total_loan_amount'] = formatted_df['total_loan_amount'].apply(
+        lambda x: format_value(x, 'currency'))
+    formatted_df['total_undergrad'] = formatted_df['total_undergrad'].apply(
+        lambda x: format_value(x, 'number'))
+    formatted_df['grad_rate_2023'] = formatted_df['grad_rate_2023'].apply(
+        lambda x: format_value(x, 'percentage'))
+    
+    # Rename columns for display
+    formatted_df.columns = ['Institution', 'Sector', 'State', 
+                          'Total Undergraduate', 'Total Loan Amount', 'Grad Rate 2023']
+    
+    total_loans = df['total_loan_amount'].sum()
+    
+    return {
+        'figure': fig,
+        'table': formatted_df,
+        'total_loans': total_loans
+    }
+
 def show():
     """Display the Federal Loans analysis page"""
     st.title("Federal Loan Analysis")
@@ -56,13 +110,10 @@ def show():
             list(YEAR_OPTIONS.keys())
         )
         
-        # Load data first to get filter options
-        df = load_data(YEAR_OPTIONS[selected_year])
-        
         # Institution type filter
         selected_sector = st.sidebar.selectbox(
             "Institution Sector",
-            get_sector_options(df)
+            get_sector_options(YEAR_OPTIONS[selected_year])
         )
         
         # Number of institutions slider
@@ -74,51 +125,19 @@ def show():
             step=10
         )
         
-        # Apply filters
-        if selected_sector != 'All Sectors':
-            df = df[df['sector'] == selected_sector]
-        
-        # Ensure numeric types
-        df['total_loan_amount'] = pd.to_numeric(df['total_loan_amount'], errors='coerce')
-        df['grad_rate_2023'] = pd.to_numeric(df['grad_rate_2023'], errors='coerce')
-        df['total_undergrad'] = pd.to_numeric(df['total_undergrad'], errors='coerce')
-        
-        # Sort by total loan amount in descending order
-        sorted_df = df.nlargest(n_institutions, 'total_loan_amount')
-        
-        # Create scatter plot with top N institutions
-        plot_df = sorted_df.dropna(subset=['grad_rate_2023', 'total_loan_amount', 'total_undergrad'])
-        st.plotly_chart(create_scatter_plot(plot_df), use_container_width=True)
-        
-        # Prepare display dataframe
-        display_df = sorted_df[['institution_name', 'sector', 'state', 
-                               'total_undergrad', 'total_loan_amount', 'grad_rate_2023']]
-        
-        # Format columns
-        formatted_df = display_df.copy()
-        formatted_df['total_loan_amount'] = formatted_df['total_loan_amount'].apply(
-            lambda x: format_value(x, 'currency'))
-        formatted_df['total_undergrad'] = formatted_df['total_undergrad'].apply(
-            lambda x: format_value(x, 'number'))
-        formatted_df['grad_rate_2023'] = formatted_df['grad_rate_2023'].apply(
-            lambda x: format_value(x, 'percentage'))
-        
-        # Rename columns for display
-        formatted_df.columns = ['Institution', 'Sector', 'State', 
-                              'Total Undergraduate', 'Total Loan Amount', 'Grad Rate 2023']
+        # Results are shared by every session that picks the same options
+        results = build_results(YEAR_OPTIONS[selected_year], selected_sector, n_institutions)
+        st.plotly_chart(results['figure'], use_container_width=True)
         
         # Display results
         st.write(f"Showing Federal Loan data for Academic Year {selected_year}")
-        st.dataframe(formatted_df, use_container_width=True)
+        st.dataframe(results['table'], use_container_width=True)
         
         # Show summary statistics
         st.sidebar.markdown("---")
         st.sidebar.markdown("### Summary Statistics")
-        st.sidebar.markdown(f"Total Institutions: {len(formatted_df)}")
-        total_loans = df['total_loan_amount'].sum()
-        st.sidebar.markdown(f"Total Loan Amount: {format_value(total_loans, 'currency')}")
+        st.sidebar.markdown(f"Total Institutions: {len(results['table'])}")
+        st.sidebar.markdown(f"Total Loan Amount: {format_value(results['total_loans'], 'currency')}")
         
     except Exception as e:
-        st.error(f"Error loading data: {str(e)}")
-        if 'df' in locals():
-            st.write("Available columns:", df.columns.tolist())
\ No newline at end of file
+        st.error(f"Error loading data: {str(e)}")
\ No newline at end of file
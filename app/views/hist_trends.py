@@ -1,9 +1,32 @@
 import streamlit as st
-import pandas as pd
 import plotly.graph_objects as go
-from config import load_data, YEAR_OPTIONS, format_value
+from config import load_trends, YEAR_OPTIONS, format_value, get_institution_labels, show_download, data_version
+from exports import export_frame, export_panel
+from aggregates import top_trends, window_totals
 
-def create_trend_plot(data_df, aid_type):
+# Year ranges for the Historical Data table, oldest year first; None spans
+# every year and an int counts back from the most recent year
+TABLE_WINDOWS = {
+    'All Years': None,
+    'Last 5 Years': 5,
+    '2008-09 to 2014-15': ('2009', '2015'),
+    'Custom Range': 'custom'
+}
+
+def available_windows(year_codes):
+    """Table windows that can be totaled; fixed ranges need both end years present"""
+    return {label: window for label, window in TABLE_WINDOWS.items()
+            if not isinstance(window, tuple) or all(year in year_codes for year in window)}
+
+def window_years(window, year_codes):
+    """First and last year code of a table window; year_codes are oldest first"""
+    if window is None:
+        return year_codes[0], year_codes[-1]
+    if isinstance(window, int):
+        return year_codes[max(len(year_codes) - window, 0)], year_codes[-1]
+    return window
+
+def create_trend_plot(data_df, aid_type, labels):
     """Create line plot showing historical trends"""
     
     title_mapping = {
@@ -20,16 +43,14 @@ def create_trend_plot(data_df, aid_type):
     fig = go.Figure()
 
     # Add a trace for each institution
-    for institution in data_df['institution_name'].unique():
-        inst_data = data_df[data_df['institution_name'] == institution]
-        
+    for unit_id, inst_data in data_df.groupby('unit_id', sort=False):
         # Ensure data is sorted by year
         inst_data = inst_data.sort_values('year')
         
         fig.add_trace(go.Scatter(
             x=inst_data['year'],
             y=inst_data[value_col],
-            name=institution,
+            name=labels.get(unit_id, str(unit_id)),
             mode='lines+markers'
         ))
 
@@ -57,16 +78,6 @@ def create_trend_plot(data_df, aid_type):
 
     return fig
 
-def get_top_institutions(df, aid_type, n=10):
-    """Get top N institutions based on aid type"""
-    if aid_type == 'Pell':
-        return df.nlargest(n, 'total_pell_amount')['institution_name'].unique()
-    elif aid_type == 'Federal':
-        return df.nlargest(n, 'total_loan_amount')['institution_name'].unique()
-    else:  # Total
-        df['total_aid'] = df['total_pell_amount'] + df['total_loan_amount']
-        return df.nlargest(n, 'total_aid')['institution_name'].unique()
-
 def show():
     """Display the Historical Trends analysis page"""
     st.title("Historical Trends Analysis")
@@ -87,45 +98,49 @@ def show():
             step=5
         )
         
-        # Load data for all years
-        all_years_data = []
-        for display_year, year_code in reversed(YEAR_OPTIONS.items()):  # Reverse the order
-            df = load_data(year_code)
-            
-            # Ensure numeric type for calculations
-            df['total_pell_amount'] = pd.to_numeric(df['total_pell_amount'], errors='coerce')
-            df['total_loan_amount'] = pd.to_numeric(df['total_loan_amount'], errors='coerce')
-            
-            # Calculate total aid if needed
-            if aid_type == 'Total':
-                df['total_aid'] = df['total_pell_amount'] + df['total_loan_amount']
-            
-            df['year'] = display_year
-            all_years_data.append(df)
-        
-        # Combine all years
-        combined_df = pd.concat(all_years_data)
+        value_col = ('total_pell_amount' if aid_type == 'Pell' else 
+                    'total_loan_amount' if aid_type == 'Federal' else 
+                    'total_aid')
         
-        # Get top N institutions based on most recent year
-        most_recent_df = all_years_data[-1]  # Last item now corresponds to most recent year
-        top_institutions = get_top_institutions(most_recent_df, aid_type, n_institutions)
+        # Top N institutions in the most recent year and their rows of the
+        # precomputed panel (built by prep/prepare_aggregates.py)
+        trends = load_trends(data_version())
+        top_df, panel_rows = top_trends(trends, value_col, n_institutions)
+        year_labels = {code: label for label, code in YEAR_OPTIONS.items()}
+        trend_data = panel_rows[['unit_id', 'year', value_col]].copy()
+        trend_data['year'] = trend_data['year'].map(year_labels)
         
-        # Filter data for top institutions
-        trend_data = combined_df[combined_df['institution_name'].isin(top_institutions)].copy()
+        # Label institutions by their most recent name
+        labels = get_institution_labels(list(YEAR_OPTIONS.values())[0])
         
         # Create and display trend plot
-        st.plotly_chart(create_trend_plot(trend_data, aid_type), use_container_width=True)
+        st.plotly_chart(create_trend_plot(trend_data, aid_type, labels), use_container_width=True)
         
         # Display data table
         st.subheader("Historical Data")
         
-        # Create aggregation for historical data table
-        value_col = ('total_pell_amount' if aid_type == 'Pell' else 
-                    'total_loan_amount' if aid_type == 'Federal' else 
-                    'total_aid')
-        
-        # Group by institution and calculate aggregate
-        agg_df = trend_data.groupby(['institution_name', 'state', 'sector'])[value_col].sum().reset_index()
+        # Totals over the selected years come from each institution's running
+        # totals, keyed on unit_id, so any window costs one subtraction
+        year_codes = trends['years']
+        code_labels = [year_labels[code] for code in year_codes]
+        windows = available_windows(year_codes)
+        window_label = st.selectbox("Years to Total", list(windows.keys()))
+        window = windows[window_label]
+        if window == 'custom':
+            first_label, last_label = st.select_slider(
+                "Year Range",
+                options=code_labels,
+                value=(code_labels[0], code_labels[-1])
+            )
+            window = (YEAR_OPTIONS[first_label], YEAR_OPTIONS[last_label])
+        first_year, last_year = window_years(window, year_codes)
+        
+        # Descriptive columns come from the most recent year so sector or
+        # state changes don't split a row
+        agg_df = top_df[['unit_id', 'state', 'sector']].copy()
+        agg_df[value_col] = window_totals(trends, agg_df['unit_id'], value_col, first_year, last_year)
+        agg_df.insert(0, 'institution_name', agg_df['unit_id'].map(labels))
+        agg_df = agg_df.drop(columns='unit_id')
         
         # Sort by aggregate amount descending
         display_df = agg_df.nlargest(n_institutions, value_col)
@@ -149,23 +164,32 @@ def show():
         # Display table
         st.dataframe(formatted_df, use_container_width=True)
         
-        # Add download button for CSV
-        csv = display_df.to_csv(index=False)
-        st.download_button(
-            label="Download Data as CSV",
-            data=csv,
-            file_name=f"historical_data_{aid_type.lower()}.csv",
-            mime='text/csv'
+        # Downloads are generated only on request and cached by their parameters
+        table_params = {'aid_type': aid_type, 'n': n_institutions,
+                        'first_year': first_year, 'last_year': last_year}
+        show_download(
+            "Table Data",
+            f"historical_data_{aid_type.lower()}",
+            'hist_table',
+            table_params,
+            lambda fmt: export_frame('historical', table_params, fmt, lambda: display_df)
+        )
+        show_download(
+            "Full Panel (all years, institutions and metrics)",
+            "ipeds_financial_aid_panel",
+            'hist_panel',
+            {},
+            export_panel
         )
         
     except Exception as e:
         st.error(f"Error loading data: {str(e)}")
-        if 'combined_df' in locals():
-            st.write("Available columns:", combined_df.columns.tolist())
+        if 'trend_data' in locals():
+            st.write("Available columns:", trend_data.columns.tolist())
             
         # For debugging data issues
         st.write("Debug Information:")
-        st.write("Number of institutions:", len(trend_data['institution_name'].unique()) if 'trend_data' in locals() else "No trend data")
+        st.write("Number of institutions:", trend_data['unit_id'].nunique() if 'trend_data' in locals() else "No trend data")
         if 'trend_data' in locals():
             st.write("Sample of trend data:")
             st.write(trend_data.head())
\ No newline at end of file
@@ -15,6 +15,9 @@ def show():
     * **Pell Grants**: Analyze distribution of Federal Pell Grants across institutions
     * **Federal Loans**: Examine Federal student loan patterns
     * **Total Financial Aid**: Compare total financial aid packages
+    * **Year Comparison**: Compare changes and rank shifts between academic years
+    * **Aid Distributions**: See how aid is spread across all institutions and how concentrated Pell dollars are
+    * **State Map**: Map state totals and aid per undergraduate, animated across years
 
     ### Data Coverage
 
@@ -1,10 +1,21 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-from config import load_data, YEAR_OPTIONS, format_value, get_sector_options
+from config import load_data, load_years, YEAR_OPTIONS, format_value, get_sector_options, get_institution_labels, show_download, load_peer_index, data_version
+from exports import export_frame
+from aggregates import find_peers
 
-def create_trend_plot(df_list, years, institution):
-    """Create a line plot showing financial aid trends"""
+# Columns this page reads; load_data keeps only these
+COLUMNS = ['unit_id', 'sector', 'state', 'control', 'level', 'degree_granting',
+           'total_undergrad', 'pct_pell_grant', 'pct_fed_loan', 'grad_rate_2023',
+           'total_pell_amount', 'total_loan_amount']
+
+def create_trend_plot(df_list, years, institution, peers=None):
+    """Create a line plot showing financial aid trends
+    
+    peers optionally maps peer institution labels to their per-year frames
+    (aligned with years); their total aid is overlaid as dotted lines.
+    """
     # Create figure
     fig = go.Figure()
 
@@ -49,6 +60,25 @@ def create_trend_plot(df_list, years, institution):
         mode='lines+markers'
     ))
 
+    # Overlay similar institutions' total aid
+    for label, peer_dfs in (peers or {}).items():
+        peer_years = []
+        peer_aid = []
+        for year, year_data in zip(years, peer_dfs):
+            if len(year_data) > 0:
+                peer_data = year_data.iloc[0]
+                peer_years.append(year)
+                peer_aid.append(pd.to_numeric(peer_data['total_pell_amount'], errors='coerce') +
+                                pd.to_numeric(peer_data['total_loan_amount'], errors='coerce'))
+        fig.add_trace(go.Scatter(
+            x=peer_years,
+            y=peer_aid,
+            name=f'{label} (Total Aid)',
+            line=dict(width=1, dash='dot'),
+            opacity=0.6,
+            mode='lines'
+        ))
+
     # Update layout
     fig.update_layout(
         title=f'Financial Aid Trends: {institution}',
@@ -80,15 +110,15 @@ def show():
     try:
         # Load most recent year's data for institution selection
         most_recent_year = list(YEAR_OPTIONS.keys())[0]  # First year in the dict (2022-23)
-        df = load_data(YEAR_OPTIONS[most_recent_year])
+        df = load_data(YEAR_OPTIONS[most_recent_year], COLUMNS)
         
         # Sidebar filters
         st.sidebar.header("Select Institution")
         
-        # Use get_sector_options for consistent sector filtering
+        # Sector options come precomputed with the dataset metadata
         selected_sector = st.sidebar.selectbox(
             "Institution Sector",
-            get_sector_options(df)
+            get_sector_options(YEAR_OPTIONS[most_recent_year])
         )
         
         # Filter institutions based on selected sector
@@ -97,14 +127,29 @@ def show():
         else:
             institutions_df = df[df['sector'] == selected_sector]
         
-        # Get sorted list of institutions for the selected sector
-        institutions = sorted(institutions_df['institution_name'].unique())
+        # Institutions are selected by unit_id; names can repeat across campuses
+        labels = get_institution_labels(YEAR_OPTIONS[most_recent_year])
+        unit_ids = sorted(institutions_df['unit_id'].unique(),
+                          key=lambda unit_id: labels.get(unit_id, ''))
         
         # Institution selector
-        selected_institution = st.sidebar.selectbox(
+        selected_unit_id = st.sidebar.selectbox(
             "Select Institution",
-            institutions
+            unit_ids,
+            format_func=lambda unit_id: labels.get(unit_id, str(unit_id))
         )
+        selected_institution = labels.get(selected_unit_id, str(selected_unit_id))
+        
+        # Nearest peers by enrollment, Pell share, loan share, sector and grad rate
+        n_peers = st.sidebar.slider(
+            "Similar Institutions",
+            min_value=0,
+            max_value=10,
+            value=3
+        )
+        peers_df = find_peers(load_peer_index(data_version()), YEAR_OPTIONS[most_recent_year],
+                              selected_unit_id, n_peers)
+        peer_ids = list(peers_df['unit_id'])
         
         # After institution is selected, load all years' data for this institution
         st.subheader(selected_institution)
@@ -112,18 +157,24 @@ def show():
         # Load data for all years
         years = list(YEAR_OPTIONS.keys())
         year_dfs = []
+        peer_year_dfs = {peer_id: [] for peer_id in peer_ids}
         
+        year_frames = load_years((YEAR_OPTIONS[year] for year in years), COLUMNS)
         for year in years:
-            year_df = load_data(YEAR_OPTIONS[year])
-            inst_data = year_df[year_df['institution_name'] == selected_institution]
+            year_df = year_frames[YEAR_OPTIONS[year]]
+            inst_data = year_df[year_df['unit_id'] == selected_unit_id]
             year_dfs.append(inst_data)
+            for peer_id in peer_ids:
+                peer_year_dfs[peer_id].append(year_df[year_df['unit_id'] == peer_id])
         
         # Create and display trend plot
-        st.plotly_chart(create_trend_plot(year_dfs, years, selected_institution),
+        peers = {labels.get(peer_id, str(peer_id)): peer_year_dfs[peer_id] for peer_id in peer_ids}
+        st.plotly_chart(create_trend_plot(year_dfs, years, selected_institution, peers),
                        use_container_width=True)
         
         # Create tabs for different views
-        tab1, tab2, tab3 = st.tabs(["Institution Information", "Yearly Statistics", "Aggregate Totals"])
+        tab1, tab2, tab3, tab4 = st.tabs(["Institution Information", "Yearly Statistics",
+                                          "Aggregate Totals", "Similar Institutions"])
         
         with tab1:
             # Show institution information from most recent year
@@ -168,13 +219,14 @@ def show():
                 # Display table
                 st.dataframe(df_display, use_container_width=True)
                 
-                # Add download button for CSV
-                csv = df_yearly.to_csv(index=False)
-                st.download_button(
-                    label="Download Data as CSV",
-                    data=csv,
-                    file_name=f"{selected_institution.replace('/', '_')}_yearly_statistics.csv",
-                    mime='text/csv'
+                # Downloads are generated only on request and cached by their parameters
+                params = {'unit_id': int(selected_unit_id)}
+                show_download(
+                    "Yearly Statistics",
+                    f"{selected_institution.replace('/', '_')}_yearly_statistics",
+                    'profile_yearly',
+                    params,
+                    lambda fmt: export_frame('yearly_statistics', params, fmt, lambda: df_yearly)
                 )
             else:
                 st.write("No data available")
@@ -203,6 +255,30 @@ def show():
                 st.write(f"**Total Financial Aid:** {format_value(total_aid, 'currency')}")
             else:
                 st.write("No data available")
+        
+        with tab4:
+            if peer_ids:
+                # Peers' most recent figures next to the selected institution's
+                recent_df = load_data(YEAR_OPTIONS[most_recent_year], COLUMNS).set_index('unit_id')
+                peer_rows = recent_df.loc[[selected_unit_id] + peer_ids]
+                formatted_df = pd.DataFrame({
+                    'Institution': [labels.get(unit_id, str(unit_id)) for unit_id in peer_rows.index],
+                    'Sector': peer_rows['sector'].values,
+                    'Total Undergraduate': peer_rows['total_undergrad'].apply(
+                        lambda x: format_value(x, 'number')).values,
+                    'Percent Pell': peer_rows['pct_pell_grant'].apply(
+                        lambda x: format_value(x, 'percentage')).values,
+                    'Percent Loan': peer_rows['pct_fed_loan'].apply(
+                        lambda x: format_value(x, 'percentage')).values,
+                    'Grad Rate 2023': peer_rows['grad_rate_2023'].apply(
+                        lambda x: format_value(x, 'percentage')).values,
+                    'Distance': [0.0] + [round(d, 3) for d in peers_df['distance']]
+                })
+                st.write(f"Most similar institutions in {most_recent_year} by enrollment, "
+                         "Pell and loan shares, sector and graduation rate")
+                st.dataframe(formatted_df, use_container_width=True)
+            else:
+                st.write("No similar institutions found")
                 
     except Exception as e:
         st.error(f"Error loading data: {str(e)}")
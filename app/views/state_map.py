@@ -0,0 +1,102 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+from config import load_state_rollup, YEAR_OPTIONS, format_value, data_version
+from aggregates import ALL_SECTORS
+
+MEASURE_OPTIONS = {
+    'Pell Grants per Undergraduate': 'pell_per_student',
+    'Federal Loans per Undergraduate': 'loan_per_student',
+    'Total Aid per Undergraduate': 'aid_per_student',
+    'Total Pell Amount': 'total_pell_amount',
+    'Total Loan Amount': 'total_loan_amount',
+    'Total Aid Amount': 'total_aid',
+    'Undergraduate Enrollment': 'total_undergrad',
+    'Number of Institutions': 'institutions'
+}
+
+COUNT_MEASURES = ['total_undergrad', 'institutions']
+
+def create_state_map(df, measure, measure_label, animate):
+    """Choropleth of a state measure, optionally animated across academic years"""
+    # One color scale for every frame so years can be compared
+    color_range = [df[measure].min(), df[measure].quantile(0.98)]
+    fig = px.choropleth(
+        df,
+        locations='state',
+        locationmode='USA-states',
+        scope='usa',
+        color=measure,
+        color_continuous_scale='Blues',
+        range_color=color_range,
+        animation_frame='academic_year' if animate else None,
+        hover_name='state',
+        hover_data={
+            'state': False,
+            'academic_year': True,
+            'institutions': ':,',
+            'total_undergrad': ':,.0f',
+            measure: ':,.0f'
+        },
+        labels={
+            measure: measure_label,
+            'academic_year': 'Academic Year',
+            'institutions': 'Institutions',
+            'total_undergrad': 'Undergraduates'
+        }
+    )
+    fig.update_layout(
+        height=600,
+        margin=dict(l=0, r=0, t=40, b=0),
+        coloraxis_colorbar=dict(title=measure_label)
+    )
+    return fig
+
+def show():
+    """Display the State Map page"""
+    st.title("Financial Aid by State")
+
+    try:
+        # State x year x sector totals are precomputed; selections only filter them
+        rollup = load_state_rollup(data_version())
+
+        # Analysis controls
+        st.sidebar.header("Map Options")
+
+        measure_label = st.sidebar.selectbox("Measure", list(MEASURE_OPTIONS.keys()))
+        measure = MEASURE_OPTIONS[measure_label]
+
+        sectors = [ALL_SECTORS] + sorted(s for s in rollup['sector'].unique() if s != ALL_SECTORS)
+        selected_sector = st.sidebar.selectbox("Institution Sector", sectors)
+
+        animate = st.sidebar.checkbox("Animate across all years", value=True)
+        if not animate:
+            selected_year = st.sidebar.selectbox("Academic Year", list(YEAR_OPTIONS.keys()))
+
+        df = rollup[rollup['sector'] == selected_sector].copy()
+        year_labels = {code: label for label, code in YEAR_OPTIONS.items()}
+        df['academic_year'] = df['year'].map(year_labels)
+        # Oldest first so the animation plays forward in time
+        df = df.sort_values(['year', 'state'])
+        if not animate:
+            df = df[df['year'] == YEAR_OPTIONS[selected_year]]
+
+        st.plotly_chart(create_state_map(df, measure, measure_label, animate),
+                        use_container_width=True)
+
+        # State table for the most recent year shown
+        latest_year = df['year'].max()
+        table_df = df[df['year'] == latest_year].sort_values(measure, ascending=False)
+        value_type = 'number' if measure in COUNT_MEASURES else 'currency'
+        formatted_df = pd.DataFrame({
+            'State': table_df['state'],
+            'Institutions': table_df['institutions'].apply(lambda x: format_value(x, 'number')),
+            'Undergraduates': table_df['total_undergrad'].apply(lambda x: format_value(x, 'number')),
+            measure_label: table_df[measure].apply(lambda x: format_value(x, value_type))
+        })
+
+        st.subheader(f"{measure_label}, {year_labels.get(latest_year, latest_year)}")
+        st.dataframe(formatted_df, use_container_width=True)
+
+    except Exception as e:
+        st.error(f"Error loading data: {str(e)}")
@@ -0,0 +1,212 @@
+import streamlit as st
+import numpy as np
+import pandas as pd
+import plotly.express as px
+from config import load_panel, YEAR_OPTIONS, format_value, get_institution_labels, data_version
+
+METRIC_OPTIONS = {
+    'Total Pell Amount': 'total_pell_amount',
+    'Total Loan Amount': 'total_loan_amount',
+    'Total Aid Amount': 'total_aid',
+    'Pell Recipients': 'num_pell_grant',
+    'Loan Recipients': 'num_fed_loan',
+    'Percent Receiving Pell': 'pct_pell_grant',
+    'Percent Receiving Loans': 'pct_fed_loan',
+    'Average Pell Amount': 'avg_pell_amount',
+    'Average Loan Amount': 'avg_loan_amount',
+    'Total Undergraduate': 'total_undergrad'
+}
+
+METRIC_FORMATS = {
+    'pct_pell_grant': 'percentage',
+    'pct_fed_loan': 'percentage',
+    'num_pell_grant': 'number',
+    'num_fed_loan': 'number',
+    'total_undergrad': 'number'
+}
+
+def format_change(value, value_type):
+    """Format a signed change with the sign ahead of any currency symbol: '+$1,234', '-$1,234'"""
+    if pd.isnull(value):
+        return ""
+    magnitude = format_value(abs(value), value_type)
+    if int(abs(value)) == 0:
+        return magnitude
+    return ('-' if value < 0 else '+') + magnitude
+
+def compare_years(panel, metric, base_year, other_years):
+    """
+    Compare one metric between a base year and one or more other years.
+
+    Works on whole columns of the panel array, so every institution is
+    compared at once.
+
+    Returns:
+        pd.DataFrame: One row per unit with the base value and, for each
+                      comparison year, its value, change, percent change and
+                      rank change (positive = moved up)
+    """
+    years = panel['years']
+    k = panel['metrics'].index(metric)
+    base = years.index(base_year)
+    values = panel['values'][:, :, k]
+    ranks = panel['ranks'][:, :, k]
+
+    result = panel['attributes'].copy()
+    result[f'value_{base_year}'] = values[:, base]
+    result[f'rank_{base_year}'] = ranks[:, base]
+    for year in other_years:
+        j = years.index(year)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(values[:, base] > 0, values[:, j] / values[:, base], np.nan)
+        result[f'value_{year}'] = values[:, j]
+        result[f'change_{year}'] = values[:, j] - values[:, base]
+        result[f'pct_change_{year}'] = (ratio - 1) * 100
+        result[f'rank_change_{year}'] = ranks[:, base] - ranks[:, j]
+    return result
+
+def create_change_plot(df, base_label, compare_label, metric_label, base_col, compare_col):
+    """Scatter of base year against comparison year values, one point per institution"""
+    fig = px.scatter(
+        df,
+        x=base_col,
+        y=compare_col,
+        color='sector',
+        hover_name='institution_name',
+        title=f'{metric_label}: {base_label} vs {compare_label}',
+        labels={
+            base_col: f'{metric_label} ({base_label})',
+            compare_col: f'{metric_label} ({compare_label})',
+            'sector': 'Sector'
+        }
+    )
+
+    # Institutions above the diagonal grew
+    upper = np.nanmax(df[[base_col, compare_col]].values) if len(df) else 0
+    fig.add_shape(type='line', x0=0, y0=0, x1=upper, y1=upper,
+                  line=dict(dash='dash', color='gray'))
+    fig.update_layout(
+        height=600,
+        legend=dict(
+            yanchor="top",
+            y=0.99,
+            xanchor="left",
+            x=0.01
+        )
+    )
+    return fig
+
+def show():
+    """Display the Year Comparison page"""
+    st.title("Year-over-Year Comparison")
+
+    try:
+        # Every year is loaded once per server; selections below only slice it
+        panel = load_panel(data_version())
+        labels = list(YEAR_OPTIONS.keys())
+
+        # Analysis controls
+        st.sidebar.header("Comparison Options")
+
+        metric_label = st.sidebar.selectbox("Metric", list(METRIC_OPTIONS.keys()))
+        metric = METRIC_OPTIONS[metric_label]
+
+        base_label = st.sidebar.selectbox("Base Year", labels, index=len(labels) - 1)
+        compare_labels = st.sidebar.multiselect(
+            "Compare With",
+            [label for label in labels if label != base_label],
+            default=[labels[0]] if labels[0] != base_label else []
+        )
+        if not compare_labels:
+            st.info("Select at least one year to compare with the base year.")
+            return
+
+        base_year = YEAR_OPTIONS[base_label]
+        compare_codes = [YEAR_OPTIONS[label] for label in compare_labels]
+        df = compare_years(panel, metric, base_year, compare_codes)
+
+        # Filters
+        sectors = sorted(s for s in df['sector'].dropna().unique() if s != 'Administrative Unit')
+        selected_sector = st.sidebar.selectbox("Institution Sector", ['All Sectors'] + sectors)
+        states = sorted(df['state'].dropna().unique())
+        selected_states = st.sidebar.multiselect("States", states)
+        reported_all = st.sidebar.checkbox("Only institutions reporting in every selected year",
+                                           value=True)
+
+        mask = df['sector'] != 'Administrative Unit'
+        if selected_sector != 'All Sectors':
+            mask &= df['sector'] == selected_sector
+        if selected_states:
+            mask &= df['state'].isin(selected_states)
+        if reported_all:
+            value_cols = [f'value_{base_year}'] + [f'value_{year}' for year in compare_codes]
+            mask &= df[value_cols].notna().all(axis=1).values
+        df = df[mask]
+
+        # Sorting
+        sort_year_label = compare_labels[0] if len(compare_labels) == 1 else st.sidebar.selectbox(
+            "Sort By Year", compare_labels)
+        sort_year = YEAR_OPTIONS[sort_year_label]
+        sort_options = {
+            'Change': f'change_{sort_year}',
+            'Percent Change': f'pct_change_{sort_year}',
+            'Rank Change': f'rank_change_{sort_year}',
+            f'{sort_year_label} Value': f'value_{sort_year}'
+        }
+        sort_label = st.sidebar.selectbox("Sort By", list(sort_options.keys()))
+        ascending = st.sidebar.radio("Order", ['Largest first', 'Smallest first']) == 'Smallest first'
+        n_institutions = st.sidebar.slider(
+            "Number of Institutions",
+            min_value=10,
+            max_value=1000,
+            value=50,
+            step=10
+        )
+
+        sort_col = sort_options[sort_label]
+        order = np.argsort(df[sort_col].values, kind='stable')
+        # NaN sorts last either way
+        valid = order[~np.isnan(df[sort_col].values[order])]
+        if not ascending:
+            valid = valid[::-1]
+        display_df = df.iloc[valid[:n_institutions]].copy()
+
+        # Plot the base year against the sort year
+        st.plotly_chart(
+            create_change_plot(display_df, base_label, sort_year_label, metric_label,
+                               f'value_{base_year}', f'value_{sort_year}'),
+            use_container_width=True
+        )
+
+        # Label institutions by their most recent name
+        recent_labels = get_institution_labels(list(YEAR_OPTIONS.values())[0])
+        display_df['institution_name'] = display_df['unit_id'].map(recent_labels).fillna(
+            display_df['institution_name'])
+
+        # Format columns
+        value_type = METRIC_FORMATS.get(metric, 'currency')
+        formatted_df = display_df[['institution_name', 'state', 'sector']].copy()
+        formatted_df[base_label] = display_df[f'value_{base_year}'].apply(
+            lambda x: format_value(x, value_type))
+        for label, year in zip(compare_labels, compare_codes):
+            formatted_df[label] = display_df[f'value_{year}'].apply(
+                lambda x: format_value(x, value_type))
+            formatted_df[f'Change {label}'] = display_df[f'change_{year}'].apply(
+                lambda x: format_change(x, value_type))
+            formatted_df[f'% Change {label}'] = display_df[f'pct_change_{year}'].apply(
+                lambda x: f"{x:+.1f}%" if pd.notnull(x) else "")
+            formatted_df[f'Rank Change {label}'] = display_df[f'rank_change_{year}'].apply(
+                lambda x: f"{int(x):+d}" if pd.notnull(x) else "")
+        formatted_df = formatted_df.rename(columns={
+            'institution_name': 'Institution',
+            'state': 'State',
+            'sector': 'Sector'
+        })
+
+        # Display results
+        st.write(f"Comparing {metric_label} for {len(df):,} institutions; "
+                 f"ranks are among all reporting institutions in each year")
+        st.dataframe(formatted_df, use_container_width=True)
+
+    except Exception as e:
+        st.error(f"Error loading data: {str(e)}")
@@ -0,0 +1,90 @@
+"""
+Background watcher for newly processed or reprocessed data.
+
+Polls the fingerprints of the processed source files (see data_loader). When
+a year is added or its file rewritten, only that year's version changes, so
+only the cache entries built from it are dropped; the rest of the warm cache
+is kept. A change to the shared institution, crosswalk or graduation rate
+files affects every year. New years need no restart: YEAR_OPTIONS reads the
+manifest on every lookup.
+
+Configured through an environment variable:
+
+    IPEDS_WATCH_INTERVAL    Seconds between polls (default: 5; 0 disables)
+"""
+import logging
+import os
+import threading
+
+from data_loader import discover_years, data_version, shared_version, year_version
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 5.0
+
+def data_versions():
+    """Current versions: the whole data, the shared files and each year"""
+    return {
+        'data': data_version(),
+        'shared': shared_version(),
+        'years': {year: year_version(year) for year in discover_years().values()}
+    }
+
+def changed_versions(old, new):
+    """
+    Compare two data_versions() results.
+
+    Returns:
+        tuple: (year codes added, removed or changed, versions no longer current)
+    """
+    years = sorted(year for year in set(old['years']) | set(new['years'])
+                   if old['years'].get(year) != new['years'].get(year))
+    stale = {version for version in old['years'].values() if version not in new['years'].values()}
+    for name in ('data', 'shared'):
+        if old[name] != new[name]:
+            stale.add(old[name])
+    return years, stale
+
+class DataWatcher(threading.Thread):
+    """Poll the processed data and report which years and versions changed"""
+
+    def __init__(self, on_change, interval=DEFAULT_INTERVAL):
+        super().__init__(name='ipeds-data-watcher', daemon=True)
+        self.on_change = on_change
+        self.interval = interval
+        self._versions = data_versions()
+        self._stop_event = threading.Event()
+
+    def check(self):
+        """Compare the data with the last check and call on_change(years, stale) if it changed"""
+        versions = data_versions()
+        years, stale = changed_versions(self._versions, versions)
+        self._versions = versions
+        if stale or years:
+            logger.info("Processed data changed for years %s", ', '.join(years) or '(shared files only)')
+            self.on_change(years, stale)
+        return years, stale
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                # Files can be mid-write; the next poll sees them complete
+                logger.exception("Error checking the processed data")
+
+    def stop(self):
+        self._stop_event.set()
+
+def interval_from_env():
+    """Poll interval configured by IPEDS_WATCH_INTERVAL, in seconds"""
+    return float(os.environ.get('IPEDS_WATCH_INTERVAL', DEFAULT_INTERVAL))
+
+def start_watcher(on_change, interval=None):
+    """Start a DataWatcher, or return None when polling is disabled"""
+    interval = interval_from_env() if interval is None else interval
+    if interval <= 0:
+        return None
+    watcher = DataWatcher(on_change, interval)
+    watcher.start()
+    return watcher
@@ -0,0 +1,106 @@
+# File: prep/benchmark_parquet.py
+
+import argparse
+import io
+import os
+import shutil
+import tempfile
+import time
+import pyarrow as pa
+import pyarrow.parquet as pq
+from parquet_writer import dataset_for, write_parquet
+from pipeline_logging import get_logger, stage, add_logging_arguments, configure_from_args
+
+logger = get_logger('benchmark_parquet')
+
+class CountingFile(io.RawIOBase):
+    """Read-only file that counts the bytes the parquet reader pulls"""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self.bytes_read = 0
+
+    def readinto(self, buffer):
+        data = self._file.read(len(buffer))
+        buffer[:len(data)] = data
+        self.bytes_read += len(data)
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+# Queries the app issues: (name, file, columns, filters)
+QUERIES = [
+    ('one institution, all columns', 'financial_aid_2223.parquet', None, [('unit_id', '=', 'SAMPLE')]),
+    ('unit_id range, two columns', 'financial_aid_2223.parquet',
+     ['unit_id', 'total_pell_amount'], [('unit_id', '<', 150000)]),
+    ('two columns, every row', 'financial_aid_2223.parquet', ['unit_id', 'total_pell_amount'], None),
+    ('one sector', 'institutions.parquet', None, [('sector', '=', 'Public, 2-year')]),
+    ('one institution history', 'institutions_history.parquet', None, [('unit_id', '=', 'SAMPLE')]),
+    ('one year of names', 'institution_crosswalk.parquet',
+     ['unit_id', 'display_name'], [('year', '=', '2223')]),
+    ('whole crosswalk', 'institution_crosswalk.parquet', None, None)
+]
+
+def run_query(path, columns, filters, repeat=5):
+    """Return (rows, bytes read, milliseconds) for one filtered read"""
+    elapsed = []
+    for _ in range(repeat):
+        source = CountingFile(path)
+        start = time.perf_counter()
+        table = pq.read_table(pa.PythonFile(source, mode='r'), columns=columns, filters=filters)
+        elapsed.append((time.perf_counter() - start) * 1000)
+        source.close()
+    return table.num_rows, source.bytes_read, min(elapsed)
+
+def benchmark(processed_dir='processed'):
+    """
+    Compare bytes read per query between the files as found and the same
+    data rewritten with the parquet_writer layout.
+    """
+    sample = int(pq.read_table(os.path.join(processed_dir, 'financial_aid_2223.parquet'),
+                               columns=['unit_id'])['unit_id'][len(QUERIES) * 500].as_py())
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        layouts = {'current': processed_dir, 'configured': tmp_dir}
+        for name in {query[1] for query in QUERIES}:
+            source = os.path.join(processed_dir, name)
+            if os.path.exists(source):
+                shutil.copy(source, os.path.join(tmp_dir, name))
+                with stage(logger, 'rewrite', path=name):
+                    write_parquet(pq.read_table(source).to_pandas(), os.path.join(tmp_dir, name),
+                                  dataset_for(name))
+
+        print(f"{'Query':32s} {'Layout':11s} {'Rows':>6s} {'Bytes read':>11s} {'File size':>10s} {'ms':>6s}")
+        for query_name, file_name, columns, filters in QUERIES:
+            if filters:
+                filters = [(col, op, sample if value == 'SAMPLE' else value) for col, op, value in filters]
+            for layout, directory in layouts.items():
+                path = os.path.join(directory, file_name)
+                if not os.path.exists(path):
+                    continue
+                with stage(logger, 'query', query=query_name, layout=layout):
+                    rows, bytes_read, ms = run_query(path, columns, filters)
+                print(f"{query_name:32s} {layout:11s} {rows:6,d} {bytes_read:11,d} "
+                      f"{os.path.getsize(path):10,d} {ms:6.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Measure bytes read per query for the parquet layouts.')
+    parser.add_argument('--processed-dir', default='processed',
+                        help='Directory of processed parquet files (default: processed)')
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+    benchmark(args.processed_dir)
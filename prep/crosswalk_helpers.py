@@ -0,0 +1,177 @@
+# File: prep/crosswalk_helpers.py
+
+import glob
+import os
+import re
+import pandas as pd
+
+def academic_year_end(year_code):
+    """
+    Convert a processed-file year code to the calendar year the academic year ends in.
+
+    Year codes follow the file names in processed/: four-digit codes such as
+    '2009' or '2021' name the ending year directly, while two-year codes such
+    as '2122' or '2223' name both halves of the academic year.
+
+    Args:
+        year_code (str): Year code (e.g., '2223' for 2022-23, '2019' for 2018-19)
+
+    Returns:
+        int: Ending calendar year (e.g., 2023)
+    """
+    code = int(year_code)
+    return code if code < 2100 else 2000 + code % 100
+
+def discover_financial_aid_years(processed_dir='processed'):
+    """
+    Find the year codes of all processed financial aid files.
+
+    Args:
+        processed_dir (str): Directory containing financial_aid_<year>.parquet files
+
+    Returns:
+        list: Year codes sorted from oldest to newest academic year
+    """
+    pattern = os.path.join(processed_dir, 'financial_aid_*.parquet')
+    years = []
+    for path in glob.glob(pattern):
+        match = re.search(r'financial_aid_(\d{4})\.parquet$', path)
+        if match:
+            years.append(match.group(1))
+    return sorted(years, key=academic_year_end)
+
+def load_yearly_names(processed_dir, years):
+    """
+    Collect the institution name reported in each year's financial aid file.
+
+    Args:
+        processed_dir (str): Directory containing processed parquet files
+        years (list): Year codes to read
+
+    Returns:
+        pd.DataFrame: One row per (unit_id, year) with the name used that year
+    """
+    frames = []
+    for year in years:
+        path = os.path.join(processed_dir, f'financial_aid_{year}.parquet')
+        df = pd.read_parquet(path, columns=['unit_id', 'institution_name'])
+        df['year'] = year
+        frames.append(df)
+    names = pd.concat(frames, ignore_index=True)
+    names['institution_name'] = names['institution_name'].str.strip()
+    names['academic_year'] = names['year'].map(academic_year_end).astype('int16')
+    return names
+
+def clean_ope_ids(df):
+    """
+    Normalize OPE IDs and derive the 6-digit institution prefix.
+
+    Source: IPEDS Data Dictionary
+    Office of Postsecondary Education (OPE) ID Number
+    Format: 6-digit institution number followed by a 2-digit branch suffix.
+    A suffix of '00' marks the main campus; branches share the first six digits.
+
+    Args:
+        df (pd.DataFrame): DataFrame containing 'ope_id' column
+
+    Returns:
+        pd.DataFrame: DataFrame with stripped 'ope_id' and added 'ope6' column
+    """
+    ope = df['ope_id'].astype('string').str.strip()
+    ope = ope.where(ope.str.fullmatch(r'\d{7,8}').fillna(False))
+    df['ope_id'] = ope.str.zfill(8)
+    df['ope6'] = df['ope_id'].str[:6]
+    return df
+
+def assign_parents(directory):
+    """
+    Link branch campuses to their main campus through shared OPE ID prefixes.
+
+    Within each year's 6-digit OPE group the main campus is the institution
+    whose OPE suffix is '00' (lowest unit_id if several report that suffix).
+    Every other member of the group is recorded as its child. Groups with a
+    single member, or without a main campus, get no parent.
+
+    Args:
+        directory (pd.DataFrame): Institutions with 'academic_year', 'unit_id', 'ope_id' and 'ope6'
+
+    Returns:
+        pd.DataFrame: Directory with added 'parent_unit_id' column
+    """
+    main_campus = (
+        directory[directory['ope_id'].str.endswith('00').fillna(False)]
+        .groupby(['academic_year', 'ope6'])['unit_id']
+        .min()
+        .rename('parent_unit_id')
+    )
+    directory = directory.merge(main_campus, left_on=['academic_year', 'ope6'],
+                                right_index=True, how='left')
+    is_self = directory['parent_unit_id'] == directory['unit_id']
+    directory['parent_unit_id'] = directory['parent_unit_id'].mask(is_self).astype('Int64')
+    return directory
+
+def attributes_by_year(names, history):
+    """
+    Attach the directory version valid in each (unit_id, year) row.
+
+    Vectorized interval join: rows are matched on unit_id and kept where the
+    academic year falls inside the version's [valid_from, valid_to] range.
+
+    Args:
+        names (pd.DataFrame): Output of load_yearly_names
+        history (pd.DataFrame): Directory versions with 'valid_from' and 'valid_to'
+
+    Returns:
+        pd.DataFrame: names with 'state' and 'ope_id' of the matching version
+    """
+    joined = names.merge(
+        history[['unit_id', 'state', 'ope_id', 'valid_from', 'valid_to']],
+        on='unit_id',
+        how='left'
+    )
+    in_range = joined['academic_year'].between(joined['valid_from'], joined['valid_to'])
+    # Keep rows without any directory entry; drop versions from other years
+    keep = in_range | joined['valid_from'].isna()
+    return joined[keep].drop(columns=['valid_from', 'valid_to'])
+
+def add_display_names(crosswalk):
+    """
+    Build unambiguous labels for institutions that share a name in the same year.
+
+    Names that collide within a year get the state appended; if that still
+    collides, the unit_id is appended as well.
+
+    Args:
+        crosswalk (pd.DataFrame): Crosswalk with 'year', 'institution_name', 'state', 'unit_id'
+
+    Returns:
+        pd.DataFrame: Crosswalk with added 'display_name' column
+    """
+    name = crosswalk['institution_name']
+    dup_name = crosswalk.duplicated(['year', 'institution_name'], keep=False)
+    with_state = name.where(~dup_name, name + ' (' + crosswalk['state'].fillna('??') + ')')
+
+    dup_state = pd.Series(with_state).groupby([crosswalk['year'], with_state]).transform('size') > 1
+    crosswalk['display_name'] = with_state.where(
+        ~dup_state, with_state + ' #' + crosswalk['unit_id'].astype(str))
+    return crosswalk
+
+def build_crosswalk(names, history):
+    """
+    Combine yearly names with directory identifiers into the crosswalk table.
+
+    Args:
+        names (pd.DataFrame): Output of load_yearly_names
+        history (pd.DataFrame): Directory versions with 'unit_id', 'state', 'ope_id',
+            'valid_from' and 'valid_to'
+
+    Returns:
+        pd.DataFrame: Crosswalk sorted by (year, unit_id)
+    """
+    crosswalk = attributes_by_year(names, history)
+    crosswalk = clean_ope_ids(crosswalk)
+    crosswalk = assign_parents(crosswalk)
+    crosswalk = add_display_names(crosswalk)
+    crosswalk = crosswalk.sort_values(['academic_year', 'unit_id'], ignore_index=True)
+    return crosswalk[['unit_id', 'year', 'academic_year', 'institution_name', 'display_name',
+                      'state', 'ope_id', 'ope6', 'parent_unit_id']]
@@ -1,59 +1,119 @@
+import re
 import pandas as pd
-import numpy as np
+from pipeline_logging import get_logger
 
-def load_raw_financial_aid(filepath):
+logger = get_logger('financial_aid')
+
+# Headers exported by the IPEDS Data Center carry the survey file as a suffix,
+# e.g. 'Total amount of Pell grant aid awarded to undergraduate students (SFA2223)'.
+SURVEY_SUFFIX = re.compile(r'\s*\([A-Z]+\d{4}(?:_[A-Z0-9]+)?\)\s*$')
+
+# Schema registry for the Student Financial Aid (SFA) exports.
+# Each canonical column lists its dtype and the header variants seen across
+# survey years: the long titles (2008-09 used "receiving"/"received", later
+# years "awarded") and the short IPEDS variable names. Patterns are matched
+# case-insensitively against the header with its survey suffix removed.
+SFA_SCHEMA = {
+    'unit_id': ('int64', [r'unitid']),
+    'institution_name': (str, [r'institution name', r'instnm']),
+    'total_undergrad': ('float64', [
+        r'total number of undergraduates( - financial aid cohort)?',
+        r'scugrad']),
+    'num_pell_grant': ('float64', [
+        r'number of undergraduate students (awarded|receiving) pell grants',
+        r'upgrntn']),
+    'pct_pell_grant': ('float64', [
+        r'percent of undergraduate students (awarded|receiving) pell grants',
+        r'upgrntp']),
+    'total_pell_amount': ('float64', [
+        r'total amount of pell grant aid (awarded to|received by) undergraduate students',
+        r'upgrntt']),
+    'avg_pell_amount': ('float64', [
+        r'average amount (of )?pell grant aid (awarded to|received by) undergraduate students',
+        r'upgrnta']),
+    'num_fed_loan': ('float64', [
+        r'number of undergraduate students (awarded|receiving) federal student loans',
+        r'ufloann']),
+    'pct_fed_loan': ('float64', [
+        r'percent of undergraduate students (awarded|receiving) federal student loans',
+        r'ufloanp']),
+    'total_loan_amount': ('float64', [
+        r'total amount of federal student loan( aid)? (awarded to|received by) undergraduate students',
+        r'ufloant']),
+    'avg_loan_amount': ('float64', [
+        r'average amount (of )?federal student loan( aid)? (awarded to|received by) undergraduate students',
+        r'ufloana'])
+}
+
+_SCHEMA_PATTERNS = {
+    name: re.compile('^(' + '|'.join(patterns) + ')$', re.IGNORECASE)
+    for name, (_, patterns) in SFA_SCHEMA.items()
+}
+
+def resolve_schema(columns, year=None):
     """
-    Load raw financial aid data from CSV file.
+    Map raw SFA headers to canonical column names.
+
+    Every canonical column must match exactly one header. Headers that match
+    nothing are ignored, so files with extra fields still load, but a missing
+    or ambiguous column stops processing before any data is read.
+
+    Args:
+        columns (list): Raw column headers
+        year (str): Academic year identifier, used in error messages
+
+    Returns:
+        dict: Raw header -> canonical column name, in schema order
+
+    Raises:
+        ValueError: If a canonical column has no matching header or several
     """
-    print(f"Attempting to load file from: {filepath}")
-    try:
-        df = pd.read_csv(filepath)
-        print("Successfully loaded dataframe")
-        print(f"Shape: {df.shape}")
-        print("\nActual columns in file:")
-        for i, col in enumerate(df.columns):
-            print(f"{i}: {col}")
-        return df
-    except Exception as e:
-        print(f"Error loading file: {str(e)}")
-        raise
+    matches = {name: [] for name in SFA_SCHEMA}
+    for col in columns:
+        bare = SURVEY_SUFFIX.sub('', str(col)).strip()
+        for name, pattern in _SCHEMA_PATTERNS.items():
+            if pattern.match(bare):
+                matches[name].append(col)
+
+    missing = [name for name, cols in matches.items() if not cols]
+    ambiguous = {name: cols for name, cols in matches.items() if len(cols) > 1}
+    if missing or ambiguous:
+        problems = []
+        if missing:
+            problems.append(f"no header for {', '.join(missing)}")
+        for name, cols in ambiguous.items():
+            problems.append(f"several headers for {name}: {cols}")
+        label = f" for year {year}" if year else ""
+        raise ValueError(f"Financial aid layout not recognized{label}: {'; '.join(problems)}")
+
+    return {cols[0]: name for name, cols in matches.items()}
 
-def clean_column_names(df, year):
+def load_financial_aid(filepath, year=None):
     """
-    Clean and standardize column names using column positions.
-    
+    Load a financial aid CSV directly into the canonical schema.
+
+    The header row is read and resolved first; only the matched columns are
+    then parsed, with their schema dtypes, and returned in schema order.
+
     Args:
-        df (pd.DataFrame): Raw DataFrame
-        year (str): Academic year identifier (not used in this approach but kept for compatibility)
+        filepath (str): Path to the raw SFA CSV file
+        year (str): Academic year identifier, used in error messages
+
+    Returns:
+        pd.DataFrame: DataFrame with canonical column names and dtypes
     """
-    # Drop any unnamed columns
-    unnamed_cols = [col for col in df.columns if 'Unnamed' in col]
-    if unnamed_cols:
-        df = df.drop(unnamed_cols, axis=1)
-    
-    # Define new column names based on position
-    new_columns = {
-        0: 'unit_id',                  # UnitID
-        1: 'institution_name',         # Institution Name
-        2: 'total_undergrad',          # Total undergraduates
-        3: 'num_pell_grant',          # Number awarded Pell grants
-        4: 'pct_pell_grant',          # Percent awarded Pell grants
-        5: 'total_pell_amount',       # Total Pell grant amount
-        6: 'avg_pell_amount',         # Average Pell grant amount
-        7: 'num_fed_loan',            # Number awarded federal loans
-        8: 'pct_fed_loan',            # Percent awarded federal loans
-        9: 'total_loan_amount',       # Total federal loan amount
-        10: 'avg_loan_amount'         # Average federal loan amount
-    }
-    
-    # Create list of column names in order
-    columns = [new_columns[i] for i in range(len(df.columns)) if i in new_columns]
-    
-    # Rename columns
-    df.columns = columns
-    
-    print("\nMapped columns:")
-    for old, new in zip(df.columns, columns):
-        print(f"{old} -> {new}")
-    
-    return df
\ No newline at end of file
+    logger.info("Loading file: %s", filepath)
+    try:
+        header = pd.read_csv(filepath, nrows=0).columns
+        rename = resolve_schema(header, year)
+        logger.debug("Resolved columns: %s", rename)
+
+        dtypes = {col: SFA_SCHEMA[name][0] for col, name in rename.items()}
+        df = pd.read_csv(filepath, usecols=list(rename), dtype=dtypes)
+        df = df.rename(columns=rename)[list(SFA_SCHEMA)]
+        logger.info("Loaded %d rows x %d columns (%d ignored)",
+                    len(df), len(df.columns), len(header) - len(rename))
+        return df
+    except Exception:
+        logger.exception("Error loading file %s", filepath)
+        raise
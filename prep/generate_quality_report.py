@@ -1,59 +1,45 @@
 # File: prep/generate_quality_report.py
 
-import pandas as pd
-import numpy as np
-from datetime import datetime
+import argparse
+import json
+import os
+from quality_helpers import build_quality_report, render_markdown
+from pipeline_logging import get_logger, stage, add_logging_arguments, configure_from_args
 
-def generate_quality_report(input_file):
+logger = get_logger('quality_report')
+
+def generate_quality_report(processed_dir='processed', output_path='reports/quality_report.json'):
     """
-    Generate a data quality report for the institutions dataset
+    Generate a data quality report for every processed dataset.
+
+    Covers each financial aid year, graduation rates and institutions with
+    one read per file, writes the machine-readable report as JSON and
+    returns it.
     """
-    # Read the processed data
-    df = pd.read_parquet(input_file)
-    
-    # Basic dimensions
-    dimensions = {
-        'rows': len(df),
-        'columns': len(df.columns)
-    }
-    
-    # Categorical distributions
-    categorical_cols = ['control', 'sector', 'level', 'degree_granting', 'title_iv']
-    distributions = {}
-    for col in categorical_cols:
-        distributions[col] = df[col].value_counts().to_dict()
-    
-    # Missing values
-    missing = df.isnull().sum()
-    missing = missing[missing > 0].to_dict()
-    
-    # State distribution
-    state_dist = df['state'].value_counts().head().to_dict()
-    
-    # Generate the report
-    print(f"# IPEDS Institutions Data Quality Report")
-    print(f"Generated: {datetime.now().strftime('%B %d, %Y')}\n")
-    
-    print("## Data Dimensions")
-    print(f"- Rows: {dimensions['rows']:,}")
-    print(f"- Columns: {dimensions['columns']}\n")
-    
-    print("## Categorical Distributions\n")
-    for col, dist in distributions.items():
-        print(f"### {col.replace('_', ' ').title()}")
-        for val, count in dist.items():
-            print(f"- {val}: {count:,}")
-        print()
-    
-    if missing:
-        print("## Missing Values")
-        for col, count in missing.items():
-            print(f"- {col}: {count:,}")
-        print()
-    
-    print("## Top 5 States by Number of Institutions")
-    for state, count in state_dist.items():
-        print(f"- {state}: {count:,}")
+    with stage(logger, 'quality_report'):
+        report = build_quality_report(processed_dir)
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+        f.write('\n')
+    logger.info("Saved quality report to %s", output_path)
+    return report
 
 if __name__ == "__main__":
-    generate_quality_report('processed/institutions.parquet')
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Generate the data quality report for the processed files.')
+    parser.add_argument('--processed-dir', default='processed',
+                        help='Directory of processed parquet files (default: processed)')
+    parser.add_argument('--output', default='reports/quality_report.json',
+                        help='Path of the JSON report (default: reports/quality_report.json)')
+    parser.add_argument('--format', choices=['markdown', 'json', 'none'], default='markdown',
+                        help='Also print the report to stdout in this format (default: markdown)')
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+
+    report = generate_quality_report(args.processed_dir, args.output)
+    if args.format == 'markdown':
+        print(render_markdown(report))
+    elif args.format == 'json':
+        print(json.dumps(report, indent=2, default=str))
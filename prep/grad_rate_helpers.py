@@ -1,18 +1,18 @@
 import pandas as pd
+from pipeline_logging import get_logger
+
+logger = get_logger('grad_rate')
 
 def load_raw_grad_rate(filepath):
     """Load raw graduation rate data from CSV file."""
-    print(f"Attempting to load file from: {filepath}")
+    logger.info("Loading file: %s", filepath)
     try:
         df = pd.read_csv(filepath)
-        print("Successfully loaded dataframe")
-        print(f"Shape: {df.shape}")
-        print("\nActual columns in file:")
-        for i, col in enumerate(df.columns):
-            print(f"{i}: {col}")
+        logger.info("Loaded %d rows x %d columns", *df.shape)
+        logger.debug("Columns in file: %s", list(df.columns))
         return df
-    except Exception as e:
-        print(f"Error loading file: {str(e)}")
+    except Exception:
+        logger.exception("Error loading file %s", filepath)
         raise
 
 def clean_column_names(df):
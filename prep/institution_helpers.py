@@ -1,50 +1,111 @@
 # File: prep/institution_helpers.py
 
+import os
+import re
 import pandas as pd
 import numpy as np
+from pipeline_logging import get_logger
+
+logger = get_logger('institutions')
+
+# Headers exported by the IPEDS Data Center carry the survey file as a suffix,
+# e.g. 'Sector of institution (HD2023)'. Matching is done on the bare header.
+SURVEY_SUFFIX = re.compile(r'\s*\(([A-Z]+)(\d{4})(?:_[A-Z0-9]+)?\)\s*$')
+
+COLUMN_MAPPING = {
+    'UnitID': 'unit_id',
+    'Institution Name': 'institution_name',
+    'State abbreviation': 'state',
+    'City location of institution': 'city',
+    'Control of institution': 'control',
+    'Sector of institution': 'sector',
+    'Level of institution': 'level',
+    'Degree-granting status': 'degree_granting',
+    'Postsecondary and Title IV institution indicator': 'title_iv',
+    'Office of Postsecondary Education (OPE) ID Number': 'ope_id'
+}
+
+# Sentinels for the open ends of an institution's attribute history
+OPEN_START = 0
+OPEN_END = 9999
+
+def strip_survey_suffix(header):
+    """
+    Remove the survey file suffix from an IPEDS column header.
+    
+    Args:
+        header (str): Raw header, e.g. 'State abbreviation (HD2019)'
+        
+    Returns:
+        str: Bare header, e.g. 'State abbreviation'
+    """
+    return SURVEY_SUFFIX.sub('', header).strip()
+
+def detect_survey_year(columns):
+    """
+    Detect the HD survey year from the header suffixes.
+    
+    Args:
+        columns (list): Raw column headers
+        
+    Returns:
+        int or None: Survey year (e.g., 2023 for HD2023), None if no suffix found
+    """
+    years = set()
+    for col in columns:
+        match = SURVEY_SUFFIX.search(col)
+        if match and match.group(1) == 'HD':
+            years.add(int(match.group(2)))
+    if len(years) > 1:
+        raise ValueError(f"Columns come from several HD survey years: {sorted(years)}")
+    return years.pop() if years else None
 
 def load_raw_institutions(filepath):
     """
     Load the raw institutions data from CSV file.
     """
-    print("Attempting to load file from:", filepath)  # Debug print
+    logger.info("Loading file: %s", filepath)
     try:
         # Specify dtype for ope_id to prevent numeric conversion
+        header = pd.read_csv(filepath, nrows=0).columns
         dtype_specs = {
-            'Office of Postsecondary Education (OPE) ID Number (HD2023)': str
+            col: str for col in header
+            if COLUMN_MAPPING.get(strip_survey_suffix(col)) == 'ope_id'
         }
         df = pd.read_csv(filepath, dtype=dtype_specs)
-        print("Successfully loaded dataframe")  # Debug print
-        print("Shape:", df.shape)  # Debug print
+        logger.info("Loaded %d rows x %d columns", *df.shape)
         return df
-    except Exception as e:
-        print(f"Error loading file: {str(e)}")  # Debug print
+    except Exception:
+        logger.exception("Error loading file %s", filepath)
         raise
 
 def clean_column_names(df):
     """
     Clean and standardize column names.
     
+    Headers are matched without their survey suffix, so files exported for
+    any HD year (HD2009 ... HD2023) map to the same names.
+    
     Args:
         df (pd.DataFrame): Raw DataFrame with original column names
         
     Returns:
         pd.DataFrame: DataFrame with cleaned column names
     """
-    column_mapping = {
-        'UnitID': 'unit_id',
-        'Institution Name': 'institution_name',
-        'State abbreviation (HD2023)': 'state',
-        'City location of institution (HD2023)': 'city',
-        'Control of institution (HD2023)': 'control',
-        'Sector of institution (HD2023)': 'sector',
-        'Level of institution (HD2023)': 'level',
-        'Degree-granting status (HD2023)': 'degree_granting',
-        'Postsecondary and Title IV institution indicator (HD2023)': 'title_iv',
-        'Office of Postsecondary Education (OPE) ID Number (HD2023)': 'ope_id'
-    }
-    
-    return df[column_mapping.keys()].rename(columns=column_mapping)
+    rename = {}
+    for col in df.columns:
+        name = COLUMN_MAPPING.get(strip_survey_suffix(col))
+        if name is not None:
+            if name in rename.values():
+                raise ValueError(f"Several columns map to '{name}'")
+            rename[col] = name
+    
+    missing = set(COLUMN_MAPPING.values()) - set(rename.values())
+    if missing:
+        raise ValueError(f"Missing institution columns: {', '.join(sorted(missing))}")
+    
+    df = df[list(rename)].rename(columns=rename)
+    return df[list(COLUMN_MAPPING.values())]
 
 def clean_string_columns(df):
     """
@@ -61,65 +122,19 @@ def clean_string_columns(df):
         df[col] = df[col].str.strip()
     return df
 
-def map_control(df):
-    """
-    Map the control of institution values to their corresponding categories.
-    
-    Source: IPEDS Data Dictionary
-    Control of institution (HD2023)
-    Values represent:
-    1 = Public
-    2 = Private not-for-profit
-    3 = Private for-profit
-    -3 = Not available
-    
-    Args:
-        df (pd.DataFrame): DataFrame containing 'control' column
-        
-    Returns:
-        pd.DataFrame: DataFrame with mapped control values
-    """
-    control_mapping = {
+# Source: IPEDS Data Dictionary (HD survey)
+# Each coded column maps its numeric codes to labels. The order of the
+# entries is the fixed category order of the resulting Categorical.
+CODEBOOK = {
+    # Control of institution
+    'control': {
         1: 'Public',
         2: 'Private not-for-profit',
         3: 'Private for-profit',
         -3: 'Not available'
-    }
-    
-    df['control'] = df['control'].map(control_mapping)
-    
-    # Log the distribution of values
-    print("\nDistribution of institution control types:")
-    print(df['control'].value_counts(dropna=False))
-    
-    return df
-
-def map_sector(df):
-    """
-    Map the sector of institution values to their corresponding categories.
-    
-    Source: IPEDS Data Dictionary
-    Sector of institution (HD2023)
-    Values represent:
-    0 = Administrative Unit
-    1 = Public, 4-year or above
-    2 = Private not-for-profit, 4-year or above
-    3 = Private for-profit, 4-year or above
-    4 = Public, 2-year
-    5 = Private not-for-profit, 2-year
-    6 = Private for-profit, 2-year
-    7 = Public, less-than 2-year
-    8 = Private not-for-profit, less-than 2-year
-    9 = Private for-profit, less-than 2-year
-    99 = Sector unknown (not active)
-    
-    Args:
-        df (pd.DataFrame): DataFrame containing 'sector' column
-        
-    Returns:
-        pd.DataFrame: DataFrame with mapped sector values
-    """
-    sector_mapping = {
+    },
+    # Sector of institution
+    'sector': {
         0: 'Administrative Unit',
         1: 'Public, 4-year or above',
         2: 'Private not-for-profit, 4-year or above',
@@ -131,118 +146,115 @@ def map_sector(df):
         8: 'Private not-for-profit, less-than 2-year',
         9: 'Private for-profit, less-than 2-year',
         99: 'Sector unknown (not active)'
-    }
-    
-    df['sector'] = df['sector'].map(sector_mapping)
-    
-    # Log the distribution of values
-    print("\nDistribution of institution sectors:")
-    print(df['sector'].value_counts(dropna=False))
-    
-    return df
-
-def map_level(df):
-    """
-    Map the level of institution values to their corresponding categories.
-    
-    Source: IPEDS Data Dictionary
-    Level of institution (HD2023)
-    Values represent:
-    1 = Four or more years
-    2 = At least 2 but less than 4 years
-    3 = Less than 2 years (below associate)
-    -3 = Not available
-    
-    Args:
-        df (pd.DataFrame): DataFrame containing 'level' column
-        
-    Returns:
-        pd.DataFrame: DataFrame with mapped level values
-    """
-    level_mapping = {
+    },
+    # Level of institution
+    # 3 = Less than 2 years (below associate)
+    'level': {
         1: 'Four or more years',
         2: 'At least 2 but less than 4 years',
         3: 'Less than 2 years',
         -3: 'Not available'
+    },
+    # Degree-granting status
+    # 2 = Nondegree-granting, primarily postsecondary
+    'degree_granting': {
+        1: 'Degree-granting',
+        2: 'Nondegree-granting',
+        -3: 'Not available'
+    },
+    # Postsecondary and Title IV institution indicator
+    # 9 = Institution is not active in current universe
+    'title_iv': {
+        1: 'Title IV postsecondary',
+        2: 'Non-Title IV postsecondary',
+        3: 'Title IV not primarily postsecondary',
+        4: 'Non-Title IV not primarily postsecondary',
+        5: 'Title IV postsecondary (not public)',
+        6: 'Non-Title IV postsecondary (not public)',
+        9: 'Not active'
     }
-    
-    df['level'] = df['level'].map(level_mapping)
-    
-    # Log the distribution of values
-    print("\nDistribution of institution levels:")
-    print(df['level'].value_counts(dropna=False))
-    
-    return df
+}
 
-def map_degree_granting(df):
+def apply_codebook(df, columns=None):
     """
-    Map the degree-granting status values to their corresponding categories.
+    Convert coded columns to labeled Categoricals in a single pass each.
     
-    Source: IPEDS Data Dictionary
-    Degree-granting status (HD2023)
-    Values represent:
-    1 = Degree-granting
-    2 = Nondegree-granting, primarily postsecondary
-    -3 = Not available
+    Codes are factorized directly against the codebook's category order and
+    the categories are then renamed to their labels, so no intermediate
+    object column is built. Codes missing from the codebook become NaN.
     
     Args:
-        df (pd.DataFrame): DataFrame containing 'degree_granting' column
+        df (pd.DataFrame): DataFrame containing coded columns
+        columns (list): Codebook columns to convert (default: all present in df)
         
     Returns:
-        pd.DataFrame: DataFrame with mapped degree-granting status values
+        pd.DataFrame: DataFrame with Categorical columns
     """
-    degree_mapping = {
-        1: 'Degree-granting',
-        2: 'Nondegree-granting',
-        -3: 'Not available'
-    }
+    if columns is None:
+        columns = [col for col in CODEBOOK if col in df.columns]
     
-    df['degree_granting'] = df['degree_granting'].map(degree_mapping)
-    
-    # Log the distribution of values
-    print("\nDistribution of degree-granting status:")
-    print(df['degree_granting'].value_counts(dropna=False))
+    for col in columns:
+        mapping = CODEBOOK[col]
+        codes = pd.to_numeric(df[col], errors='coerce')
+        categorical = pd.Categorical(codes, categories=list(mapping.keys()))
+        df[col] = categorical.rename_categories(list(mapping.values()))
     
     return df
 
-def map_title_iv(df):
+def summarize_codes(df, columns=None):
     """
-    Map the Title IV institution indicator values to their corresponding categories.
-    
-    Source: IPEDS Data Dictionary
-    Postsecondary and Title IV institution indicator (HD2023)
-    Values represent:
-    1 = Title IV postsecondary institution
-    2 = Non-Title IV postsecondary institution
-    3 = Title IV NOT primarily postsecondary institution
-    4 = Non-Title IV NOT primarily postsecondary institution
-    5 = Title IV postsecondary institution that is NOT open to the public
-    6 = Non-Title IV postsecondary institution that is NOT open to the public
-    9 = Institution is not active in current universe
+    Collect the value distribution of every coded column.
     
     Args:
-        df (pd.DataFrame): DataFrame containing 'title_iv' column
+        df (pd.DataFrame): DataFrame after apply_codebook
+        columns (list): Codebook columns to summarize (default: all present in df)
         
     Returns:
-        pd.DataFrame: DataFrame with mapped Title IV status values
+        pd.DataFrame: One row per (column, value) with its count, in codebook order
     """
-    title_iv_mapping = {
-        1: 'Title IV postsecondary',
-        2: 'Non-Title IV postsecondary',
-        3: 'Title IV not primarily postsecondary',
-        4: 'Non-Title IV not primarily postsecondary',
-        5: 'Title IV postsecondary (not public)',
-        6: 'Non-Title IV postsecondary (not public)',
-        9: 'Not active'
-    }
-    
-    df['title_iv'] = df['title_iv'].map(title_iv_mapping)
-    
-    # Log the distribution of values
-    print("\nDistribution of Title IV status:")
-    print(df['title_iv'].value_counts(dropna=False))
+    if columns is None:
+        columns = [col for col in CODEBOOK if col in df.columns]
+    
+    frames = []
+    for col in columns:
+        counts = df[col].value_counts(sort=False, dropna=False)
+        frames.append(pd.DataFrame({
+            'column': col,
+            'value': counts.index.astype(object).fillna('Unmapped'),
+            'count': counts.values
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+def write_code_report(summary, output_path):
+    """
+    Write the coded value distributions collected by summarize_codes.
     
-    return df
+    Args:
+        summary (pd.DataFrame): Output of summarize_codes
+        output_path (str): CSV file to write
+    """
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    summary.to_csv(output_path, index=False)
+
+def map_control(df):
+    """Map control of institution codes to labels (see CODEBOOK['control'])."""
+    return apply_codebook(df, ['control'])
+
+def map_sector(df):
+    """Map sector of institution codes to labels (see CODEBOOK['sector'])."""
+    return apply_codebook(df, ['sector'])
+
+def map_level(df):
+    """Map level of institution codes to labels (see CODEBOOK['level'])."""
+    return apply_codebook(df, ['level'])
+
+def map_degree_granting(df):
+    """Map degree-granting status codes to labels (see CODEBOOK['degree_granting'])."""
+    return apply_codebook(df, ['degree_granting'])
+
+def map_title_iv(df):
+    """Map Title IV indicator codes to labels (see CODEBOOK['title_iv'])."""
+    return apply_codebook(df, ['title_iv'])
 
 def validate_ope_id(df):
     """
@@ -267,13 +279,62 @@ def validate_ope_id(df):
     valid_format = df['ope_id'].str.match(r'^\d{7,8}$')
     
     # Log validation results
-    print("\nOPE ID Validation:")
-    print(f"Total records: {len(df)}")
-    print(f"Valid format: {valid_format.sum()}")
-    print(f"Invalid format: {(~valid_format).sum()}")
+    invalid = int((~valid_format).sum())
+    logger.info("OPE ID validation: %d records, %d valid, %d invalid",
+                len(df), len(df) - invalid, invalid)
+    
+    if invalid:
+        logger.warning("%d OPE IDs have an invalid format, e.g. %s",
+                       invalid, df.loc[~valid_format, 'ope_id'].head().tolist())
+    
+    return df
+
+def build_history(snapshots):
+    """
+    Combine yearly directory snapshots into a slowly-changing-dimension table.
     
-    if (~valid_format).any():
-        print("\nSample of invalid OPE IDs:")
-        print(df[~valid_format]['ope_id'].head())
+    Consecutive years in which an institution's attributes are identical are
+    collapsed into one version with an inclusive [valid_from, valid_to] year
+    range. Ranges are contiguous per institution: the first version is
+    open-ended backwards and the last one forwards, so years outside the
+    ingested range use the nearest known attributes.
     
-    return df
\ No newline at end of file
+    Args:
+        snapshots (dict): Survey year (int) -> cleaned and mapped DataFrame
+        
+    Returns:
+        pd.DataFrame: One row per institution version with 'valid_from' and 'valid_to'
+    """
+    frames = []
+    for survey_year, df in snapshots.items():
+        frames.append(df.assign(survey_year=survey_year))
+    combined = pd.concat(frames, ignore_index=True)
+    combined = combined.sort_values(['unit_id', 'survey_year'], ignore_index=True)
+    
+    attributes = [col for col in combined.columns if col not in ('unit_id', 'survey_year')]
+    
+    # A new version starts wherever the unit changes or any attribute differs
+    # from the previous survey year (missing values compare as equal)
+    previous = combined.groupby('unit_id')[attributes].shift()
+    same = (combined[attributes] == previous) | (combined[attributes].isna() & previous.isna())
+    new_unit = combined['unit_id'] != combined['unit_id'].shift()
+    new_version = new_unit | ~same.all(axis=1)
+    version_id = new_version.cumsum()
+    
+    history = combined.groupby(version_id).agg(
+        {**{col: 'first' for col in ['unit_id'] + attributes},
+         'survey_year': ['min', 'max']}
+    )
+    history.columns = ['unit_id'] + attributes + ['valid_from', 'valid_to']
+    
+    # Close each version the year before the next one starts, so survey years
+    # that were not ingested fall into the preceding version, and extend each
+    # institution's first and last versions to the open ends
+    first = ~history['unit_id'].duplicated(keep='first')
+    next_start = history.groupby('unit_id')['valid_from'].shift(-1)
+    history['valid_to'] = (next_start - 1).fillna(OPEN_END)
+    history.loc[first, 'valid_from'] = OPEN_START
+    
+    history['valid_from'] = history['valid_from'].astype('int16')
+    history['valid_to'] = history['valid_to'].astype('int16')
+    return history.reset_index(drop=True)
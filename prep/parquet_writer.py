@@ -0,0 +1,210 @@
+# File: prep/parquet_writer.py
+
+import argparse
+import glob
+import json
+import os
+import re
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pipeline_logging import get_logger, stage, add_logging_arguments, configure_from_args
+
+logger = get_logger('parquet_writer')
+
+# Sort order per processed dataset. Rows are sorted on the columns that
+# exist, so filters on the leading key touch few row groups and pages and
+# the footer min/max ranges stay narrow.
+SORT_KEYS = {
+    'financial_aid': ['unit_id'],
+    'grad_rate': ['unit_id'],
+    'institutions': ['sector', 'unit_id'],
+    'institutions_history': ['sector', 'unit_id', 'valid_from'],
+    # Read whole by the app; keeping each unit's years together lets
+    # repeated names and OPE IDs compress across years
+    'institution_crosswalk': ['unit_id', 'year']
+}
+
+# File name (without directory) -> dataset in SORT_KEYS
+DATASET_NAMES = [
+    (re.compile(r'^financial_aid_\d{4}\.parquet$'), 'financial_aid'),
+    (re.compile(r'^grad_rate_\d{4}\.parquet$'), 'grad_rate'),
+    (re.compile(r'^institutions\.parquet$'), 'institutions'),
+    (re.compile(r'^institutions_history\.parquet$'), 'institutions_history'),
+    (re.compile(r'^institution_crosswalk\.parquet$'), 'institution_crosswalk')
+]
+
+# Rows per row group. A year holds ~6k institutions, so per-year files get
+# a few row groups: enough for statistics to skip most of a file on a
+# unit_id or sector filter without making the footer dominate the file.
+# Files the app always reads whole use one large group per file.
+ROW_GROUP_ROWS = {
+    'institution_crosswalk': 1 << 17
+}
+DEFAULT_ROW_GROUP_ROWS = 2048
+# Rows per data page, so the page index can narrow reads within a group
+PAGE_ROWS = 512
+COMPRESSION = 'zstd'
+COMPRESSION_LEVEL = 3
+
+# Manifest of the processed files, next to them. The app discovers the
+# available years from it, and a file is only listed once it has been
+# completely written.
+MANIFEST_NAME = 'manifest.json'
+YEAR_IN_NAME = re.compile(r'_(\d{4})\.parquet$')
+
+def dataset_for(path):
+    """Dataset name for a processed file, or None if it has no layout"""
+    name = os.path.basename(path)
+    for pattern, dataset in DATASET_NAMES:
+        if pattern.match(name):
+            return dataset
+    return None
+
+def writer_options(schema):
+    """
+    Per-column encoding options for a table schema.
+
+    Strings use dictionary encoding (sector, state and control repeat on
+    every row); floats use BYTE_STREAM_SPLIT, which compresses numeric
+    measures better than dictionary or plain encoding. Other columns keep
+    the writer defaults.
+    """
+    strings = [f.name for f in schema
+               if pa.types.is_string(f.type) or pa.types.is_large_string(f.type)
+               or pa.types.is_dictionary(f.type)]
+    floats = [f.name for f in schema if pa.types.is_floating(f.type)]
+    return {
+        'use_dictionary': strings,
+        'column_encoding': {name: 'BYTE_STREAM_SPLIT' for name in floats},
+        'compression': COMPRESSION,
+        'compression_level': COMPRESSION_LEVEL,
+        'write_statistics': True,
+        'write_page_index': True,
+        'max_rows_per_page': PAGE_ROWS
+    }
+
+def manifest_entry(path):
+    """Manifest record of one processed file, from its footer"""
+    name = os.path.basename(path)
+    match = YEAR_IN_NAME.search(name)
+    return {
+        'dataset': dataset_for(path),
+        'year': match.group(1) if match else None,
+        'rows': pq.ParquetFile(path).metadata.num_rows,
+        'bytes': os.path.getsize(path)
+    }
+
+def _save_manifest(directory, files):
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'files': dict(sorted(files.items()))}, f, indent=2)
+        f.write('\n')
+    os.replace(tmp_path, manifest_path)
+
+def update_manifest(path):
+    """Add or refresh one file's entry in the manifest of its directory"""
+    directory = os.path.dirname(os.path.abspath(path))
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    files = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            files = json.load(f).get('files', {})
+    files[os.path.basename(path)] = manifest_entry(path)
+    _save_manifest(directory, files)
+
+def rebuild_manifest(directory='processed'):
+    """Write the manifest of every processed file with a known layout in a directory"""
+    files = {os.path.basename(path): manifest_entry(path)
+             for path in sorted(glob.glob(os.path.join(directory, '*.parquet'))) if dataset_for(path)}
+    _save_manifest(directory, files)
+    return files
+
+def layout_order(df, dataset):
+    """
+    Rows of a DataFrame in the order write_parquet stores them.
+
+    Callers verifying a written file compare it against this rather than
+    the frame they passed in, whose rows are usually in raw file order.
+
+    Args:
+        df (pd.DataFrame): Data as passed to write_parquet
+        dataset (str): Key in SORT_KEYS
+
+    Returns:
+        pd.DataFrame: df sorted on the dataset's keys, with a fresh index
+    """
+    sort_by = [col for col in SORT_KEYS.get(dataset, []) if col in df.columns]
+    if sort_by:
+        df = df.sort_values(sort_by, kind='stable')
+    return df.reset_index(drop=True)
+
+def write_parquet(df, output_path, dataset=None, row_group_rows=None, register=True):
+    """
+    Write a processed DataFrame with the repository's parquet layout.
+
+    Args:
+        df (pd.DataFrame): Data to write
+        output_path (str): Destination .parquet file
+        dataset (str): Key in SORT_KEYS (default: inferred from the file name)
+        row_group_rows (int): Rows per row group (default: ROW_GROUP_ROWS
+                              for the dataset)
+        register (bool): Add the file to its directory's manifest, which
+                         makes it visible to the app. Callers that verify
+                         the file pass False and call update_manifest once
+                         it has been verified.
+
+    Returns:
+        str: output_path
+    """
+    dataset = dataset or dataset_for(output_path)
+    sort_by = [col for col in SORT_KEYS.get(dataset, []) if col in df.columns]
+    row_group_rows = row_group_rows or ROW_GROUP_ROWS.get(dataset, DEFAULT_ROW_GROUP_ROWS)
+    df = layout_order(df, dataset)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sorting = [pq.SortingColumn(table.schema.get_field_index(col)) for col in sort_by]
+    logger.debug("Writing %s sorted by %s", output_path, sort_by)
+
+    tmp_path = output_path + '.tmp'
+    with pq.ParquetWriter(tmp_path, table.schema, sorting_columns=sorting or None,
+                          **writer_options(table.schema)) as writer:
+        writer.write_table(table, row_group_size=row_group_rows)
+    os.replace(tmp_path, output_path)
+    if register:
+        update_manifest(output_path)
+    return output_path
+
+def rewrite_file(path):
+    """Rewrite an existing processed file in place with the current layout"""
+    df = pq.read_table(path).to_pandas()
+    before = os.path.getsize(path)
+    write_parquet(df, path)
+    logger.info("Rewrote %s: %d -> %d bytes", path, before, os.path.getsize(path))
+
+def main():
+    """
+    Rewrite processed parquet files with the current writer configuration.
+    """
+    parser = argparse.ArgumentParser(description='Rewrite processed parquet files with the standard layout.')
+    parser.add_argument('paths', nargs='*',
+                        help='Files to rewrite (default: every processed file with a known layout)')
+    parser.add_argument('--manifest-only', action='store_true',
+                        help='Only rebuild processed/manifest.json from the files present')
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+
+    if args.manifest_only:
+        files = rebuild_manifest('processed')
+        logger.info("Listed %d files in %s", len(files), os.path.join('processed', MANIFEST_NAME))
+        return
+
+    paths = args.paths or [path for path in sorted(glob.glob(os.path.join('processed', '*.parquet')))
+                           if dataset_for(path)]
+    for path in paths:
+        with stage(logger, 'rewrite', path=path):
+            rewrite_file(path)
+
+if __name__ == "__main__":
+    main()
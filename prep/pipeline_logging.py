@@ -0,0 +1,234 @@
+# File: prep/pipeline_logging.py
+
+import atexit
+import cProfile
+import json
+import logging
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+ROOT_LOGGER = 'ipeds'
+
+# StageProfiler of the current run, when profiling was requested
+_profiler = None
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+class JsonLinesFormatter(logging.Formatter):
+    """Format each record as one JSON object, including fields passed via `extra`."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def get_logger(name):
+    """
+    Get a logger under the pipeline's logger hierarchy.
+
+    Args:
+        name (str): Module or stage name (e.g., 'prepare_institutions')
+
+    Returns:
+        logging.Logger: Logger named 'ipeds.<name>'
+    """
+    return logging.getLogger(f'{ROOT_LOGGER}.{name}')
+
+def configure_logging(level=logging.WARNING, json_path=None):
+    """
+    Configure console and optional JSON-lines output for the prep pipeline.
+
+    Batch runs default to WARNING, so only problems are reported. INFO adds
+    progress and per-stage timings; DEBUG adds column listings and frame
+    summaries, which are only computed when DEBUG is enabled.
+
+    Args:
+        level (int or str): Console log level
+        json_path (str): Optional file that receives every record at DEBUG
+            level as one JSON object per line
+    """
+    root = logging.getLogger(ROOT_LOGGER)
+    root.handlers.clear()
+    root.propagate = False
+
+    console = logging.StreamHandler()
+    console.setLevel(level)
+    console.setFormatter(logging.Formatter('%(asctime)s %(levelname)-7s %(name)s: %(message)s',
+                                           '%H:%M:%S'))
+    root.addHandler(console)
+    root.setLevel(console.level)
+
+    if json_path:
+        sink = logging.FileHandler(json_path, mode='a', encoding='utf-8')
+        sink.setLevel(logging.DEBUG)
+        sink.setFormatter(JsonLinesFormatter())
+        root.addHandler(sink)
+        root.setLevel(logging.DEBUG)
+
+class StageProfiler:
+    """
+    Wall time, CPU time and peak traced memory per pipeline stage.
+
+    Stages are aggregated by name, so a stage run once per year or per file
+    reports its call count, total times and the highest peak of any call.
+    Peaks are the most memory traced by tracemalloc at any point during the
+    stage, including what was allocated before it started; nested stages
+    count towards the peak of the stage around them.
+    """
+
+    def __init__(self, stats_path=None):
+        self.stats_path = stats_path
+        self.stages = {}
+        # Highest peak seen before the last tracemalloc reset, per open stage
+        self._floors = []
+        self._profile = cProfile.Profile() if stats_path else None
+
+    def start(self):
+        tracemalloc.start()
+        if self._profile is not None:
+            self._profile.enable()
+
+    def stop(self):
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(self.stats_path)
+        tracemalloc.stop()
+
+    def enter(self):
+        """Start measuring a stage; returns the token to pass to exit"""
+        peak = tracemalloc.get_traced_memory()[1]
+        if self._floors:
+            self._floors[-1] = max(self._floors[-1], peak)
+        tracemalloc.reset_peak()
+        self._floors.append(0)
+        return time.process_time()
+
+    def exit(self, name, cpu_start, seconds):
+        """Record a finished stage; returns its (CPU seconds, peak bytes)"""
+        cpu = time.process_time() - cpu_start
+        peak = max(self._floors.pop(), tracemalloc.get_traced_memory()[1])
+        totals = self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0, 'cpu_seconds': 0.0,
+                                               'peak_bytes': 0})
+        totals['calls'] += 1
+        totals['seconds'] += seconds
+        totals['cpu_seconds'] += cpu
+        totals['peak_bytes'] = max(totals['peak_bytes'], peak)
+        return cpu, peak
+
+    def summary(self):
+        """Per-stage table, in the order stages first finished"""
+        lines = [f"{'Stage':32s} {'Calls':>5s} {'Wall s':>9s} {'CPU s':>9s} {'Peak MB':>9s}"]
+        for name, totals in self.stages.items():
+            lines.append(f"{name:32s} {totals['calls']:5d} {totals['seconds']:9.3f} "
+                         f"{totals['cpu_seconds']:9.3f} {totals['peak_bytes'] / 2**20:9.1f}")
+        if self.stats_path:
+            lines.append(f"cProfile stats written to {self.stats_path} "
+                         f"(view with: python -m pstats {self.stats_path})")
+        return "\n".join(lines)
+
+def enable_profiling(stats_path=None):
+    """
+    Measure every stage() for the rest of the run.
+
+    tracemalloc slows allocation-heavy stages down severalfold, so wall and
+    CPU times are best compared between profiled runs. The summary table is
+    written to stderr when the process exits.
+
+    Args:
+        stats_path (str): Optional file that receives cProfile stats of the
+            whole run, readable with pstats or snakeviz
+    """
+    global _profiler
+    if _profiler is not None:
+        return _profiler
+    _profiler = StageProfiler(stats_path)
+    _profiler.start()
+    atexit.register(_finish_profiling)
+    return _profiler
+
+def _finish_profiling():
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is None:
+        return
+    profiler.stop()
+    print(profiler.summary(), file=sys.stderr)
+
+def add_logging_arguments(parser):
+    """
+    Add the shared logging and profiling options to a command-line parser.
+
+    Args:
+        parser (argparse.ArgumentParser): Parser of a prep entry point
+    """
+    group = parser.add_argument_group('logging')
+    group.add_argument('-v', '--verbose', action='count', default=0,
+                       help='Show progress (-v) or full debug output (-vv)')
+    group.add_argument('--log-json', metavar='PATH',
+                       help='Append structured JSON-lines log records to PATH')
+    group = parser.add_argument_group('profiling')
+    group.add_argument('--profile', action='store_true',
+                       help='Measure wall time, CPU time and peak memory of each stage and '
+                            'print a summary table at exit (slows the run down)')
+    group.add_argument('--profile-stats', metavar='PATH',
+                       help='Also write cProfile stats of the run to PATH (implies --profile)')
+
+def configure_from_args(args):
+    """
+    Configure logging and profiling from the options added by add_logging_arguments.
+
+    Args:
+        args (argparse.Namespace): Parsed command-line arguments
+    """
+    level = {0: logging.WARNING, 1: logging.INFO}.get(args.verbose, logging.DEBUG)
+    configure_logging(level, args.log_json)
+    if args.profile or args.profile_stats:
+        enable_profiling(args.profile_stats)
+
+@contextmanager
+def stage(logger, name, **fields):
+    """
+    Time one pipeline stage and log its duration.
+
+    When profiling is enabled (see enable_profiling), the record also
+    carries the stage's CPU time and peak traced memory, and the stage is
+    added to the summary table.
+
+    Args:
+        logger (logging.Logger): Logger to report to
+        name (str): Stage name (e.g., 'load', 'write')
+        **fields: Extra structured fields to attach to the record
+    """
+    profiler = _profiler
+    token = profiler.enter() if profiler is not None else None
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        elapsed = time.perf_counter() - start
+        if profiler is not None:
+            profiler.exit(name, token, elapsed)
+        logger.error("Stage %s failed after %.3fs", name, elapsed,
+                     extra={'stage': name, 'seconds': round(elapsed, 6), **fields})
+        raise
+    elapsed = time.perf_counter() - start
+    if profiler is None:
+        logger.info("Stage %s finished in %.3fs", name, elapsed,
+                    extra={'stage': name, 'seconds': round(elapsed, 6), **fields})
+        return
+    cpu, peak = profiler.exit(name, token, elapsed)
+    logger.info("Stage %s finished in %.3fs (%.3fs CPU, peak %.1f MB)", name, elapsed, cpu, peak / 2**20,
+                extra={'stage': name, 'seconds': round(elapsed, 6), 'cpu_seconds': round(cpu, 6),
+                       'peak_bytes': peak, **fields})
@@ -0,0 +1,83 @@
+# File: prep/prepare_aggregates.py
+
+import argparse
+import os
+import sys
+from pipeline_logging import get_logger, stage, add_logging_arguments, configure_from_args
+
+# The aggregates are computed by the same functions the app falls back to
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+from data_loader import (
+    YEAR_OPTIONS,
+    read_institution_history,
+    read_crosswalk,
+    merge_year,
+    read_snapshot_year,
+    data_version
+)
+from aggregates import (
+    build_distributions,
+    build_state_rollup,
+    build_peer_features,
+    build_trend_panel,
+    write_aggregate
+)
+
+logger = get_logger('prepare_aggregates')
+
+def load_frames():
+    """
+    Load every year's analysis frame, oldest first.
+
+    Uses the snapshot when it is current and merges the parquet files
+    otherwise.
+    """
+    history = crosswalk = None
+    frames = {}
+    for year in reversed(YEAR_OPTIONS.values()):
+        df = read_snapshot_year(year)
+        if df is None:
+            if history is None:
+                history = read_institution_history()
+                crosswalk = read_crosswalk()
+            df = merge_year(year, history, crosswalk)
+        frames[year] = df
+    return frames
+
+def main():
+    """
+    Build the precomputed aggregates used by the summary views.
+    """
+    try:
+        version = data_version()
+        with stage(logger, 'load'):
+            frames = load_frames()
+
+        with stage(logger, 'distributions'):
+            for name, df in build_distributions(frames).items():
+                path = write_aggregate(f'distribution_{name}', df, version)
+                logger.info("Saved %d rows to %s", len(df), path)
+
+        with stage(logger, 'state_rollup'):
+            df = build_state_rollup(frames)
+            path = write_aggregate('state_rollup', df, version)
+            logger.info("Saved %d rows to %s", len(df), path)
+
+        with stage(logger, 'peer_features'):
+            df = build_peer_features(frames)
+            path = write_aggregate('peer_features', df, version)
+            logger.info("Saved %d rows to %s", len(df), path)
+
+        with stage(logger, 'trend_panel'):
+            for name, df in build_trend_panel(frames).items():
+                path = write_aggregate(f'trend_{name}', df, version)
+                logger.info("Saved %d rows to %s", len(df), path)
+    except Exception:
+        logger.exception("Error building aggregates")
+        raise
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build the precomputed aggregates for the summary views.')
+    add_logging_arguments(parser)
+    configure_from_args(parser.parse_args())
+    main()
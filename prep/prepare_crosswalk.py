@@ -0,0 +1,82 @@
+# File: prep/prepare_crosswalk.py
+
+import argparse
+import os
+import pandas as pd
+from crosswalk_helpers import (
+    discover_financial_aid_years,
+    load_yearly_names,
+    build_crosswalk
+)
+from parquet_writer import write_parquet, update_manifest
+from pipeline_logging import get_logger, stage, add_logging_arguments, configure_from_args
+
+logger = get_logger('prepare_crosswalk')
+
+HISTORY_COLUMNS = ['unit_id', 'state', 'ope_id', 'valid_from', 'valid_to']
+
+def main(processed_dir='processed'):
+    """
+    Build the institution identity crosswalk from the processed datasets.
+
+    The crosswalk has one row per (unit_id, year) with the name reported that
+    year, the OPE ID and the main-campus parent, so the app can join and
+    label institutions by unit_id instead of by name.
+    """
+    try:
+        logger.info("Starting institution crosswalk processing...")
+
+        years = discover_financial_aid_years(processed_dir)
+        if not years:
+            logger.warning("No financial aid files found in %s", processed_dir)
+            return
+        logger.info("Found financial aid years: %s", ', '.join(years))
+
+        # Per-year names reported in the financial aid files
+        with stage(logger, 'load_names', years=len(years)):
+            names = load_yearly_names(processed_dir, years)
+
+        # OPE IDs and states from the institution directory version valid in
+        # each year; a single snapshot applies to every year
+        history_path = os.path.join(processed_dir, 'institutions_history.parquet')
+        if os.path.exists(history_path):
+            history = pd.read_parquet(history_path, columns=HISTORY_COLUMNS)
+        else:
+            history = pd.read_parquet(
+                os.path.join(processed_dir, 'institutions.parquet'),
+                columns=['unit_id', 'state', 'ope_id']
+            ).assign(valid_from=0, valid_to=9999)
+
+        with stage(logger, 'build_crosswalk'):
+            crosswalk = build_crosswalk(names, history)
+
+        latest = crosswalk[crosswalk['academic_year'] == crosswalk['academic_year'].max()]
+        logger.info("Crosswalk rows: %d, institutions: %d, branch campuses with a parent: %d, "
+                    "disambiguated labels: %d",
+                    len(crosswalk), crosswalk['unit_id'].nunique(),
+                    latest['parent_unit_id'].notna().sum(),
+                    (crosswalk['display_name'] != crosswalk['institution_name']).sum())
+
+        output_path = os.path.join(processed_dir, 'institution_crosswalk.parquet')
+        with stage(logger, 'write', path=output_path):
+            write_parquet(crosswalk, output_path, register=False)
+        logger.info("Saved crosswalk to %s", output_path)
+
+        # Verify saved data
+        with stage(logger, 'verify', path=output_path):
+            df_verify = pd.read_parquet(output_path)
+        if len(df_verify) == len(crosswalk) and list(df_verify.columns) == list(crosswalk.columns):
+            logger.info("✓ Verification successful")
+            update_manifest(output_path)
+        else:
+            logger.error("❌ Verification failed for %s", output_path)
+
+    except Exception:
+        logger.exception("Error building the crosswalk")
+        raise
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build the institution identity crosswalk.')
+    add_logging_arguments(parser)
+    configure_from_args(parser.parse_args())
+    main()
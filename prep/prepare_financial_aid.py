@@ -1,8 +1,13 @@
 # File: prep/prepare_financial_aid.py
 
+import argparse
 import os
 import pandas as pd
-from financial_aid_helpers import load_raw_financial_aid, clean_column_names
+from financial_aid_helpers import load_financial_aid
+from parquet_writer import write_parquet, update_manifest, layout_order, dataset_for
+from pipeline_logging import get_logger, stage, add_logging_arguments, configure_from_args
+
+logger = get_logger('prepare_financial_aid')
 
 def process_single_year(input_file, year, output_dir='processed'):
     """
@@ -14,18 +19,13 @@ def process_single_year(input_file, year, output_dir='processed'):
         output_dir (str): Directory for processed output
     """
     try:
-        print(f"\nProcessing data for year {year}")
-        print("-" * 50)
-        
-        # Load raw data
-        raw_df = load_raw_financial_aid(input_file)
+        logger.info("Processing data for year %s", year)
         
-        # Clean column names
-        df = clean_column_names(raw_df, year)
+        # Load only the schema columns, resolved from the header row
+        with stage(logger, 'load', year=year):
+            df = load_financial_aid(input_file, year)
         
-        # Debug: Print columns before saving
-        print("\nColumns to be saved:")
-        print(df.columns.tolist())
+        logger.debug("Columns to be saved: %s", df.columns.tolist())
         
         # Ensure output directory exists
         os.makedirs(output_dir, exist_ok=True)
@@ -34,21 +34,24 @@ def process_single_year(input_file, year, output_dir='processed'):
         output_path = os.path.join(output_dir, f'financial_aid_{year}.parquet')
         
         # Save processed data
-        df.to_parquet(output_path, index=False)
-        print(f"Saved processed data to {output_path}")
+        with stage(logger, 'write', year=year):
+            write_parquet(df, output_path, register=False)
+        logger.info("Saved processed data to %s", output_path)
         
         # Verify saved data
-        df_verify = pd.read_parquet(output_path)
-        print("\nVerification - columns in saved file:")
-        print(df_verify.columns.tolist())
+        with stage(logger, 'verify', year=year):
+            df_verify = pd.read_parquet(output_path)
+            verified = layout_order(df, dataset_for(output_path)).equals(df_verify)
+        logger.debug("Columns in saved file: %s", df_verify.columns.tolist())
         
-        if df.equals(df_verify):
-            print("✓ Verification successful")
+        if verified:
+            logger.info("✓ Verification successful")
+            update_manifest(output_path)
         else:
-            print("❌ Verification failed")
+            logger.error("❌ Verification failed for %s", output_path)
         
-    except Exception as e:
-        print(f"Error processing {year} data: {str(e)}")
+    except Exception:
+        logger.exception("Error processing %s data", year)
         raise
 
 def main():
@@ -63,17 +66,19 @@ def main():
         '2019': 'raw/finaid_2018_19.csv'
     }
     
-    print("Starting financial aid data processing...")
-    print(f"Current working directory: {os.getcwd()}")
+    logger.info("Starting financial aid data processing in %s", os.getcwd())
     
     # Process each year
     for year, filepath in years_files.items():
         if os.path.exists(filepath):
             process_single_year(filepath, year)
         else:
-            print(f"Warning: File not found - {filepath}")
+            logger.warning("File not found - %s", filepath)
     
-    print("\nProcessing complete.")
+    logger.info("Processing complete.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Process IPEDS financial aid data files.')
+    add_logging_arguments(parser)
+    configure_from_args(parser.parse_args())
+    main()
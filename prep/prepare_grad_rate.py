@@ -1,46 +1,57 @@
+import argparse
 import os
 import pandas as pd
 from grad_rate_helpers import load_raw_grad_rate, clean_column_names
+from parquet_writer import write_parquet, update_manifest, layout_order, dataset_for
+from pipeline_logging import get_logger, stage, add_logging_arguments, configure_from_args
+
+logger = get_logger('prepare_grad_rate')
 
 def main():
     """Process graduation rate data file."""
     try:
-        print("Starting graduation rate data processing...")
+        logger.info("Starting graduation rate data processing...")
         
         # Load raw data
-        raw_df = load_raw_grad_rate('raw/gradrate_2022_23.csv')
+        with stage(logger, 'load'):
+            raw_df = load_raw_grad_rate('raw/gradrate_2022_23.csv')
         
         # Clean column names
-        df = clean_column_names(raw_df)
+        with stage(logger, 'clean_column_names'):
+            df = clean_column_names(raw_df)
         
         # Convert grad rate to numeric, handling any non-numeric values
         df['grad_rate_2023'] = pd.to_numeric(df['grad_rate_2023'], errors='coerce')
         
-        # Debug: Print columns before saving
-        print("\nColumns to be saved:")
-        print(df.columns.tolist())
+        logger.debug("Columns to be saved: %s", df.columns.tolist())
         
         # Create output directory if it doesn't exist
         os.makedirs('processed', exist_ok=True)
         
         # Save to parquet
         output_path = 'processed/grad_rate_2023.parquet'
-        df.to_parquet(output_path, index=False)
-        print(f"\nSaved processed data to {output_path}")
+        with stage(logger, 'write'):
+            write_parquet(df, output_path, register=False)
+        logger.info("Saved processed data to %s", output_path)
         
         # Verify saved data
-        df_verify = pd.read_parquet(output_path)
-        print("\nVerification - columns in saved file:")
-        print(df_verify.columns.tolist())
-        
-        if df.equals(df_verify):
-            print("✓ Verification successful")
+        with stage(logger, 'verify'):
+            df_verify = pd.read_parquet(output_path)
+            verified = layout_order(df, dataset_for(output_path)).equals(df_verify)
+        logger.debug("Columns in saved file: %s", df_verify.columns.tolist())
+        
+        if verified:
+            logger.info("✓ Verification successful")
+            update_manifest(output_path)
         else:
-            print("❌ Verification failed")
+            logger.error("❌ Verification failed for %s", output_path)
             
-    except Exception as e:
-        print(f"Error in processing: {str(e)}")
+    except Exception:
+        logger.exception("Error in processing")
         raise
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Process IPEDS graduation rate data.')
+    add_logging_arguments(parser)
+    configure_from_args(parser.parse_args())
+    main()
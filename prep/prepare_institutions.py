@@ -1,99 +1,159 @@
 # File: prep/prepare_institutions.py
 
+import argparse
+import glob
+import io
+import logging
 import os
+import re
 import pandas as pd
 from institution_helpers import (
     load_raw_institutions, 
+    detect_survey_year,
     clean_column_names, 
     clean_string_columns,
-    map_control,
-    map_sector,
-    map_level,
-    map_degree_granting,
-    map_title_iv,
-    validate_ope_id
+    apply_codebook,
+    CODEBOOK,
+    summarize_codes,
+    write_code_report,
+    validate_ope_id,
+    build_history
 )
+from parquet_writer import write_parquet, update_manifest, layout_order, dataset_for
+from pipeline_logging import get_logger, stage, add_logging_arguments, configure_from_args
+
+logger = get_logger('prepare_institutions')
+
+def find_raw_files(raw_dir='raw'):
+    """
+    Find the raw institution directory files to ingest.
+    
+    raw/institutions.csv holds the current HD export; additional years are
+    placed alongside it as raw/institutions_<year>.csv.
+    """
+    files = []
+    current = os.path.join(raw_dir, 'institutions.csv')
+    if os.path.exists(current):
+        files.append(current)
+    files.extend(sorted(glob.glob(os.path.join(raw_dir, 'institutions_*.csv'))))
+    return files
+
+def prepare_snapshot(file_path):
+    """
+    Load and clean one year's institution directory file.
+    
+    Returns:
+        tuple: (survey year, cleaned DataFrame)
+    """
+    logger.info("Found file at: %s (%d bytes)", file_path, os.path.getsize(file_path))
+    
+    # Step 1: Load raw data
+    with stage(logger, 'load', file=file_path):
+        raw_df = load_raw_institutions(file_path)
+    logger.debug("Initial columns: %s", raw_df.columns.tolist())
+    
+    # The survey year comes from the header suffix, or the file name
+    survey_year = detect_survey_year(raw_df.columns)
+    if survey_year is None:
+        match = re.search(r'(\d{4})', os.path.basename(file_path))
+        if match is None:
+            raise ValueError(f"Cannot determine the HD survey year of {file_path}")
+        survey_year = int(match.group(1))
+    logger.info("Survey year: HD%d", survey_year)
+    
+    # Step 2: Clean column names
+    with stage(logger, 'clean_column_names', survey_year=survey_year):
+        df = clean_column_names(raw_df)
+    
+    # Step 3: Clean string columns
+    with stage(logger, 'clean_string_columns', survey_year=survey_year):
+        df = clean_string_columns(df)
+    
+    # Step 4: Map categorical values, one coded column at a time
+    with stage(logger, 'apply_codebook', survey_year=survey_year):
+        for col in [col for col in CODEBOOK if col in df.columns]:
+            with stage(logger, f'map_{col}', survey_year=survey_year):
+                df = apply_codebook(df, [col])
+    
+    # Step 5: Validate OPE ID
+    with stage(logger, 'validate_ope_id', survey_year=survey_year):
+        df = validate_ope_id(df)
+    
+    return survey_year, df
 
 def main():
     """
     Main function to execute the preparation process.
     """
-    print("Starting main function")  # Debug print
     try:
-        # Print current working directory
-        print("Current working directory:", os.getcwd())
+        logger.info("Starting institution processing in %s", os.getcwd())
         
-        # Check if file exists
-        file_path = 'raw/institutions.csv'
-        if os.path.exists(file_path):
-            print(f"Found file at: {file_path}")
-            print(f"File size: {os.path.getsize(file_path)} bytes")
-        else:
-            print(f"File not found at: {file_path}")
-            print("Absolute path would be:", os.path.abspath(file_path))
-            print("Please ensure institutions.csv is in the 'raw' directory")
+        # Check if files exist
+        files = find_raw_files()
+        if not files:
+            logger.error("No institution files found at %s; please ensure institutions.csv "
+                         "is in the 'raw' directory", os.path.abspath('raw/institutions.csv'))
             return
             
-        print("About to load raw data")  # Debug print
-        # Step 1: Load raw data
-        raw_df = load_raw_institutions('raw/institutions.csv')
-        print(f"Loaded {len(raw_df)} raw records")
-        print("\nInitial columns:")
-        print(raw_df.columns.tolist())
-        
-        # Step 2: Clean column names
-        df = clean_column_names(raw_df)
-        
-        # Step 3: Clean string columns
-        df = clean_string_columns(df)
+        snapshots = {}
+        for file_path in files:
+            survey_year, snapshot = prepare_snapshot(file_path)
+            if survey_year in snapshots:
+                raise ValueError(f"HD{survey_year} provided by more than one file")
+            snapshots[survey_year] = snapshot
         
-        # Step 4: Map categorical values
-        df = map_control(df)
-        df = map_sector(df)
-        df = map_level(df)
-        df = map_degree_granting(df)
-        df = map_title_iv(df)
-        
-        # Step 5: Validate OPE ID
-        df = validate_ope_id(df)
+        # The latest year remains the current directory snapshot
+        df = snapshots[max(snapshots)]
         
         # Basic info about the current state of dataset
-        print("\nCurrent Dataset Info:")
-        print("-" * 50)
-        print(df.info())
+        if logger.isEnabledFor(logging.DEBUG):
+            buffer = io.StringIO()
+            df.info(buf=buffer)
+            logger.debug("Current dataset info:\n%s", buffer.getvalue())
 
         output_path = 'processed/institutions.parquet'
-        df.to_parquet(output_path, index=False)
-        print(f"\nSaved data to {output_path}")
+        with stage(logger, 'write', path=output_path):
+            write_parquet(df, output_path, register=False)
+        logger.info("Saved data to %s", output_path)
 
-         # Verification step
-        print("\nVerifying saved file...")
-        df_verify = pd.read_parquet(output_path)
-        print("\nVerification Info:")
-        print("-" * 50)
-        print(f"Number of rows: {len(df_verify)}")
-        print(f"Number of columns: {len(df_verify.columns)}")
-        print("\nColumn names:")
-        for col in df_verify.columns:
-            print(f"- {col}")
+        # Verification step
+        with stage(logger, 'verify', path=output_path):
+            df_verify = pd.read_parquet(output_path)
+            verified = layout_order(df, dataset_for(output_path)).equals(df_verify)
+        logger.info("Verified %d rows x %d columns", len(df_verify), len(df_verify.columns))
+        logger.debug("Column names: %s", df_verify.columns.tolist())
             
         # Verify the data matches
-        if df.equals(df_verify):
-            print("\n✓ Verification successful: Saved data matches original")
+        if verified:
+            logger.info("✓ Verification successful: Saved data matches original")
+            update_manifest(output_path)
         else:
-            print("\n❌ Warning: Saved data differs from original")
+            logger.warning("❌ Saved data differs from original in %s", output_path)
             
         # Show sample of verified data
-        print("\nFirst few rows of verified data:")
-        print("-" * 50)
-        print(df_verify.head())
-
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("First few rows of verified data:\n%s", df_verify.head())
         
-    except Exception as e:
-        print(f"Error in main: {str(e)}")  # Debug print
+        # Distribution of coded values, collected once from the saved snapshot
+        summary = summarize_codes(df)
+        report_path = 'reports/institutions_code_distribution.csv'
+        write_code_report(summary, report_path)
+        logger.info("Coded value distribution written to %s", report_path)
+        
+        # Attribute history across all ingested years
+        with stage(logger, 'build_history', survey_years=len(snapshots)):
+            history = build_history(snapshots)
+        history_path = 'processed/institutions_history.parquet'
+        write_parquet(history, history_path)
+        logger.info("Saved %d institution versions from %d survey year(s) to %s",
+                    len(history), len(snapshots), history_path)
+
+    except Exception:
+        logger.exception("Error preparing institutions")
         raise
 
 if __name__ == "__main__":
-    print("Script starting")  # Debug print
+    parser = argparse.ArgumentParser(description='Prepare the IPEDS institution directory.')
+    add_logging_arguments(parser)
+    configure_from_args(parser.parse_args())
     main()
-    print("Script finished")  # Debug print
\ No newline at end of file
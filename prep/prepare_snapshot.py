@@ -0,0 +1,121 @@
+# File: prep/prepare_snapshot.py
+
+import argparse
+import json
+import os
+import sys
+import pyarrow as pa
+from pipeline_logging import get_logger, stage, add_logging_arguments, configure_from_args
+
+# The snapshot must match what the app builds, so reuse its merge logic
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+from data_loader import (
+    YEAR_OPTIONS,
+    SNAPSHOT_PATH,
+    METADATA_PATH,
+    read_institution_history,
+    read_crosswalk,
+    merge_year,
+    filter_options,
+    data_version,
+    year_version
+)
+
+logger = get_logger('prepare_snapshot')
+
+def write_metadata(version, years, output_path=METADATA_PATH):
+    """
+    Write the dataset metadata the app reads without loading any frame.
+
+    Args:
+        version (str): Data version the metadata was derived from
+        years (dict): Year code -> {'version': str, 'rows': int,
+                      'filters': {column: [values]}}
+        output_path (str): Destination .json file
+    """
+    metadata = {'data_version': version, 'years': years}
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(metadata, f, indent=2)
+        f.write('\n')
+    os.replace(tmp_path, output_path)
+
+def write_snapshot(output_path=SNAPSHOT_PATH, metadata_path=METADATA_PATH):
+    """
+    Write the pre-merged analysis dataset as an uncompressed Arrow IPC file.
+
+    Each academic year is stored as its own record batch, in YEAR_OPTIONS
+    order, so the app can memory-map the file and decode only the year it
+    needs. The schema metadata records the batch order, the version of the
+    source files the snapshot was built from and each year's own version
+    (data_loader.year_version), so a year added later leaves the other
+    batches usable.
+
+    The filter options of each year (sectors, states, controls, levels) are
+    written alongside to metadata_path.
+
+    Args:
+        output_path (str): Destination .arrow file
+        metadata_path (str): Destination dataset metadata .json file
+
+    Returns:
+        int: Number of rows written
+    """
+    version = data_version()
+    history = read_institution_history()
+    crosswalk = read_crosswalk()
+
+    years = list(YEAR_OPTIONS.values())
+    year_versions = {year: year_version(year) for year in years}
+    schema = None
+    rows = 0
+    year_metadata = {}
+    tmp_path = output_path + '.tmp'
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        writer = None
+        try:
+            for year in years:
+                with stage(logger, 'merge', year=year):
+                    df = merge_year(year, history, crosswalk)
+                batch = pa.RecordBatch.from_pandas(df, schema=schema, preserve_index=False)
+                if writer is None:
+                    schema = batch.schema.with_metadata({
+                        **(batch.schema.metadata or {}),
+                        b'ipeds.data_version': version.encode(),
+                        b'ipeds.years': json.dumps(years).encode(),
+                        b'ipeds.year_versions': json.dumps(year_versions).encode()
+                    })
+                    batch = batch.replace_schema_metadata(schema.metadata)
+                    writer = pa.ipc.new_file(sink, schema)
+                writer.write_batch(batch)
+                rows += batch.num_rows
+                year_metadata[year] = {'version': year_versions[year], 'rows': batch.num_rows,
+                                       'filters': filter_options(df)}
+        finally:
+            if writer is not None:
+                writer.close()
+
+    # Replace atomically so running apps never map a half-written file
+    os.replace(tmp_path, output_path)
+    write_metadata(version, year_metadata, metadata_path)
+    return rows
+
+def main():
+    """
+    Build the Arrow IPC snapshot of the analysis dataset.
+    """
+    try:
+        logger.info("Building analysis snapshot...")
+        with stage(logger, 'write_snapshot'):
+            rows = write_snapshot()
+        logger.info("Saved %d rows (%d bytes) to %s",
+                    rows, os.path.getsize(SNAPSHOT_PATH), SNAPSHOT_PATH)
+    except Exception:
+        logger.exception("Error building the analysis snapshot")
+        raise
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build the memory-mappable analysis snapshot.')
+    add_logging_arguments(parser)
+    configure_from_args(parser.parse_args())
+    main()
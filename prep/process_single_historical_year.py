@@ -1,7 +1,11 @@
 import os
 import pandas as pd
 import argparse
-from financial_aid_helpers import load_raw_financial_aid, clean_column_names
+from financial_aid_helpers import load_financial_aid
+from parquet_writer import write_parquet, update_manifest, layout_order, dataset_for
+from pipeline_logging import get_logger, stage, add_logging_arguments, configure_from_args
+
+logger = get_logger('process_single_historical_year')
 
 def process_single_year(input_file, year, output_dir='processed'):
     """
@@ -13,60 +17,60 @@ def process_single_year(input_file, year, output_dir='processed'):
         output_dir (str): Directory for processed output
     """
     try:
-        print(f"\nProcessing data for year {year}")
-        print("-" * 50)
+        logger.info("Processing data for year %s", year)
         
         # Check if output file already exists
         output_path = os.path.join(output_dir, f'financial_aid_{year}.parquet')
         if os.path.exists(output_path):
             raise ValueError(f"Output file already exists: {output_path}")
         
-        # Load and process the data
-        print(f"Loading file: {input_file}")
-        raw_df = load_raw_financial_aid(input_file)
-        
-        # Clean column names
-        df = clean_column_names(raw_df, year)
+        # Load only the schema columns, resolved from the header row
+        with stage(logger, 'load', year=year):
+            df = load_financial_aid(input_file, year)
         
-        # Debug: Print columns before saving
-        print("\nColumns to be saved:")
-        print(df.columns.tolist())
+        logger.debug("Columns to be saved: %s", df.columns.tolist())
         
         # Create output filename
         os.makedirs(output_dir, exist_ok=True)
         
         # Save processed data
-        df.to_parquet(output_path, index=False)
-        print(f"Saved processed data to {output_path}")
+        with stage(logger, 'write', year=year):
+            write_parquet(df, output_path, register=False)
+        logger.info("Saved processed data to %s", output_path)
         
         # Verify saved data
-        df_verify = pd.read_parquet(output_path)
-        print("\nVerification - columns in saved file:")
-        print(df_verify.columns.tolist())
+        with stage(logger, 'verify', year=year):
+            df_verify = pd.read_parquet(output_path)
+            verified = layout_order(df, dataset_for(output_path)).equals(df_verify)
+        logger.debug("Columns in saved file: %s", df_verify.columns.tolist())
         
-        if df.equals(df_verify):
-            print("✓ Verification successful")
+        if verified:
+            logger.info("✓ Verification successful")
+            update_manifest(output_path)
         else:
-            print("❌ Verification failed")
+            # Remove the unverified file so the year can be rerun
+            os.remove(output_path)
             raise ValueError("Verification failed: saved data does not match processed data")
             
-    except Exception as e:
-        print(f"Error processing {year} data: {str(e)}")
+    except Exception:
+        logger.exception("Error processing %s data", year)
         raise
 
 def main():
     parser = argparse.ArgumentParser(description='Process a single historical year of IPEDS data.')
     parser.add_argument('filename', help='Input CSV filename (e.g., finaid_2017_18.csv)')
     parser.add_argument('year', help='Year identifier (e.g., 2018 for 2017-18)')
+    add_logging_arguments(parser)
     
     args = parser.parse_args()
+    configure_from_args(args)
     
     # Ensure input file exists
     if not os.path.exists(args.filename):
-        print(f"Error: Input file not found: {args.filename}")
+        logger.error("Input file not found: %s", args.filename)
         return
     
     process_single_year(args.filename, args.year)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
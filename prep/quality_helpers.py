@@ -0,0 +1,274 @@
+import glob
+import os
+import re
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from crosswalk_helpers import academic_year_end
+from pipeline_logging import get_logger
+
+logger = get_logger('quality')
+
+# Processed datasets covered by the quality report: glob pattern -> dataset name.
+# A year code in the file name ('financial_aid_2223') is recorded with the file.
+DATASETS = {
+    'financial_aid_*.parquet': 'financial_aid',
+    'grad_rate_*.parquet': 'grad_rate',
+    'institutions.parquet': 'institutions'
+}
+YEAR_IN_NAME = re.compile(r'_(\d{4})\.parquet$')
+
+# Columns whose full value distribution is reported
+CATEGORICAL_COLUMNS = ['control', 'sector', 'level', 'degree_granting', 'title_iv', 'state']
+
+# Range checks answered from the footer min/max: column -> (minimum, maximum)
+VALUE_RANGES = {
+    'total_undergrad': (0, None),
+    'num_pell_grant': (0, None),
+    'pct_pell_grant': (0, 100),
+    'total_pell_amount': (0, None),
+    'avg_pell_amount': (0, None),
+    'num_fed_loan': (0, None),
+    'pct_fed_loan': (0, 100),
+    'total_loan_amount': (0, None),
+    'avg_loan_amount': (0, None),
+    'grad_rate_2023': (0, 100)
+}
+
+# Year-over-year spike detection: metric -> smallest value considered, so
+# tiny institutions going from 1 to 10 students are not flagged
+SPIKE_METRICS = {
+    'total_undergrad': 100,
+    'total_pell_amount': 100000,
+    'total_loan_amount': 100000
+}
+SPIKE_RATIO = 5.0
+
+def find_quality_files(processed_dir='processed'):
+    """List (dataset, year, path) for every processed file the report covers"""
+    files = []
+    for pattern, dataset in DATASETS.items():
+        for path in sorted(glob.glob(os.path.join(processed_dir, pattern))):
+            match = YEAR_IN_NAME.search(path)
+            files.append((dataset, match.group(1) if match else None, path))
+    return files
+
+def _stat_value(value):
+    """Make a parquet statistic JSON-serializable"""
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='replace')
+    if isinstance(value, (np.integer, np.floating)):
+        value = value.item()
+    if isinstance(value, float):
+        # Writers record a zero minimum as -0.0
+        return value + 0.0
+    return value
+
+def footer_statistics(metadata):
+    """
+    Combine the per-row-group column statistics in a parquet footer.
+
+    Args:
+        metadata (pyarrow.parquet.FileMetaData): Parquet footer
+
+    Returns:
+        dict: column -> {'null_count', 'min', 'max'}; a value is None when
+              any row group lacks that statistic
+    """
+    stats = {}
+    for rg in range(metadata.num_row_groups):
+        row_group = metadata.row_group(rg)
+        for i in range(row_group.num_columns):
+            column = row_group.column(i)
+            name = column.path_in_schema
+            combined = stats.setdefault(name, {'null_count': 0, 'min': None, 'max': None,
+                                               'complete': True})
+            s = column.statistics
+            if s is None or not s.has_null_count:
+                combined['null_count'] = None
+            elif combined['null_count'] is not None:
+                combined['null_count'] += s.null_count
+            if s is None or not s.has_min_max:
+                # A row group of only nulls has no min/max but hides no values
+                if s is None or not s.has_null_count or s.null_count != row_group.num_rows:
+                    combined['complete'] = False
+                continue
+            lo, hi = _stat_value(s.min), _stat_value(s.max)
+            combined['min'] = lo if combined['min'] is None else min(combined['min'], lo)
+            combined['max'] = hi if combined['max'] is None else max(combined['max'], hi)
+
+    for combined in stats.values():
+        if not combined.pop('complete'):
+            combined['min'] = combined['max'] = None
+    return stats
+
+def profile_file(path, dataset, year=None):
+    """
+    Profile one processed parquet file with a single read.
+
+    Row counts, null counts and min/max come from the footer. Only the
+    columns that need their values (unit_id, categorical columns and the
+    spike metrics) are read, once, and everything else about them is
+    computed from that read.
+
+    Returns:
+        tuple: (profile dict, DataFrame of unit_id and spike metrics or None)
+    """
+    parquet_file = pq.ParquetFile(path)
+    metadata = parquet_file.metadata
+    schema = parquet_file.schema_arrow
+    stats = footer_statistics(metadata)
+
+    names = schema.names
+    categorical = [col for col in CATEGORICAL_COLUMNS if col in names]
+    spike = [col for col in SPIKE_METRICS if col in names] if dataset == 'financial_aid' else []
+    read_columns = [col for col in ['unit_id'] + categorical + spike if col in names]
+    table = parquet_file.read(columns=read_columns) if read_columns else None
+
+    columns = {}
+    for field in schema:
+        column = {'type': str(field.type), **stats.get(field.name, {})}
+        if table is not None and field.name in read_columns:
+            values = table.column(field.name)
+            column['null_count'] = values.null_count
+            if field.name in categorical:
+                counts = pc.value_counts(values.drop_null()).to_pylist()
+                column['values'] = {c['values']: c['counts'] for c in
+                                    sorted(counts, key=lambda c: -c['counts'])}
+            if field.name == 'unit_id':
+                column['distinct'] = pc.count_distinct(values).as_py()
+        columns[field.name] = column
+
+    checks = []
+    for col, (lo, hi) in VALUE_RANGES.items():
+        if col not in columns or columns[col].get('min') is None:
+            continue
+        if lo is not None and columns[col]['min'] < lo:
+            checks.append(f"{col} has values below {lo} (min {columns[col]['min']})")
+        if hi is not None and columns[col]['max'] > hi:
+            checks.append(f"{col} has values above {hi} (max {columns[col]['max']})")
+    if 'unit_id' in columns and columns['unit_id'].get('distinct') not in (None, metadata.num_rows):
+        checks.append(f"unit_id has {metadata.num_rows - columns['unit_id']['distinct']:,} duplicate rows")
+
+    profile = {
+        'path': path,
+        'dataset': dataset,
+        'year': year,
+        'rows': metadata.num_rows,
+        'row_groups': metadata.num_row_groups,
+        'bytes': os.path.getsize(path),
+        'columns': columns,
+        'failed_checks': checks
+    }
+    spike_df = table.select(['unit_id'] + spike).to_pandas() if spike and 'unit_id' in read_columns else None
+    return profile, spike_df
+
+def find_spikes(yearly, ratio=SPIKE_RATIO):
+    """
+    Flag year-over-year jumps or drops per unit_id.
+
+    A change is flagged when a metric grows or shrinks by at least `ratio`
+    between consecutive reported years and the larger of the two values is
+    above the metric's floor in SPIKE_METRICS.
+
+    Args:
+        yearly (dict): Year code -> DataFrame of unit_id and metrics
+
+    Returns:
+        list: One dict per flagged change (unit_id, metric, years, values, ratio)
+    """
+    years = sorted(yearly, key=academic_year_end)
+    anomalies = []
+    for metric, floor in SPIKE_METRICS.items():
+        series = {year: df.set_index('unit_id')[metric] for year, df in yearly.items()
+                  if metric in df.columns}
+        if len(series) < 2:
+            continue
+        wide = pd.DataFrame(series)[[year for year in years if year in series]]
+        values = wide.to_numpy(dtype=float)
+        previous, current = values[:, :-1], values[:, 1:]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change = current / previous
+        big = np.fmax(previous, current) >= floor
+        flagged = big & ((change >= ratio) | (change <= 1 / ratio))
+        for row, col in zip(*np.nonzero(flagged)):
+            anomalies.append({
+                'unit_id': int(wide.index[row]),
+                'metric': metric,
+                'from_year': wide.columns[col],
+                'to_year': wide.columns[col + 1],
+                'from_value': float(previous[row, col]),
+                'to_value': float(current[row, col]),
+                'ratio': float(change[row, col]) if np.isfinite(change[row, col]) else None
+            })
+    return anomalies
+
+def build_quality_report(processed_dir='processed'):
+    """
+    Profile every processed dataset and flag anomalies.
+
+    Returns:
+        dict: Machine-readable report with 'generated', 'files' (one
+              profile per file) and 'anomalies' (year-over-year spikes)
+    """
+    profiles = []
+    yearly = {}
+    for dataset, year, path in find_quality_files(processed_dir):
+        logger.info("Profiling %s", path)
+        profile, spike_df = profile_file(path, dataset, year)
+        profiles.append(profile)
+        for check in profile['failed_checks']:
+            logger.warning("%s: %s", path, check)
+        if spike_df is not None:
+            yearly[year] = spike_df
+
+    anomalies = find_spikes(yearly)
+    logger.info("Profiled %d files; %d year-over-year anomalies", len(profiles), len(anomalies))
+    return {
+        'generated': datetime.now().isoformat(timespec='seconds'),
+        'files': profiles,
+        'anomalies': anomalies
+    }
+
+def render_markdown(report):
+    """Render the report as markdown in the style of the original institutions report"""
+    lines = ["# IPEDS Data Quality Report",
+             f"Generated: {datetime.fromisoformat(report['generated']).strftime('%B %d, %Y')}\n"]
+
+    for profile in report['files']:
+        title = profile['dataset'].replace('_', ' ').title()
+        if profile['year']:
+            title += f" ({profile['year']})"
+        lines.append(f"## {title}")
+        lines.append(f"- File: {profile['path']}")
+        lines.append(f"- Rows: {profile['rows']:,}")
+        lines.append(f"- Columns: {len(profile['columns'])}\n")
+
+        for col, column in profile['columns'].items():
+            if 'values' in column and col != 'state':
+                lines.append(f"### {col.replace('_', ' ').title()}")
+                lines.extend(f"- {value}: {count:,}" for value, count in column['values'].items())
+                lines.append("")
+        if 'state' in profile['columns'] and 'values' in profile['columns']['state']:
+            lines.append("### Top 5 States by Number of Institutions")
+            top = list(profile['columns']['state']['values'].items())[:5]
+            lines.extend(f"- {state}: {count:,}" for state, count in top)
+            lines.append("")
+
+        missing = {col: c['null_count'] for col, c in profile['columns'].items() if c.get('null_count')}
+        if missing:
+            lines.append("### Missing Values")
+            lines.extend(f"- {col}: {count:,}" for col, count in missing.items())
+            lines.append("")
+        if profile['failed_checks']:
+            lines.append("### Failed Checks")
+            lines.extend(f"- {check}" for check in profile['failed_checks'])
+            lines.append("")
+
+    lines.append("## Year-over-Year Anomalies")
+    lines.append(f"- {len(report['anomalies']):,} changes of {SPIKE_RATIO:g}x or more flagged")
+    by_metric = pd.Series([a['metric'] for a in report['anomalies']], dtype=object).value_counts()
+    lines.extend(f"- {metric}: {count:,}" for metric, count in by_metric.items())
+    return "\n".join(lines)
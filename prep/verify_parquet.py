@@ -1,77 +1,184 @@
 import pandas as pd
+import pyarrow.parquet as pq
 import argparse
+import glob
 import os
+from concurrent.futures import ThreadPoolExecutor
+from quality_helpers import footer_statistics
+from pipeline_logging import get_logger, stage, add_logging_arguments, configure_from_args
 
-def verify_parquet_file(filepath):
+logger = get_logger('verify_parquet')
+
+# Check required columns
+REQUIRED_COLUMNS = {
+    'unit_id': 'Institution identifier',
+    'total_undergrad': 'Total undergraduate enrollment',
+    'total_pell_amount': 'Total Pell grant amount',
+    'total_loan_amount': 'Total federal loan amount'
+}
+
+def collect_statistics(filepath, full=False):
+    """
+    Gather the verification statistics for one parquet file.
+
+    By default everything is answered from the footer: the schema gives the
+    columns, the row group metadata the row count, and the column
+    statistics the null counts and min/max. Only required columns whose
+    statistics are missing are read, and only those columns. With
+    full=True the whole file is loaded instead.
+
+    Returns:
+        dict: 'columns', 'rows', 'stats' (column -> null_count/min/max) and
+              'columns_read' (columns that had to be read)
+    """
+    # Check file exists
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"File not found: {filepath}")
+
+    if full:
+        df = pd.read_parquet(filepath)
+        stats = {col: {'null_count': int(df[col].isnull().sum()),
+                       'min': df[col].min(), 'max': df[col].max()}
+                 for col in REQUIRED_COLUMNS if col in df.columns}
+        return {'columns': list(df.columns), 'rows': len(df), 'stats': stats,
+                'columns_read': list(df.columns)}
+
+    parquet_file = pq.ParquetFile(filepath)
+    columns = parquet_file.schema_arrow.names
+    footer = footer_statistics(parquet_file.metadata)
+    stats = {col: footer[col] for col in REQUIRED_COLUMNS if col in footer}
+
+    # Fall back to reading just the columns the footer could not answer for
+    incomplete = [col for col, s in stats.items()
+                  if s['null_count'] is None or s['min'] is None]
+    if incomplete:
+        df = parquet_file.read(columns=incomplete).to_pandas()
+        for col in incomplete:
+            stats[col] = {'null_count': int(df[col].isnull().sum()),
+                          'min': df[col].min(), 'max': df[col].max()}
+
+    return {'columns': columns, 'rows': parquet_file.metadata.num_rows, 'stats': stats,
+            'columns_read': incomplete}
+
+def report_statistics(result):
+    """Check the gathered statistics and print the verification report"""
+    missing_columns = []
+    for col, description in REQUIRED_COLUMNS.items():
+        if col not in result['columns']:
+            missing_columns.append(f"{col} ({description})")
+
+    if missing_columns:
+        raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
+
+    rows = result['rows']
+    stats = result['stats']
+
+    # Print basic statistics
+    print("\nFile Statistics:")
+    print(f"Number of rows: {rows:,}")
+    print(f"Number of columns: {len(result['columns'])}")
+
+    # Check for null values in key columns
+    print("\nNull Value Check:")
+    for col in REQUIRED_COLUMNS:
+        null_count = stats[col]['null_count']
+        print(f"{col}: {null_count:,} null values ({(null_count/rows*100 if rows else 0):.1f}%)")
+
+    # Value range checks
+    print("\nValue Range Checks:")
+    print(f"Total undergraduate range: {stats['total_undergrad']['min']:,} to {stats['total_undergrad']['max']:,}")
+    print(f"Pell amount range: ${stats['total_pell_amount']['min']:,.2f} to ${stats['total_pell_amount']['max']:,.2f}")
+    print(f"Loan amount range: ${stats['total_loan_amount']['min']:,.2f} to ${stats['total_loan_amount']['max']:,.2f}")
+
+    print("\nAll columns present:")
+    for col in sorted(result['columns']):
+        print(f"- {col}")
+
+    if result['columns_read']:
+        print(f"\nColumns read (no footer statistics): {', '.join(result['columns_read'])}")
+
+def verify_parquet_file(filepath, full=False):
     """
     Verify a parquet file contains expected financial aid data structure.
-    
+
     Args:
         filepath (str): Path to the parquet file to verify
+        full (bool): Load the whole file instead of using footer statistics
     """
     try:
         print(f"\nVerifying parquet file: {filepath}")
         print("-" * 50)
-        
-        # Check file exists
-        if not os.path.exists(filepath):
-            raise FileNotFoundError(f"File not found: {filepath}")
-        
-        # Load the parquet file
-        df = pd.read_parquet(filepath)
-        
-        # Check required columns
-        required_columns = {
-            'unit_id': 'Institution identifier',
-            'total_undergrad': 'Total undergraduate enrollment',
-            'total_pell_amount': 'Total Pell grant amount',
-            'total_loan_amount': 'Total federal loan amount'
-        }
-        
-        missing_columns = []
-        for col, description in required_columns.items():
-            if col not in df.columns:
-                missing_columns.append(f"{col} ({description})")
-        
-        if missing_columns:
-            raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
-        
-        # Print basic statistics
-        print("\nFile Statistics:")
-        print(f"Number of rows: {len(df):,}")
-        print(f"Number of columns: {len(df.columns)}")
-        
-        # Check for null values in key columns
-        print("\nNull Value Check:")
-        for col in required_columns:
-            null_count = df[col].isnull().sum()
-            print(f"{col}: {null_count:,} null values ({(null_count/len(df)*100):.1f}%)")
-        
-        # Value range checks
-        print("\nValue Range Checks:")
-        if 'total_undergrad' in df.columns:
-            print(f"Total undergraduate range: {df['total_undergrad'].min():,} to {df['total_undergrad'].max():,}")
-        if 'total_pell_amount' in df.columns:
-            print(f"Pell amount range: ${df['total_pell_amount'].min():,.2f} to ${df['total_pell_amount'].max():,.2f}")
-        if 'total_loan_amount' in df.columns:
-            print(f"Loan amount range: ${df['total_loan_amount'].min():,.2f} to ${df['total_loan_amount'].max():,.2f}")
-        
-        print("\nAll columns present:")
-        for col in sorted(df.columns):
-            print(f"- {col}")
-        
+
+        with stage(logger, 'collect_statistics', path=filepath):
+            result = collect_statistics(filepath, full)
+        report_statistics(result)
+
         print("\n✓ Verification completed successfully")
-        
+
     except Exception as e:
         print(f"\n❌ Verification failed: {str(e)}")
         raise
 
+def verify_directory(directory, pattern='financial_aid_*.parquet', full=False, workers=None):
+    """
+    Verify every matching parquet file in a directory.
+
+    Files are inspected concurrently; reports are printed in file order
+    once all have been read.
+
+    Returns:
+        list: Paths of the files that failed verification
+    """
+    paths = sorted(glob.glob(os.path.join(directory, pattern)))
+    if not paths:
+        raise FileNotFoundError(f"No files matching {pattern} in {directory}")
+
+    def collect(path):
+        try:
+            return collect_statistics(path, full), None
+        except Exception as e:
+            return None, e
+
+    # One stage for the whole pool; stages are measured on the calling thread
+    with stage(logger, 'collect_statistics', files=len(paths)):
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(collect, paths))
+
+    failed = []
+    for path, (result, error) in zip(paths, results):
+        print(f"\nVerifying parquet file: {path}")
+        print("-" * 50)
+        try:
+            if error is not None:
+                raise error
+            report_statistics(result)
+            print("\n✓ Verification completed successfully")
+        except Exception as e:
+            print(f"\n❌ Verification failed: {str(e)}")
+            failed.append(path)
+
+    print(f"\nVerified {len(paths)} files: {len(paths) - len(failed)} passed, {len(failed)} failed")
+    return failed
+
 def main():
     parser = argparse.ArgumentParser(description='Verify IPEDS financial aid parquet file.')
-    parser.add_argument('filepath', help='Path to parquet file (e.g., processed/financial_aid_2018.parquet)')
-    
+    parser.add_argument('filepath', help='Path to parquet file (e.g., processed/financial_aid_2018.parquet) '
+                                         'or a directory of them (e.g., processed)')
+    parser.add_argument('--full', action='store_true',
+                        help='Load each file completely instead of reading footer statistics')
+    parser.add_argument('--pattern', default='financial_aid_*.parquet',
+                        help='Files to verify when given a directory (default: financial_aid_*.parquet)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Files verified concurrently when given a directory')
+    add_logging_arguments(parser)
+
     args = parser.parse_args()
-    verify_parquet_file(args.filepath)
+    configure_from_args(args)
+    if os.path.isdir(args.filepath):
+        if verify_directory(args.filepath, args.pattern, args.full, args.workers):
+            raise SystemExit(1)
+    else:
+        verify_parquet_file(args.filepath, args.full)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()